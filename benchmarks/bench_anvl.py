@@ -0,0 +1,184 @@
+"""
+Time ANVL parsing on a multi-megabyte bag-info.txt with long folded
+values, comparing the original readANVLString with the streaming parser,
+then time line folding and writing against the original recursive code.
+
+    python benchmarks/bench_anvl.py [--megabytes N] [--value-kilobytes N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from codalib import anvl
+
+
+def oldReadANVLString(ANVL_string):
+    """
+    The original readANVLString implementation, kept for comparison.
+    """
+    ANVLDict = {}
+    ANVLLines = ANVL_string.split("\n")
+    lineCount = len(ANVLLines)
+    index = 0
+    while index < lineCount:
+        line = ANVLLines[index]
+        if not len(line) or not len(line.strip()):
+            index = index + 1
+            continue
+        if "#" == line[0]:
+            index = index + 1
+            continue
+        parts = line.split(":", 1)
+        key = parts[0].strip()
+        contentBuffer = parts[1].lstrip()
+        nextIndex = index + 1
+        while nextIndex < lineCount:
+            nextLine = ANVLLines[nextIndex]
+            if len(nextLine) and "#" == nextLine[0]:
+                nextIndex = nextIndex + 1
+                continue
+            if nextLine == nextLine.lstrip():
+                break
+            if contentBuffer:
+                contentBuffer = contentBuffer + " " + nextLine.lstrip()
+            else:
+                contentBuffer = nextLine.lstrip()
+            nextIndex = nextIndex + 1
+        index = nextIndex
+        ANVLDict[key] = contentBuffer
+    return ANVLDict
+
+
+def oldBreakString(text, width=79, firstLineOffset=0):
+    """
+    The original recursive breakString, kept for comparison.
+    """
+    originalWidth = width
+    width = width - firstLineOffset
+    if len(text) < width + 1:
+        return text
+    index = width
+    while index > 0:
+        if ' ' == text[index]:
+            if not text[index + 1].isspace() and not \
+                    text[index - 1].isspace():
+                stringPart1 = text[0:index]
+                stringPart2 = text[index:]
+                return "%s\n%s" % (
+                    stringPart1,
+                    oldBreakString(stringPart2, originalWidth)
+                )
+        index = index - 1
+    return text
+
+
+def oldWriteANVLString(ANVLDict):
+    """
+    The original writeANVLString, kept for comparison.
+    """
+    lines = []
+    keys = list(ANVLDict.keys())
+    keys.sort()
+    for key in keys:
+        value = ANVLDict[key]
+        offset = len(key) + 1
+        line = "%s: %s" % (key, oldBreakString(value, 79, offset))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def makeBagInfo(path, megabytes):
+    """
+    Write a bag-info.txt of roughly `megabytes` MB, mostly made of a
+    few very long folded values.
+    """
+    word = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do"
+    target = megabytes * 1024 * 1024
+    written = 0
+    tagNumber = 0
+    with open(path, "w") as f:
+        while written < target:
+            f.write("External-Description-%d: %s\n" % (tagNumber, word))
+            for i in range(20000):
+                f.write("  %s\n" % word)
+            written += 20001 * (len(word) + 3)
+            f.write("Contact-Name: Someone %d\n" % tagNumber)
+            tagNumber += 1
+
+
+def timeit(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print("%-36s %8.3fs" % (label, time.perf_counter() - start))
+    return result
+
+
+def benchParse(megabytes):
+    fd, path = tempfile.mkstemp(prefix="bag-info-", suffix=".txt")
+    os.close(fd)
+    try:
+        makeBagInfo(path, megabytes)
+        print("bag-info.txt: %d bytes" % os.path.getsize(path))
+
+        def readOld():
+            with open(path) as f:
+                return oldReadANVLString(f.read())
+
+        def readString():
+            with open(path) as f:
+                return anvl.readANVLString(f.read())
+
+        def readStream():
+            with open(path) as f:
+                return dict(anvl.readANVLStream(f))
+
+        expected = timeit("original readANVLString", readOld)
+        assert timeit("readANVLString", readString) == expected
+        assert timeit("readANVLStream", readStream) == expected
+    finally:
+        os.remove(path)
+
+
+def benchWrite(kilobytes):
+    word = "Internal sender description "
+    value = (word * (kilobytes * 1024 // len(word) + 1)).strip()
+    tags = {"Internal-Sender-Description": value, "Bag-Size": "1GB"}
+    print("folded value: %d bytes" % len(value))
+
+    # The recursive version needs a frame per output line
+    recursionLimit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(recursionLimit, len(value) // 40))
+    try:
+        expected = timeit("original writeANVLString", oldWriteANVLString, tags)
+    finally:
+        sys.setrecursionlimit(recursionLimit)
+    assert timeit("writeANVLString", anvl.writeANVLString, tags) == expected
+
+    fd, path = tempfile.mkstemp(prefix="bag-info-", suffix=".txt")
+    os.close(fd)
+    try:
+        def writeFile():
+            with open(path, "w") as f:
+                anvl.writeANVL(f, tags)
+
+        timeit("writeANVL to file", writeFile)
+        with open(path) as f:
+            assert f.read() == expected
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=int, default=8)
+    parser.add_argument("--value-kilobytes", type=int, default=256)
+    args = parser.parse_args()
+
+    benchParse(args.megabytes)
+    benchWrite(args.value_kilobytes)
+
+
+if __name__ == "__main__":
+    main()
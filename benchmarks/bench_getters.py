@@ -0,0 +1,70 @@
+"""
+Time the bagatom child lookup helpers and NodeIndex against the
+original per-call XPath string lookups on a 20-field namespaced record.
+
+    python benchmarks/bench_getters.py [--number N]
+"""
+import argparse
+import time
+
+from lxml import etree
+
+from codalib import bagatom
+
+
+FIELDS = ["field%d" % i for i in range(20)]
+RECORD = "<record xmlns='urn:example'>%s</record>" % "".join(
+    "<%s>value %d</%s>" % (field, i, field) for i, field in enumerate(FIELDS)
+)
+
+
+def oldGetValueByName(node, name):
+    """
+    The original getValueByName, kept for comparison.
+    """
+    try:
+        value = node.xpath("*[local-name() = '%s']" % name)[0].text.strip()
+    except IndexError:
+        return None
+    return value
+
+
+def timeit(label, func, number):
+    start = time.perf_counter()
+    for i in range(number):
+        func()
+    elapsed = time.perf_counter() - start
+    print("%-32s %8.3fs  %6.2fus/lookup" % (
+        label, elapsed, elapsed / number / len(FIELDS) * 10 ** 6
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    record = etree.fromstring(RECORD)
+    expected = [oldGetValueByName(record, field) for field in FIELDS]
+    assert [bagatom.getValueByName(record, f) for f in FIELDS] == expected
+
+    def readOld():
+        for field in FIELDS:
+            oldGetValueByName(record, field)
+
+    def readNew():
+        for field in FIELDS:
+            bagatom.getValueByName(record, field)
+
+    def readIndex():
+        index = bagatom.NodeIndex(record)
+        for field in FIELDS:
+            index.getValueByName(field)
+
+    timeit("xpath string per call", readOld, args.number)
+    timeit("getValueByName", readNew, args.number)
+    timeit("NodeIndex (incl. build)", readIndex, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Time xsdatetime.xsDateTime_format_local and current_offset, which look
+offsets up in a table of the timezone's transitions, against
+xsDateTime_format(localize_datetime(dt)) and asking the timezone, for a
+zoneinfo zone (as tzlocal returns) and a pytz one, and check that they
+agree, for random times and for times many to a second, as in a feed.
+
+    python benchmarks/bench_localize.py [--count N] [--tz NAME]
+"""
+import argparse
+from datetime import datetime, timedelta
+import random
+import time
+
+from pytz import timezone
+
+from codalib import xsdatetime
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+
+def naiveTimes(count, seed=0):
+    rnd = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    return [
+        start + timedelta(seconds=rnd.randrange(10 * 365 * 86400),
+                          microseconds=rnd.randrange(10 ** 6))
+        for i in range(count)
+    ]
+
+
+def feedTimes(count, perSecond=20):
+    start = datetime(2015, 1, 1)
+    return [
+        start + timedelta(microseconds=i * 10 ** 6 // perSecond)
+        for i in range(count)
+    ]
+
+
+def timeit(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print("%-44s %8.3fs  %6.2fus/call" % (label, elapsed, elapsed / count * 1e6))
+    return result
+
+
+def compare(label, local_tz, values):
+    print(label)
+    # Build the tables for the years used before timing
+    for dt in values[:1000]:
+        xsdatetime.xsDateTime_format_local(dt, local_tz)
+    expected = timeit(
+        "  xsDateTime_format(localize_datetime())",
+        lambda: [xsdatetime.xsDateTime_format(
+            xsdatetime.localize_datetime(dt, local_tz)) for dt in values],
+        len(values)
+    )
+    result = timeit(
+        "  xsDateTime_format_local()",
+        lambda: [xsdatetime.xsDateTime_format_local(dt, local_tz)
+                 for dt in values],
+        len(values)
+    )
+    assert result == expected
+    count = len(values) // 10
+    timeit("  local_tz.utcoffset(datetime.now())",
+           lambda: [local_tz.utcoffset(datetime.now()) for i in range(count)],
+           count)
+    timeit("  current_offset()",
+           lambda: [xsdatetime.current_offset(local_tz) for i in range(count)],
+           count)
+    naive = feedTimes(len(values))
+    expected = timeit(
+        "  same, 20 per second",
+        lambda: [xsdatetime.xsDateTime_format(
+            xsdatetime.localize_datetime(dt, local_tz)) for dt in naive],
+        len(naive)
+    )
+    result = timeit(
+        "  xsDateTime_format_local(), 20 per second",
+        lambda: [xsdatetime.xsDateTime_format_local(dt, local_tz)
+                 for dt in naive],
+        len(naive)
+    )
+    assert result == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500000)
+    parser.add_argument("--tz", default="America/Chicago")
+    args = parser.parse_args()
+
+    values = naiveTimes(args.count)
+    if ZoneInfo is not None:
+        compare("zoneinfo %s" % args.tz, ZoneInfo(args.tz), values)
+    compare("pytz %s" % args.tz, timezone(args.tz), values)
+
+
+if __name__ == "__main__":
+    main()
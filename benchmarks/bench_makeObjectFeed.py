@@ -0,0 +1,143 @@
+"""
+Compare time and peak Python memory of building a whole feed with
+makeObjectFeed and serializing it, against streaming it with
+writeObjectFeed, for increasing page sizes. tracemalloc does not see
+libxml2's own allocations, so the in-memory tree is larger than shown.
+
+Then count paginator.page() calls and time the feed head (links and
+all) for a middle page of a request with a query string.
+
+    python benchmarks/bench_makeObjectFeed.py [--counts N [N ...]]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+
+from lxml import etree
+
+from codalib import bagatom
+
+
+class QueueEntry(object):
+
+    def __init__(self, i):
+        self.ark = "ark:/67531/coda%d" % i
+        self.oxum = "%d.%d" % (i * 1024, i)
+        self.url_list = "http://example.com/%d/urls" % i
+        self.status = "1"
+        self.harvest_start = datetime(2020, 1, 1, 12, 0, 0)
+        self.harvest_end = datetime(2020, 1, 1, 12, 30, 0)
+        self.queue_position = i
+
+
+class Page(object):
+
+    def __init__(self, object_list):
+        self.object_list = object_list
+
+    def has_previous(self):
+        return False
+
+    def has_next(self):
+        return False
+
+
+class Paginator(object):
+    """
+    A single page paginator that builds its objects lazily, so the
+    objects themselves don't count towards the feed's memory.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.num_pages = 1
+        self.page_range = range(1, 2)
+
+    def page(self, number):
+        return Page(QueueEntry(i) for i in range(self.count))
+
+
+class CountingPaginator(object):
+    """
+    A many-page paginator over empty pages that counts page() calls and
+    sleeps to stand in for the queries a database paginator runs.
+    """
+
+    def __init__(self, num_pages, delay):
+        self.count = num_pages * 20
+        self.num_pages = num_pages
+        self.page_range = range(1, num_pages + 1)
+        self.delay = delay
+        self.calls = 0
+
+    def page(self, number):
+        self.calls += 1
+        time.sleep(self.delay)
+        page = Page([])
+        page.has_previous = lambda: number > 1
+        page.has_next = lambda: number < self.num_pages
+        page.previous_page_number = lambda: number - 1
+        page.next_page_number = lambda: number + 1
+        return page
+
+
+class Request(object):
+    GET = {"status": "1", "sort": ["ark", "date"], "page": "50"}
+    META = {"QUERY_STRING": "status=1&sort=ark&sort=date&page=50"}
+
+
+class NullSink(object):
+
+    def write(self, data):
+        pass
+
+
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-28s %8.3fs  peak %8.1f KiB" % (label, elapsed, peak / 1024.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+",
+                        default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    def args_for(count):
+        return (
+            Paginator(count), bagatom.queueEntryToXML, "APP/queue/", "Queue",
+            "http://localhost:8787"
+        )
+
+    for count in args.counts:
+        print("count=%d" % count)
+        measure("makeObjectFeed + tostring", lambda: etree.tostring(
+            bagatom.makeObjectFeed(*args_for(count), idAttr="ark",
+                                   nameAttr="ark")
+        ))
+        measure("writeObjectFeed", lambda: bagatom.writeObjectFeed(
+            NullSink(), *args_for(count), idAttr="ark", nameAttr="ark"
+        ))
+
+    paginator = CountingPaginator(100, 0.001)
+    number = 1000
+    start = time.perf_counter()
+    for i in range(number):
+        bagatom.makeObjectFeed(
+            paginator, bagatom.queueEntryToXML, "APP/queue/", "Queue",
+            "http://localhost:8787", request=Request(), page=50
+        )
+    elapsed = time.perf_counter() - start
+    print("feed head for page 50: %.1fus/feed, %.1f page() calls/feed" % (
+        elapsed / number * 10 ** 6, paginator.calls / float(number)
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare bagatom.getOxum against the old os.walk/os.stat loop on a
+synthetic deep payload tree, with and without an OxumCache.
+
+    python benchmarks/bench_oxum.py [--depth N] [--fanout N] [--files N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from codalib import bagatom
+
+
+def walkOxum(dataPath):
+    """
+    The original getOxum implementation, kept here for comparison.
+    """
+    fileCount = 0
+    fileSizeTotal = 0
+    for root, dirs, files in os.walk(dataPath):
+        for fileName in files:
+            stats = os.stat(os.path.join(root, fileName))
+            fileSizeTotal += stats.st_size
+            fileCount += 1
+    return "%s.%s" % (fileSizeTotal, fileCount)
+
+
+def makeTree(root, depth, fanout, files):
+    """
+    Build a tree `depth` levels deep with `fanout` subdirectories and
+    `files` small files in every directory.
+    """
+    for i in range(files):
+        with open(os.path.join(root, "file%d" % i), "wb") as f:
+            f.write(b"x" * (i + 1))
+    if depth:
+        for i in range(fanout):
+            subDir = os.path.join(root, "dir%d" % i)
+            os.mkdir(subDir)
+            makeTree(subDir, depth - 1, fanout, files)
+
+
+def timeit(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print("%-28s %8.3fs  %s" % (label, elapsed, result))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--path", help="benchmark an existing tree instead")
+    args = parser.parse_args()
+
+    root = args.path
+    if root is None:
+        root = tempfile.mkdtemp(prefix="oxum-bench-")
+        makeTree(root, args.depth, args.fanout, args.files)
+    try:
+        expected = timeit("os.walk + os.stat", walkOxum, root)
+        for workers in (1, 4, bagatom.DEFAULT_OXUM_WORKERS, 32):
+            result = timeit(
+                "getOxum(workers=%d)" % workers,
+                bagatom.getOxum, root, workers=workers
+            )
+            assert result == expected
+        cachePath = os.path.join(tempfile.gettempdir(), "oxum-bench.json")
+        try:
+            # Backdate the tree so every directory is cacheable
+            if args.path is None:
+                for dirPath, dirs, files in os.walk(root):
+                    os.utime(dirPath, (0, 0))
+            timeit("getOxum(cold cache)", bagatom.getOxum, root,
+                   cachePath=cachePath)
+            result = timeit("getOxum(warm cache)", bagatom.getOxum, root,
+                            cachePath=cachePath)
+            assert result == expected
+        finally:
+            if os.path.exists(cachePath):
+                os.remove(cachePath)
+    finally:
+        if args.path is None:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare util.createPREMISEventBytes and the Atom entries
+_makePREMISEventAtom writes with it against building the same documents
+with lxml and etree.tostring, in events per second, and check that they
+serialize to the same canonical XML.
+
+    python benchmarks/bench_premis.py [--events N]
+"""
+import argparse
+from datetime import datetime
+import time
+
+from lxml import etree
+
+from codalib import util
+
+
+def makeEvents(count):
+    return [
+        {
+            "eventType": "http://purl.org/net/untl/vocabularies/preservationEvents/#fixityCheck",
+            "agentIdentifier": "http://example.com/agents/fixity",
+            "eventDetail": "Fixity check of ark:/67531/coda%d & its payload" % i,
+            "eventOutcome": "http://purl.org/net/untl/vocabularies/eventOutcomes/#success",
+            "eventOutcomeDetail": "%d files checked" % (i % 500),
+            "eventIdentifier": "%032x" % i,
+            "eventDate": datetime(2019, 10, 2, 17, 58, i % 60),
+            "linkObjectList": [("ark:/67531/coda%d" % i, "ark", "source")],
+        }
+        for i in range(count)
+    ]
+
+
+def eventArgs(event):
+    args = dict(event)
+    args["outcomeDetail"] = args.pop("eventOutcomeDetail")
+    return args
+
+
+def lxmlEvent(event):
+    return etree.tostring(util.createPREMISEventXML(**eventArgs(event)))
+
+
+def bytesEvent(event):
+    return util.createPREMISEventBytes(**eventArgs(event))
+
+
+def lxmlAtom(event):
+    return b'<?xml version="1.0"?>\n' + etree.tostring(
+        util._makePREMISEventEntry(**event), pretty_print=True
+    )
+
+
+def bytesAtom(event):
+    return util._makePREMISEventAtom(**event)
+
+
+def timeit(label, func, events):
+    start = time.perf_counter()
+    result = [func(event) for event in events]
+    elapsed = time.perf_counter() - start
+    print("%-36s %8.3fs  %9.0f events/s" % (label, elapsed, len(events) / elapsed))
+    return result
+
+
+def canonical(documents):
+    return [etree.tostring(etree.fromstring(d), method="c14n") for d in documents]
+
+
+def withoutAtomIds(documents):
+    # Each entry gets a fresh uuid1 id and an updated time
+    result = []
+    for document in documents:
+        entry = etree.fromstring(document)
+        for tag in ("title", "id", "updated"):
+            entry.find("{http://www.w3.org/2005/Atom}" + tag).text = ""
+        result.append(etree.tostring(entry, method="c14n"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    events = makeEvents(args.events)
+    expected = timeit("createPREMISEventXML + tostring", lxmlEvent, events)
+    result = timeit("createPREMISEventBytes", bytesEvent, events)
+    assert canonical(result) == canonical(expected)
+    expected = timeit("Atom entry with lxml", lxmlAtom, events)
+    result = timeit("_makePREMISEventAtom", bytesAtom, events)
+    assert withoutAtomIds(result) == withoutAtomIds(expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare bagatom.QueueEntry with AttrDict-wrapped queue dictionaries:
+memory held by N entries, time to build them, attribute reads, a full
+garbage collection over them, and queueEntryToXML.
+
+    python benchmarks/bench_records.py [--entries N]
+"""
+import argparse
+from datetime import datetime
+import gc
+import time
+import tracemalloc
+
+from codalib import bagatom
+
+
+def queueDicts(count):
+    return [
+        {
+            "ark": "ark:/67531/coda%d" % i,
+            "oxum": "%d.%d" % (i * 1024, i % 50),
+            "url_list": "http://example.com/urls/%d.txt" % i,
+            "status": "1",
+            "queue_position": i,
+            "harvest_start": datetime(2015, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+def build(label, factory, dicts):
+    gc.collect()
+    start = time.perf_counter()
+    entries = [factory(d) for d in dicts]
+    elapsed = time.perf_counter() - start
+    del entries
+    gc.collect()
+    tracemalloc.start()
+    entries = [factory(d) for d in dicts]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("%-24s build %7.3fs  %8.1f MiB  %6.0f bytes/entry" % (
+        label, elapsed, size / 2 ** 20, size / len(dicts)))
+    return entries
+
+
+def timeit(label, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    print("%-36s %8.3fs" % (label, time.perf_counter() - start))
+
+
+def readFields(entries):
+    for entry in entries:
+        (entry.ark, entry.oxum, entry.url_list, entry.status,
+         entry.queue_position, entry.harvest_start, entry.harvest_end)
+
+
+def toXML(entries):
+    for entry in entries:
+        bagatom.queueEntryToXML(entry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=200000)
+    args = parser.parse_args()
+
+    dicts = queueDicts(args.entries)
+    for d in dicts:
+        d.setdefault("harvest_end", None)
+    attrDicts = build("AttrDict", bagatom.AttrDict, dicts)
+    records = build("QueueEntry.fromDict", bagatom.QueueEntry.fromDict, dicts)
+
+    timeit("AttrDict attribute reads", readFields, attrDicts)
+    timeit("QueueEntry attribute reads", readFields, records)
+    # AttrDict instances are reference cycles, so the collector has to
+    # trace every one of them
+    timeit("AttrDict gc.collect()", gc.collect)
+    del attrDicts
+    timeit("gc.collect() freeing AttrDicts", gc.collect)
+    timeit("QueueEntry gc.collect()", gc.collect)
+    sample = dicts[:min(len(dicts), 20000)]
+    timeit("queueEntryToXML(AttrDict) x%d" % len(sample), toXML,
+           [bagatom.AttrDict(d) for d in sample])
+    timeit("queueEntryToXML(QueueEntry) x%d" % len(sample), toXML,
+           [bagatom.QueueEntry.fromDict(d) for d in sample])
+
+
+if __name__ == "__main__":
+    main()
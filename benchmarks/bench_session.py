@@ -0,0 +1,87 @@
+"""
+Compare util.doWebRequest with and without a CodaSession against a local
+keep-alive HTTP server, serially and from several threads.
+
+    python benchmarks/bench_session.py [--requests N] [--threads N]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import threading
+import time
+
+from codalib import util
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    content = b"x" * 512
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(self.content)))
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    do_GET = do_PUT = do_POST = respond
+
+
+def timeit(label, requests, threads, func):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda i: func(), range(requests)))
+    else:
+        for i in range(requests):
+            func()
+    elapsed = time.perf_counter() - start
+    print("%-36s %8.3fs  %7.0f req/s" % (label, elapsed, requests / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.status = 200
+    url = "http://127.0.0.1:%d/APP/queue/ark/" % httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    body = b"<entry/>" * 200
+    try:
+        for threads in (1, args.threads):
+            timeit("urlopen GET, %d thread(s)" % threads,
+                   args.requests, threads,
+                   lambda: util.doWebRequest(url))
+            with util.CodaSession() as session:
+                timeit("CodaSession GET, %d thread(s)" % threads,
+                       args.requests, threads,
+                       lambda: util.doWebRequest(url, session=session))
+            timeit("urlopen PUT, %d thread(s)" % threads,
+                   args.requests, threads,
+                   lambda: util.doWebRequest(url, "PUT", data=body))
+            with util.CodaSession() as session:
+                timeit("CodaSession PUT, %d thread(s)" % threads,
+                       args.requests, threads,
+                       lambda: util.doWebRequest(url, "PUT", data=body,
+                                                 session=session))
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
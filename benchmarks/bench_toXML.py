@@ -0,0 +1,125 @@
+"""
+Time nodeToXML and queueEntryToXML, which copy prebuilt element
+templates, against the original element-by-element builders.
+
+    python benchmarks/bench_toXML.py [--number N]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from lxml import etree
+
+from codalib import bagatom
+from codalib.bagatom import (
+    NODE, NODE_NSMAP, QXML, QXML_NSMAP, TIME_FORMAT_STRING
+)
+
+
+class Node(object):
+    node_name = "coda-001"
+    node_url = "http://example.com/node/coda-001/"
+    node_path = "/data/coda-001"
+    node_capacity = 100000000
+    node_size = 54321
+    last_checked = datetime(2020, 1, 1, 12, 0, 0)
+    status = "1"
+
+
+class QueueEntry(object):
+    ark = "ark:/67531/coda1234"
+    oxum = "1394.7"
+    url_list = "http://example.com/urls"
+    status = "1"
+    harvest_start = datetime(2020, 1, 1, 12, 0, 0)
+    harvest_end = "2020-01-01T12:30:00Z"
+    queue_position = 5
+
+
+def oldNodeToXML(nodeObject):
+    """
+    The original nodeToXML, kept for comparison.
+    """
+    nodeObject_status = {'0': 'Inactive', '1': 'Active'}
+    xmlRoot = etree.Element(NODE + "node", nsmap=NODE_NSMAP)
+    nameNode = etree.SubElement(xmlRoot, NODE + "name")
+    nameNode.text = nodeObject.node_name
+    urlNode = etree.SubElement(xmlRoot, NODE + "url")
+    urlNode.text = nodeObject.node_url
+    pathNode = etree.SubElement(xmlRoot, NODE + "path")
+    pathNode.text = nodeObject.node_path
+    capNode = etree.SubElement(xmlRoot, NODE + "capacity")
+    capNode.text = str(nodeObject.node_capacity)
+    sizeNode = etree.SubElement(xmlRoot, NODE + "size")
+    sizeNode.text = str(nodeObject.node_size)
+    if nodeObject.last_checked:
+        checkedNode = etree.SubElement(xmlRoot, NODE + "lastChecked")
+        checkedNode.text = nodeObject.last_checked.strftime(TIME_FORMAT_STRING)
+    statusNode = etree.SubElement(xmlRoot, NODE + "status")
+    if hasattr(nodeObject, 'status'):
+        statusNode.text = nodeObject_status[nodeObject.status]
+    else:
+        statusNode.text = 'Active'
+    return xmlRoot
+
+
+def oldQueueEntryToXML(queueEntry):
+    """
+    The original queueEntryToXML, kept for comparison.
+    """
+    xmlRoot = etree.Element(QXML + "queueEntry", nsmap=QXML_NSMAP)
+    arkTag = etree.SubElement(xmlRoot, QXML + "ark")
+    arkTag.text = queueEntry.ark
+    oxumTag = etree.SubElement(xmlRoot, QXML + "oxum")
+    oxumTag.text = queueEntry.oxum
+    urlListLinkTag = etree.SubElement(xmlRoot, QXML + "urlListLink")
+    urlListLinkTag.text = queueEntry.url_list
+    statusTag = etree.SubElement(xmlRoot, QXML + "status")
+    statusTag.text = queueEntry.status
+    if hasattr(queueEntry, "harvest_start") and queueEntry.harvest_start:
+        startTag = etree.SubElement(xmlRoot, QXML + "start")
+        if isinstance(queueEntry.harvest_start, str):
+            startTag.text = queueEntry.harvest_start
+        else:
+            startTag.text = queueEntry.harvest_start.strftime(
+                TIME_FORMAT_STRING
+            )
+    if hasattr(queueEntry, "harvest_end") and queueEntry.harvest_end:
+        endTag = etree.SubElement(xmlRoot, QXML + "end")
+        if isinstance(queueEntry.harvest_end, str):
+            endTag.text = queueEntry.harvest_end
+        else:
+            endTag.text = queueEntry.harvest_end.strftime(TIME_FORMAT_STRING)
+    positionTag = etree.SubElement(xmlRoot, QXML + "position")
+    positionTag.text = str(queueEntry.queue_position)
+    return xmlRoot
+
+
+def timeit(label, func, obj, number):
+    start = time.perf_counter()
+    for i in range(number):
+        func(obj)
+    elapsed = time.perf_counter() - start
+    print("%-24s %8.3fs  %6.2fus/object" % (
+        label, elapsed, elapsed / number * 10 ** 6
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    pairs = [
+        ("nodeToXML", oldNodeToXML, bagatom.nodeToXML, Node()),
+        ("queueEntryToXML", oldQueueEntryToXML, bagatom.queueEntryToXML,
+         QueueEntry()),
+    ]
+    for name, old, new, obj in pairs:
+        assert etree.tostring(old(obj)) == etree.tostring(new(obj))
+        timeit("original " + name, old, obj, args.number)
+        timeit(name, new, obj, args.number)
+
+
+if __name__ == "__main__":
+    main()
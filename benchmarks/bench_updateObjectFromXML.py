@@ -0,0 +1,77 @@
+"""
+Time syncing many PREMIS event documents into objects, with the mapping
+compiled for every document (updateObjectFromXML with a dict) and
+compiled once (updateObjectsFromXML with a CompiledMapping).
+
+    python benchmarks/bench_updateObjectFromXML.py [--documents N]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from codalib import bagatom, util
+
+
+MAPPING = {
+    "@namespaces": {"premis": util.PREMIS_NAMESPACE},
+    "event_identifier": [
+        "premis:eventIdentifier", "premis:eventIdentifierValue"
+    ],
+    "event_type": "premis:eventType",
+    "event_date_time": "premis:eventDateTime",
+    "event_detail": "premis:eventDetail",
+    "event_outcome": [
+        "premis:eventOutcomeInformation", "premis:eventOutcome"
+    ],
+    "event_outcome_detail": [
+        "premis:eventOutcomeInformation", "premis:eventOutcomeDetail",
+        "premis:eventOutcomeDetailNote"
+    ],
+    "linking_agent_identifier": [
+        "premis:linkingAgentIdentifier", "premis:linkingAgentIdentifierValue"
+    ],
+}
+
+
+class Event(object):
+    pass
+
+
+def timeit(label, func, number):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print("%-36s %8.3fs  %6.2fus/document" % (
+        label, elapsed, elapsed / number * 10 ** 6
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20000)
+    args = parser.parse_args()
+
+    docs = [
+        util.createPREMISEventXML(
+            "fixityCheck", "http://example.com/agent", "detail %d" % i,
+            "success", "took %d seconds" % i,
+            eventDate=datetime(2020, 1, 1),
+        )
+        for i in range(args.documents)
+    ]
+
+    def perDocument():
+        for doc in docs:
+            bagatom.updateObjectFromXML(doc, Event(), MAPPING)
+
+    def compiledOnce():
+        bagatom.updateObjectsFromXML(
+            docs, [Event() for doc in docs], bagatom.CompiledMapping(MAPPING)
+        )
+
+    timeit("updateObjectFromXML(dict)", perDocument, len(docs))
+    timeit("updateObjectsFromXML(compiled)", compiledOnce, len(docs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Upload PREMIS events and queue entries to a local HTTP server with
+util.sendPREMISEvent and util.updateQueue, pretty printed or compact and
+plain or gzipped, and report the bytes each request put on the wire and
+how long it took.  --mbps makes the server hold each request as long as
+its body would take on a link that fast, to stand in for a real network.
+
+    python benchmarks/bench_uploads.py [--count N] [--mbps M]
+"""
+import argparse
+from datetime import datetime
+import gzip
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import threading
+import time
+
+from codalib import util
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        server = self.server
+        server.wireBytes += len(body)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        server.xmlBytes += len(body)
+        if server.mbps:
+            time.sleep(length * 8 / (server.mbps * 1e6))
+        self.send_response(201 if self.command == "POST" else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_POST = do_PUT = respond
+
+
+def queueDict(i):
+    return {
+        "ark": "ark:/67531/coda%d" % i,
+        "oxum": "%d.%d" % (i * 1024, i % 50),
+        "url_list": "http://example.com/urls/%d.txt" % i,
+        "status": "1",
+        "queue_position": i,
+        "harvest_start": datetime(2015, 1, 1),
+    }
+
+
+def sendEvents(url, count, session, **kwargs):
+    for i in range(count):
+        util.sendPREMISEvent(
+            url, "http://example.com/vocab/#ingest", "http://example.com/agent",
+            "Bag ingested into storage from the replication queue",
+            "http://example.com/vocab/#success",
+            linkObjectList=[("ark:/67531/coda%d" % i, "ark", "source")],
+            session=session, **kwargs
+        )
+
+
+def updateQueue(url, count, session, **kwargs):
+    for i in range(count):
+        util.updateQueue(url, queueDict(i), session=session, **kwargs)
+
+
+def measure(label, upload, httpd, count, **kwargs):
+    httpd.wireBytes = httpd.xmlBytes = 0
+    with util.CodaSession(timeout=30) as session:
+        start = time.perf_counter()
+        upload(httpd.url, count, session, **kwargs)
+        elapsed = time.perf_counter() - start
+    print("%-28s %7.0f B/req  %7.0f B xml  %7.3f ms/req" % (
+        label, httpd.wireBytes / count, httpd.xmlBytes / count,
+        elapsed / count * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--mbps", type=float, default=0)
+    args = parser.parse_args()
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.mbps = args.mbps
+    httpd.url = "http://127.0.0.1:%d/" % httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    try:
+        for name, upload in (("events", sendEvents), ("queue", updateQueue)):
+            for pretty_print in (True, False):
+                for compress in (False, True):
+                    label = "%s %s%s" % (
+                        name, "pretty" if pretty_print else "compact",
+                        " gzip" if compress else "")
+                    measure(label, upload, httpd, args.count,
+                            pretty_print=pretty_print, compress=compress)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
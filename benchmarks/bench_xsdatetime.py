@@ -0,0 +1,65 @@
+"""
+Time xsdatetime.xsDateTime_parse and xsDateTime_parse_many against the
+strptime-based parser they fall back to, over a mix of timestamps like
+those in PREMIS and Atom feeds, and check that all give the same results.
+
+    python benchmarks/bench_xsdatetime.py [--count N] [--tz NAME]
+"""
+import argparse
+from datetime import datetime, timedelta
+import random
+import time
+
+from pytz import timezone
+
+from codalib import xsdatetime
+
+
+def timestamps(count, seed=0):
+    rnd = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    forms = [
+        lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        lambda dt: dt.isoformat() + "-05:00",
+        lambda dt: dt.isoformat() + "+00:00",
+        lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-4] + "Z",
+    ]
+    result = []
+    for i in range(count):
+        dt = start + timedelta(seconds=rnd.randrange(10 * 365 * 86400),
+                               microseconds=rnd.randrange(10 ** 6))
+        result.append(forms[i % len(forms)](dt))
+    return result
+
+
+def timeit(label, parse, values, local_tz):
+    start = time.perf_counter()
+    result = [parse(value, local_tz) for value in values]
+    elapsed = time.perf_counter() - start
+    print("%-28s %8.3fs  %9.0f/s" % (label, elapsed, len(values) / elapsed))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--tz", default="US/Central")
+    args = parser.parse_args()
+
+    local_tz = timezone(args.tz)
+    values = timestamps(args.count)
+    expected = timeit("strptime parser", xsdatetime._parse_slow, values, local_tz)
+    result = timeit("xsDateTime_parse", xsdatetime.xsDateTime_parse, values,
+                    local_tz)
+    assert result == expected
+    start = time.perf_counter()
+    result = xsdatetime.xsDateTime_parse_many(values, local_tz)
+    elapsed = time.perf_counter() - start
+    print("%-28s %8.3fs  %9.0f/s" % (
+        "xsDateTime_parse_many", elapsed, len(values) / elapsed))
+    assert result == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,216 @@
 """
 Simple bit of code to implement reading and writing ANVL files
 """
+import io
 
 
 class InvalidANVLRecord(Exception):
     pass
 
 
-def readANVLString(ANVL_string):
+class ANVLMultiDict(dict):
     """
-    Take a string in ANVL format and break it into a dictionary of key/values
+    A dictionary of the last value read for each key, as readANVLString
+    returns, which also keeps every (key, value) pair in file order so
+    repeated keys are not lost.
+
+    Item assignment (and update() and setdefault()) replaces every value
+    of a key and deletion (and pop() and popitem()) removes them all; use
+    add() to append another value for a key.
     """
 
-    ANVLDict = {}
-    ANVLLines = ANVL_string.split("\n")
-    lineCount = len(ANVLLines)
-    index = 0
-    while index < lineCount:
-        line = ANVLLines[index]
+    def __init__(self, pairs=()):
+        dict.__init__(self)
+        self.pairs = []
+        for key, value in pairs:
+            self.add(key, value)
+
+    def add(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.pairs.append((key, value))
+
+    def getlist(self, key):
+        """
+        Return every value of key in file order
+        """
+        return [v for k, v in self.pairs if k == key]
+
+    def allItems(self):
+        """
+        Return all (key, value) pairs in file order, repeats included
+        """
+        return list(self.pairs)
+
+    def __setitem__(self, key, value):
+        if key in self:
+            index = [k for k, v in self.pairs].index(key)
+            self.pairs = [p for p in self.pairs if p[0] != key]
+            self.pairs.insert(index, (key, value))
+        else:
+            self.pairs.append((key, value))
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.pairs = [p for p in self.pairs if p[0] != key]
+
+    def update(self, other=(), **kwargs):
+        if hasattr(other, "keys"):
+            other = [(key, other[key]) for key in other.keys()]
+        for key, value in list(other) + list(kwargs.items()):
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = dict.__getitem__(self, key)
+        del self[key]
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.pairs = [p for p in self.pairs if p[0] != key]
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self.pairs = []
+
+    def copy(self):
+        return type(self)(self.pairs)
+
+    def __reduce__(self):
+        # Rebuilt from the pairs, so copies and unpickled dictionaries
+        # get their own list rather than sharing or replaying this one
+        return type(self), (list(self.pairs),)
+
+
+def readANVLStream(ANVL_lines):
+    """
+    Parse ANVL from a file object or any iterable of lines, yielding
+    (key, value) pairs as each record is completed
+    """
+
+    key = None
+    contentParts = None
+    hasContent = False
+    for lineNumber, line in enumerate(ANVL_lines, 1):
+        if line.endswith("\n"):
+            line = line[:-1]
+        if key is not None:
+            if len(line) and "#" == line[0]:
+                continue
+            if line != line.lstrip():
+                # A continuation line, folded into the current value
+                if hasContent:
+                    contentParts.append(line.lstrip())
+                else:
+                    contentParts = [line.lstrip()]
+                    hasContent = bool(contentParts[0])
+                continue
+            yield key, " ".join(contentParts)
+            key = None
         if not len(line) or not len(line.strip()):
-            index = index + 1
             continue
         if "#" == line[0]:
-            index = index + 1
             continue
         if ":" not in line:
             raise InvalidANVLRecord(
-                "Missing colon in line %d of ANVL record." % (index + 1,)
+                "Missing colon in line %d of ANVL record." % (lineNumber,)
             )
         parts = line.split(":", 1)
         key = parts[0].strip()
-        contentBuffer = parts[1].lstrip()
-        nextIndex = index + 1
-        while nextIndex < lineCount:
-            nextLine = ANVLLines[nextIndex]
-            if len(nextLine) and "#" == nextLine[0]:
-                nextIndex = nextIndex + 1
-                continue
-            if nextLine == nextLine.lstrip():
+        contentParts = [parts[1].lstrip()]
+        hasContent = bool(contentParts[0])
+    if key is not None:
+        yield key, " ".join(contentParts)
+
+
+def readANVLString(ANVL_string, multi=False):
+    """
+    Take a string in ANVL format and break it into a dictionary of key/values
+
+    With multi=True an ANVLMultiDict is returned, which also keeps
+    repeated keys and the order they were read in.
+    """
+
+    if multi:
+        return ANVLMultiDict(readANVLStream(ANVL_string.split("\n")))
+    return dict(readANVLStream(ANVL_string.split("\n")))
+
+
+def _foldLines(text, width=79, firstLineOffset=0):
+    """
+    Yield the lines breakString would produce for text, without the
+    newlines between them
+    """
+
+    textLength = len(text)
+    lineWidth = width - firstLineOffset
+    start = 0
+    while textLength - start >= lineWidth + 1 and lineWidth > 0:
+        # Look for the last single space within the line that has text
+        # on both sides of it; the space starts the following line.
+        end = start + lineWidth + 1
+        index = text.rfind(" ", start + 1, end)
+        while index != -1:
+            if index + 1 < textLength and \
+                    not text[index + 1].isspace() and \
+                    not text[index - 1].isspace():
                 break
-            if contentBuffer:
-                contentBuffer = contentBuffer + " " + nextLine.lstrip()
-            else:
-                contentBuffer = nextLine.lstrip()
-            nextIndex = nextIndex + 1
-        index = nextIndex
-        ANVLDict[key] = contentBuffer
-    return ANVLDict
+            index = text.rfind(" ", start + 1, index)
+        if index == -1:
+            break
+        yield text[start:index]
+        start = index
+        lineWidth = width
+    yield text[start:]
 
 
 def breakString(text, width=79, firstLineOffset=0):
-    originalWidth = width
-    width = width - firstLineOffset
-    if len(text) < width + 1:
-        return text
-    index = width
-    while index > 0:
-        if ' ' == text[index]:
-            if not text[index + 1].isspace() and not \
-                    text[index - 1].isspace():
-                stringPart1 = text[0:index]
-                stringPart2 = text[index:]
-                return "%s\n%s" % (
-                    stringPart1,
-                    breakString(stringPart2, originalWidth)
-                )
-        index = index - 1
-    return text
+    return "\n".join(_foldLines(text, width, firstLineOffset))
+
+
+def _sortedItems(ANVLDict):
+    if isinstance(ANVLDict, ANVLMultiDict):
+        return sorted(ANVLDict.allItems(), key=lambda item: item[0])
+    return sorted(ANVLDict.items(), key=lambda item: item[0])
+
+
+def writeANVL(fileobj, ANVLDict):
+    """
+    Write the key/value pairs of a dictionary to a file object in ANVL
+    format, one folded line at a time. Every value of a repeated key in
+    an ANVLMultiDict is written.
+    """
+    separator = ""
+    for key, value in _sortedItems(ANVLDict):
+        fileobj.write(separator)
+        fileobj.write(key)
+        fileobj.write(": ")
+        lineSeparator = ""
+        for line in _foldLines(value, 79, len(key) + 1):
+            fileobj.write(lineSeparator)
+            fileobj.write(line)
+            lineSeparator = "\n"
+        separator = "\n"
 
 
 def writeANVLString(ANVLDict):
     """
     Take a dictionary and write out they key/value pairs in ANVL format
     """
-    lines = []
-    keys = list(ANVLDict.keys())
-    keys.sort()
-    for key in keys:
-        value = ANVLDict[key]
-        offset = len(key) + 1
-        line = "%s: %s" % (key, breakString(value, 79, offset))
-        lines.append(line)
-    return "\n".join(lines)
+    buffer = io.StringIO()
+    writeANVL(buffer, ANVLDict)
+    return buffer.getvalue()
@@ -0,0 +1,404 @@
+"""
+asyncio counterparts of the web request helpers in codalib.util.
+
+Every coroutine here takes the same arguments as its namesake in
+codalib.util, less `session`, and fails the same way: connection problems
+and timeouts raise urllib.error.URLError and non-2xx responses raise
+urllib.error.HTTPError, so callers can move a loop of uploads onto
+asyncio.gather without touching their error handling.  The `retry`
+arguments take a util.RetryPolicy.  At most CONCURRENCY_LIMIT requests are
+in flight on an event loop at once; the rest wait their turn.
+
+Requests are made with a small HTTP/1.1 client rather than urllib, which
+differs from util in a few ways:
+
+- Redirects are followed as urllib follows them, up to MAX_REDIRECTS.
+- Connecting, and each read or write, gives up after TIMEOUT seconds,
+  where urlopen uses the socket module's default timeout.
+- Proxy settings (http_proxy and the like) are ignored.
+- Each request opens a new connection.
+"""
+import asyncio
+from datetime import datetime
+import http.client
+import io
+import socket
+import ssl
+import time
+import urllib.error
+import urllib.parse
+import weakref
+
+from .util import (_asQueueEntry, _decodeContent, _encodeUpload,
+                   _makePREMISEventAtom, _makeQueueEntryAtom,
+                   _prepareRequest, _writePREMISDebugResponse)
+
+# Most requests an event loop will have open at once
+CONCURRENCY_LIMIT = 16
+# Seconds to wait on connecting, or on any one read or write, before
+# giving up; None waits forever
+TIMEOUT = 300
+# Most redirects followed for one request, as urllib.request allows
+MAX_REDIRECTS = 10
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+class AsyncResponse(object):
+    """
+    The parts of http.client.HTTPResponse the codalib helpers rely on
+    """
+
+    def __init__(self, url, status, reason, headers):
+        self.url = url
+        self.status = status
+        self.code = status
+        self.reason = reason
+        self.msg = reason
+        self.headers = headers
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+def _getSemaphore():
+    """
+    Return the semaphore limiting requests on the running event loop,
+    replacing it if CONCURRENCY_LIMIT has changed
+    """
+
+    loop = asyncio.get_event_loop()
+    limit, semaphore = _semaphores.get(loop, (None, None))
+    if limit != CONCURRENCY_LIMIT:
+        semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+        _semaphores[loop] = (CONCURRENCY_LIMIT, semaphore)
+    return semaphore
+
+
+async def _timed(awaitable):
+    """
+    Await a connection step, raising socket.timeout if it takes longer
+    than TIMEOUT
+    """
+
+    try:
+        return await asyncio.wait_for(awaitable, TIMEOUT)
+    except asyncio.TimeoutError:
+        raise socket.timeout("timed out")
+
+
+async def _readBody(reader, headers):
+    """
+    Read a response body framed by chunks, a length, or connection close
+    """
+
+    if headers.get("Transfer-Encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            sizeLine = await _timed(reader.readline())
+            size = int(sizeLine.split(b";")[0].strip(), 16)
+            if size == 0:
+                # Skip any trailers
+                while (await _timed(reader.readline())) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await _timed(reader.readexactly(size)))
+            await _timed(reader.readline())
+    length = headers.get("Content-Length")
+    if length is not None:
+        return await _timed(reader.readexactly(int(length)))
+    chunks = []
+    while True:
+        chunk = await _timed(reader.read(65536))
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+async def _request(url, method, data, headers):
+    """
+    Send one HTTP/1.1 request on a fresh connection and read the reply,
+    whatever its status
+    """
+
+    parts, path, data, callerHeaders = _prepareRequest(
+        url, method, data, headers
+    )
+    sslContext = None
+    if parts.scheme == "https":
+        sslContext = ssl.create_default_context()
+    port = parts.port or (443 if sslContext else 80)
+
+    requestHeaders = {
+        "Host": parts.netloc.rsplit("@", 1)[-1],
+        "Accept-encoding": "identity",
+        "Connection": "close",
+    }
+    if data is not None:
+        requestHeaders["Content-length"] = str(len(data))
+    requestHeaders.update(callerHeaders)
+    head = "%s %s HTTP/1.1\r\n" % (method, path)
+    head += "".join("%s: %s\r\n" % item for item in requestHeaders.items())
+
+    try:
+        reader, writer = await _timed(asyncio.open_connection(
+            parts.hostname, port, ssl=sslContext
+        ))
+    except OSError as e:
+        raise urllib.error.URLError(e)
+    try:
+        writer.write(head.encode("latin-1") + b"\r\n")
+        if data is not None:
+            writer.write(data)
+        await _timed(writer.drain())
+        statusLine = await _timed(reader.readline())
+        try:
+            version, status, reason = (
+                statusLine.decode("latin-1").rstrip("\r\n") + " "
+            ).split(" ", 2)
+            status = int(status)
+        except ValueError:
+            raise urllib.error.URLError(
+                http.client.BadStatusLine(statusLine)
+            )
+        headerLines = []
+        while True:
+            line = await _timed(reader.readline())
+            headerLines.append(line)
+            if line in (b"\r\n", b"\n", b""):
+                break
+        responseHeaders = http.client.parse_headers(
+            io.BytesIO(b"".join(headerLines))
+        )
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            content = b""
+        else:
+            content = await _readBody(reader, responseHeaders)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        raise urllib.error.URLError(e)
+    finally:
+        writer.close()
+    response = AsyncResponse(url, status, reason.strip(), responseHeaders)
+    return response, _decodeContent(response, content)
+
+
+def _redirectRequest(url, method, headers, response):
+    """
+    Return the request to make in place of one answered with a redirect,
+    as urllib.request.HTTPRedirectHandler would, or None if it isn't one
+    to follow
+    """
+
+    if response.status not in REDIRECT_CODES:
+        return None
+    location = response.headers.get("Location") or response.headers.get("URI")
+    if location is None:
+        return None
+    if not (method in ("GET", "HEAD") or
+            (response.status in (301, 302, 303) and method == "POST")):
+        return None
+    newURL = urllib.parse.urljoin(url, location.replace(" ", "%20"))
+    if urllib.parse.urlsplit(newURL).scheme not in ("http", "https"):
+        return None
+    # A redirected POST is made again as a GET, without its body
+    headers = dict(
+        (key, value) for key, value in headers.items()
+        if key.lower() not in ("content-length", "content-type")
+    )
+    if method == "POST":
+        method = "GET"
+    return urllib.parse.urldefrag(newURL)[0], method, None, headers
+
+
+async def _open(url, method, data, headers):
+    """
+    Make a request, following redirects, and raise HTTPError unless it
+    ends in a 2xx reply
+    """
+
+    for redirects in range(MAX_REDIRECTS + 1):
+        response, content = await _request(url, method, data, headers)
+        redirect = _redirectRequest(url, method, headers, response)
+        if redirect is None:
+            break
+        url, method, data, headers = redirect
+    if not 200 <= response.status < 300:
+        raise urllib.error.HTTPError(
+            response.url, response.status, response.reason, response.headers,
+            io.BytesIO(content)
+        )
+    return response, content
+
+
+async def _retryCall(retry, func, *args, **kwargs):
+    """
+    Await func until it returns, backing off between tries as the
+    RetryPolicy says
+    """
+
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            delay = retry.nextDelay(attempt, started) \
+                if retry.retryable(e) else None
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+async def doWebRequest(url, method="GET", data=None, headers={}):
+    """
+    Coroutine version of util.doWebRequest
+    """
+
+    async with _getSemaphore():
+        return await _open(url, method, data, headers)
+
+
+async def waitForURL(url, max_seconds=None, retry=None):
+    """
+    Coroutine version of util.waitForURL
+    """
+
+    startTime = datetime.now()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response, content = await doWebRequest(url, "HEAD")
+        except urllib.error.URLError:
+            response = None
+        if response is not None and response.getcode() == 200:
+            return
+        timeNow = datetime.now()
+        timePassed = timeNow - startTime
+        if max_seconds and max_seconds < timePassed.seconds:
+            return
+        print("%s: Waiting on URL %s for %s so far" % (str(timeNow), url, timePassed))
+        if retry is None:
+            await asyncio.sleep(30)
+            continue
+        delay = retry.nextDelay(attempt, started)
+        if delay is None:
+            return
+        await asyncio.sleep(delay)
+
+
+async def doWaitWebRequest(url, method="GET", data=None, headers={},
+                           retry=None):
+    """
+    Coroutine version of util.doWaitWebRequest
+    """
+
+    if retry is not None:
+        return await _retryCall(retry, doWebRequest, url, method, data, headers)
+    while True:
+        try:
+            return await doWebRequest(url, method, data, headers)
+        except urllib.error.URLError:
+            await waitForURL(url)
+
+
+async def sendPREMISEvent(webRoot, eventType, agentIdentifier, eventDetail,
+                          eventOutcome, eventOutcomeDetail=None, linkObjectList=[],
+                          eventDate=None, debug=False, eventIdentifier=None,
+                          retry=None, pretty_print=True, compress=False):
+    """
+    Coroutine version of util.sendPREMISEvent
+    """
+
+    atomXMLText = _makePREMISEventAtom(
+        eventType, agentIdentifier, eventDetail, eventOutcome,
+        eventOutcomeDetail, linkObjectList, eventDate, eventIdentifier,
+        pretty_print=pretty_print
+    )
+    if debug:
+        print("Uploading XML to %s\n---\n%s\n---\n" % (webRoot, atomXMLText))
+    body, headers = _encodeUpload(atomXMLText, compress)
+    response = None
+    if retry is not None:
+        response, content = await _retryCall(
+            retry, doWebRequest, webRoot, "POST", data=body, headers=headers
+        )
+    else:
+        try:
+            response, content = await doWebRequest(
+                webRoot, "POST", data=body, headers=headers
+            )
+        except urllib.error.URLError:
+            pass
+    if not response:
+        await waitForURL(webRoot, 60)
+        response, content = await doWebRequest(
+            webRoot, "POST", data=body, headers=headers
+        )
+    if response.code != 201:
+        if debug:
+            _writePREMISDebugResponse(content, response.code)
+        raise Exception(
+            "Error uploading PREMIS Event to %s. Response code is %s" % (
+                webRoot, response.code
+            )
+        )
+    return response, content
+
+
+async def deleteQueue(destinationRoot, queueArk, debug=False, retry=None):
+    """
+    Coroutine version of util.deleteQueue
+    """
+
+    url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + queueArk + "/")
+    response, content = await doWaitWebRequest(url, "DELETE", retry=retry)
+    if response.getcode() != 200:
+        raise Exception(
+            "Error updating queue %s to url %s.  Response code is %s\n%s" %
+            (queueArk, url, response.getcode(), content)
+        )
+
+
+async def updateQueue(destinationRoot, queueDict, debug=False, retry=None,
+                      pretty_print=True, compress=False):
+    """
+    Coroutine version of util.updateQueue
+    """
+
+    attrDict = _asQueueEntry(queueDict)
+    url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + attrDict.ark + "/")
+    uploadXMLText = _makeQueueEntryAtom(destinationRoot, attrDict, pretty_print)
+    if debug:
+        print("Sending XML to %s" % url)
+        print(uploadXMLText)
+    body, headers = _encodeUpload(uploadXMLText, compress)
+    if retry is not None:
+        response, content = await _retryCall(
+            retry, doWebRequest, url, "PUT", data=body, headers=headers
+        )
+    else:
+        try:
+            response, content = await doWebRequest(
+                url, "PUT", data=body, headers=headers
+            )
+        except urllib.error.URLError:
+            # Sleep a few minutes then give it a second shot before dying
+            await asyncio.sleep(300)
+            response, content = await doWebRequest(
+                url, "PUT", data=body, headers=headers
+            )
+    if response.getcode() != 200:
+        raise Exception(
+            "Error updating queue %s to url %s.  Response code is %s\n%s" %
+            (attrDict.ark, url, response.getcode(), content)
+        )
@@ -1,11 +1,26 @@
+import base64
+import copy
+import hashlib
+import io
+import json
 import os
+import re
+import threading
+import time
+import traceback
 import urllib.parse
-from datetime import datetime
+import uuid
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
 
 from lxml import etree
 
 from . import anvl, APP_AUTHOR
-from codalib.xsdatetime import xsDateTime_format, localize_datetime
+from codalib.xsdatetime import xsDateTime_format, xsDateTime_format_local
 
 TIME_FORMAT_STRING = "%Y-%m-%dT%H:%M:%SZ"
 DATE_FORMAT_STRING = "%Y-%m-%d"
@@ -23,6 +38,28 @@ NODE = "{%s}" % NODE_NAMESPACE
 NODE_NSMAP = {"node": NODE_NAMESPACE}
 
 DEFAULT_ARK_NAAN = 67531
+# Number of threads getOxum uses to scan payload directories
+DEFAULT_OXUM_WORKERS = 8
+# Directory for getOxum's per-bag cache files, None disables caching.
+# Like DEFAULT_ARK_NAAN, this may be set at runtime.
+OXUM_CACHE_DIR = None
+# Directories modified this recently (in nanoseconds) are not cached,
+# since a change within the same mtime tick would go unnoticed.
+OXUM_CACHE_RACY_NS = 2 * 10 ** 9
+
+
+def _updatedText(updated):
+    """
+    Format the time for an Atom updated tag, now if updated is None.
+    Naive datetimes are taken as local time, so the xs:datetime value
+    still includes an explicit offset; aware ones keep their own.
+    """
+
+    if updated is None:
+        return xsDateTime_format_local(datetime.now())
+    if updated.tzinfo is None:
+        return xsDateTime_format_local(updated)
+    return xsDateTime_format(updated)
 
 
 def wrapAtom(xml, id, title, author=None, updated=None, author_uri=None,
@@ -46,14 +83,7 @@ def wrapAtom(xml, id, title, author=None, updated=None, author_uri=None,
             href=alt,
             type=alt_type)
 
-    if updated is not None:
-        # If updated is a naive datetime, set its timezone to the local one
-        # So the xs:datetime value will include an explicit offset
-        if updated.tzinfo is None:
-            updated = localize_datetime(updated)
-        updatedTag.text = xsDateTime_format(updated)
-    else:
-        updatedTag.text = xsDateTime_format(localize_datetime(datetime.now()))
+    updatedTag.text = _updatedText(updated)
     if author or author_uri:
         authorTag = etree.SubElement(entryTag, ATOM + "author")
         if author:
@@ -68,46 +98,285 @@ def wrapAtom(xml, id, title, author=None, updated=None, author_uri=None,
     return entryTag
 
 
-def getOxum(dataPath):
+# Characters lxml refuses to put in a text node
+_XML_INCOMPATIBLE = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]"
+)
+
+
+def _isXMLText(text):
+    """
+    Whether text (None for no text) can be written out as lxml would
+    store it
+    """
+    return text is None or (
+        type(text) is str and _XML_INCOMPATIBLE.search(text) is None
+    )
+
+
+def _escapeXMLText(text):
+    """
+    Escape text for an element's content as lxml does
+    """
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    return text
+
+
+def _textElement(name, text):
+    if text is None:
+        return "<%s/>" % (name,)
+    return "<%s>%s</%s>" % (name, _escapeXMLText(text), name)
+
+
+def _wrapAtomText(contentText, id, title, updated=None, depth=0,
+                  pretty_print=True, declareNamespace=True):
+    """
+    Write out the Atom entry wrapAtom builds around XML that has already
+    been serialized as contentText, indented `depth` levels in, the way
+    etree.tostring would.  Returns None if id or title can't be written,
+    for wrapAtom and lxml to deal with.
+    """
+
+    if not (_isXMLText(id) and _isXMLText(title)):
+        return None
+    updatedText = _updatedText(updated)
+    if pretty_print:
+        outer = "\n" + "  " * depth
+        inner = outer + "  "
+        contentIndent = inner + "  "
+    else:
+        outer = inner = contentIndent = ""
+    if declareNamespace:
+        entryTag = '<entry xmlns="%s">' % (ATOM_NAMESPACE,)
+    else:
+        entryTag = "<entry>"
+    return "".join([
+        entryTag,
+        inner, _textElement("title", title),
+        inner, _textElement("id", id),
+        inner, _textElement("updated", updatedText),
+        inner, '<content type="application/xml">',
+        contentIndent, contentText,
+        inner, "</content>",
+        outer, "</entry>",
+    ])
+
+
+def _scanOxumDir(dirPath):
+    """
+    Total up the files directly inside a directory. Returns the byte
+    count, the file count and a list of subdirectories left to scan.
+    Mirrors os.walk: unreadable directories are skipped and symlinked
+    directories are not followed.
+    """
+
+    fileSizeTotal = 0
+    fileCount = 0
+    subDirs = []
+    try:
+        entries = os.scandir(dirPath)
+    except OSError:
+        return fileSizeTotal, fileCount, subDirs
+    with entries:
+        for entry in entries:
+            try:
+                isDir = entry.is_dir()
+            except OSError:
+                isDir = False
+            if isDir:
+                if not entry.is_symlink():
+                    subDirs.append(entry.path)
+                continue
+            fileSizeTotal += entry.stat().st_size
+            fileCount += 1
+    return fileSizeTotal, fileCount, subDirs
+
+
+class OxumCache(object):
+    """
+    A JSON sidecar remembering the byte and file totals of each directory
+    under a payload, keyed by the directory's mtime and inode. Directories
+    whose mtime and inode are unchanged are not listed again.
+
+    Adding, removing or renaming files changes a directory's mtime, but
+    rewriting an existing file in place does not, so such edits are not
+    seen until the directory itself changes.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cachePath, dataPath):
+        self.cachePath = cachePath
+        self.dataPath = os.path.abspath(dataPath)
+        self.cached = {}
+        self.entries = {}
+        self.scanStart = int(time.time() * 10 ** 9)
+        try:
+            with open(cachePath, "r") as f:
+                cacheDict = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(cacheDict, dict):
+            return
+        if cacheDict.get("version") == self.VERSION and \
+                cacheDict.get("root") == self.dataPath:
+            self.cached = cacheDict.get("dirs", {})
+
+    def scanDir(self, dirPath):
+        """
+        A drop-in for _scanOxumDir that answers from the cache when the
+        directory has not changed since it was last scanned.
+        """
+        try:
+            stats = os.stat(dirPath)
+        except OSError:
+            return 0, 0, []
+        key = os.path.relpath(dirPath, self.dataPath)
+        record = self.cached.get(key)
+        if record is not None and record[0] == stats.st_mtime_ns and \
+                record[1] == stats.st_ino:
+            subDirs = [os.path.join(dirPath, name) for name in record[4]]
+            self.entries[key] = record
+            return record[2], record[3], subDirs
+        dirSize, dirCount, subDirs = _scanOxumDir(dirPath)
+        if self.scanStart - stats.st_mtime_ns > OXUM_CACHE_RACY_NS:
+            self.entries[key] = [
+                stats.st_mtime_ns, stats.st_ino, dirSize, dirCount,
+                [os.path.basename(subDir) for subDir in subDirs]
+            ]
+        return dirSize, dirCount, subDirs
+
+    def save(self):
+        """
+        Write the directories seen during this scan back to the sidecar
+        """
+        cacheDict = {
+            "version": self.VERSION,
+            "root": self.dataPath,
+            "dirs": self.entries,
+        }
+        # Named for the thread as well as the process, so concurrent
+        # saves of the same cache don't write over each other's file
+        tempPath = "%s.%d.%d.tmp" % (
+            self.cachePath, os.getpid(), threading.get_ident()
+        )
+        # The cache is only an optimization, so failing to write it
+        # should not fail the oxum calculation.
+        try:
+            with open(tempPath, "w") as f:
+                json.dump(cacheDict, f, separators=(",", ":"))
+            os.replace(tempPath, self.cachePath)
+        except OSError:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+
+
+def getOxumCachePath(dataPath, cacheDir=None):
+    """
+    Return the sidecar file path OXUM_CACHE_DIR (or cacheDir) holds for
+    a payload directory, or None if caching is turned off
+    """
+
+    if cacheDir is None:
+        cacheDir = OXUM_CACHE_DIR
+    if not cacheDir:
+        return None
+    dataPath = os.path.abspath(dataPath)
+    digest = hashlib.sha1(dataPath.encode("utf-8", "surrogateescape"))
+    return os.path.join(cacheDir, "%s.json" % digest.hexdigest())
+
+
+def getOxum(dataPath, workers=None, cachePath=None, cacheDir=None):
     """
     Calculate the oxum for a given path
+
+    Subdirectories are handed out to a pool of `workers` threads
+    (DEFAULT_OXUM_WORKERS by default), so stat calls on network
+    filesystems overlap instead of running one after another.
+
+    With a cachePath (or a cacheDir, or OXUM_CACHE_DIR set), per-directory
+    totals are kept in an OxumCache and only changed directories are
+    listed again.
     """
 
+    if workers is None:
+        workers = DEFAULT_OXUM_WORKERS
+    if cachePath is None:
+        cachePath = getOxumCachePath(dataPath, cacheDir)
+        if cachePath is not None:
+            os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+    cache = None
+    scanDir = _scanOxumDir
+    if cachePath is not None:
+        cache = OxumCache(cachePath, dataPath)
+        scanDir = cache.scanDir
     fileCount = 0
     fileSizeTotal = 0
-    for root, dirs, files in os.walk(dataPath):
-        for fileName in files:
-            fullName = os.path.join(root, fileName)
-            stats = os.stat(fullName)
-            fileSizeTotal += stats.st_size
-            fileCount += 1
+    if workers < 2:
+        pending = [dataPath]
+        while pending:
+            dirSize, dirCount, subDirs = scanDir(pending.pop())
+            fileSizeTotal += dirSize
+            fileCount += dirCount
+            pending.extend(subDirs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(scanDir, dataPath)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dirSize, dirCount, subDirs = future.result()
+                    fileSizeTotal += dirSize
+                    fileCount += dirCount
+                    for subDir in subDirs:
+                        pending.add(executor.submit(scanDir, subDir))
+    if cache is not None:
+        cache.save()
     return "%s.%s" % (fileSizeTotal, fileCount)
 
 
-def getBagTags(bagInfoPath):
+def getBagTags(bagInfoPath, multi=False):
     """
     get bag tags
+
+    With multi=True the tags come back as an anvl.ANVLMultiDict, keeping
+    repeated tags in file order.
     """
+    tagsType = anvl.ANVLMultiDict if multi else dict
     try:
-        bagInfoString = open(bagInfoPath, "r").read()
+        with open(bagInfoPath, "r") as bagInfoFile:
+            bagTags = tagsType(anvl.readANVLStream(bagInfoFile))
     except UnicodeDecodeError:
-        bagInfoString = open(bagInfoPath, "r", encoding="ISO-8859-1").read()
-    bagTags = anvl.readANVLString(bagInfoString)
+        with open(bagInfoPath, "r", encoding="ISO-8859-1") as bagInfoFile:
+            bagTags = tagsType(anvl.readANVLStream(bagInfoFile))
     return bagTags
 
 
-def bagToXML(bagPath, ark_naan=None):
+def bagToXML(bagPath, ark_naan=None, multi=False, oxumCacheDir=None):
     """
     Given a path to a bag, read stuff about it and make an XML file
+
+    With multi=True every occurrence of a repeated bag-info tag gets its
+    own bag:item, in file order.  A missing Payload-Oxum is worked out
+    with getOxum, caching in oxumCacheDir if given.
     """
     # This is so .DEFAULT_ARK_NAAN can be modified
     # at runtime.
     if ark_naan is None:
         ark_naan = DEFAULT_ARK_NAAN
     bagInfoPath = os.path.join(bagPath, "bag-info.txt")
-    bagTags = getBagTags(bagInfoPath)
+    bagTags = getBagTags(bagInfoPath, multi=multi)
     if 'Payload-Oxum' not in bagTags:
-        bagTags['Payload-Oxum'] = getOxum(os.path.join(bagPath, "data"))
+        bagTags['Payload-Oxum'] = getOxum(
+            os.path.join(bagPath, "data"), cacheDir=oxumCacheDir
+        )
     oxumParts = bagTags['Payload-Oxum'].split(".", 1)
     bagName = "ark:/%d/%s" % (ark_naan, os.path.split(bagPath)[1])
     bagSize = oxumParts[0]
@@ -131,7 +400,11 @@ def bagToXML(bagPath, ark_naan=None):
         baggingDate = etree.SubElement(bagXML, BAG + "baggingDate")
         baggingDate.text = bagTags['Bagging-Date']
     bagInfo = etree.SubElement(bagXML, BAG + "bagInfo")
-    for tag, content in bagTags.items():
+    if multi:
+        bagTagItems = bagTags.allItems()
+    else:
+        bagTagItems = bagTags.items()
+    for tag, content in bagTagItems:
         item = etree.SubElement(bagInfo, BAG + "item")
         itemName = etree.SubElement(item, BAG + "name")
         itemName.text = tag
@@ -140,17 +413,169 @@ def bagToXML(bagPath, ark_naan=None):
     return bagXML, bagName
 
 
+class BagCrawlError(Exception):
+    """
+    Raised by bagsToXML at the end of a run when some bags failed and no
+    errors list was given to collect them. The failures are kept in the
+    errors attribute as (bagPath, traceback) pairs.
+    """
+
+    def __init__(self, errors):
+        Exception.__init__(
+            self, "%d bag(s) could not be read: %s" % (
+                len(errors), ", ".join(bagPath for bagPath, _ in errors)
+            )
+        )
+        self.errors = errors
+
+
+def findBags(root):
+    """
+    Return the paths of the bags (directories holding a bagit.txt) at or
+    below root, in sorted order. Bags are not searched for nested bags.
+    """
+
+    bagPaths = []
+    for dirPath, dirs, files in os.walk(root):
+        if "bagit.txt" in files:
+            bagPaths.append(dirPath)
+            dirs[:] = []
+        else:
+            dirs.sort()
+    return bagPaths
+
+
+def _bagToXMLBytes(bagArgs):
+    """
+    Run bagToXML for bagsToXML, in a worker process. Returns the bag
+    path, bag name, serialized XML and error, if any.
+    """
+
+    # The cache directory is passed along because spawned workers don't
+    # inherit settings made at runtime
+    bagPath, ark_naan, multi, oxumCacheDir = bagArgs
+    try:
+        bagXML, bagName = bagToXML(bagPath, ark_naan=ark_naan, multi=multi,
+                                   oxumCacheDir=oxumCacheDir)
+        return bagPath, bagName, etree.tostring(bagXML), None
+    except Exception:
+        return bagPath, None, None, traceback.format_exc()
+
+
+def _bagToXMLBytesAlone(bagArgs):
+    """
+    Run _bagToXMLBytes in a worker process of its own, reporting the bag
+    as failed if the worker dies
+    """
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_bagToXMLBytes, bagArgs).result()
+        except BrokenProcessPool:
+            return bagArgs[0], None, None, traceback.format_exc()
+
+
+def _bagResultsInPool(bagArgs, workers):
+    """
+    Yield _bagToXMLBytes for each of bagArgs, in order, from a pool of
+    `workers` processes. When a worker dies (a crash, or the OOM killer)
+    the pool is started again for the bags that were left.
+    """
+
+    start = 0
+    while start < len(bagArgs):
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_bagToXMLBytes, args) for args in bagArgs[start:]]
+        try:
+            for future in futures:
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    break
+                start += 1
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        if start < len(bagArgs):
+            # Any bag in flight could have taken the pool down, so the
+            # first of them is run alone to see whether it was this one
+            start += 1
+            yield _bagToXMLBytesAlone(bagArgs[start - 1])
+
+
+def bagsToXML(root, workers=None, ark_naan=None, multi=False, errors=None):
+    """
+    Run bagToXML over every bag found below root in a pool of `workers`
+    processes (one per CPU by default), yielding (bagName, xml_bytes)
+    pairs in findBags order as they become ready.
+
+    A bag that fails doesn't stop the run. Its (bagPath, traceback) is
+    appended to errors if a list is given; otherwise a BagCrawlError
+    listing every failure is raised once the other bags are done.
+
+    A bag whose worker process dies is reported the same way, and the
+    pool is restarted for the rest. Bags not yet started are dropped if
+    the caller stops iterating early.
+    """
+
+    if ark_naan is None:
+        ark_naan = DEFAULT_ARK_NAAN
+    if workers is None:
+        workers = os.cpu_count() or 1
+    raiseErrors = errors is None
+    if raiseErrors:
+        errors = []
+    bagArgs = [
+        (bagPath, ark_naan, multi, OXUM_CACHE_DIR)
+        for bagPath in findBags(root)
+    ]
+    if workers < 2:
+        results = map(_bagToXMLBytes, bagArgs)
+    else:
+        results = _bagResultsInPool(bagArgs, workers)
+    try:
+        for bagPath, bagName, xmlBytes, error in results:
+            if error is None:
+                yield bagName, xmlBytes
+            else:
+                errors.append((bagPath, error))
+    finally:
+        if workers >= 2:
+            results.close()
+    if raiseErrors and errors:
+        raise BagCrawlError(errors)
+
+
+# Selects child elements by local name, whatever their namespace
+_CHILDREN_BY_NAME = etree.XPath("*[local-name() = $name]")
+
+
+def _iterChildrenByName(node, name):
+    """
+    Iterate over the child elements of node with the given local name.
+    Elements are searched with lxml's {*} namespace wildcard, which
+    skips compiling and evaluating an XPath; anything else (such as an
+    ElementTree, searched below its root) goes through the precompiled
+    _CHILDREN_BY_NAME.
+    """
+
+    if isinstance(node, etree._Element) and name and "*" not in name:
+        return node.iterchildren("{*}%s" % (name,))
+    return iter(_CHILDREN_BY_NAME(node, name="%s" % (name,)))
+
+
 def getValueByName(node, name):
     """
     A helper function to pull the values out of those annoying namespace
     prefixed tags
     """
 
-    try:
-        value = node.xpath("*[local-name() = '%s']" % name)[0].text.strip()
-    except IndexError:
+    childNode = next(_iterChildrenByName(node, name), None)
+    if childNode is None:
         return None
-    return value
+    return childNode.text.strip()
 
 
 def getNodeByName(node, name):
@@ -164,18 +589,14 @@ def getNodeByName(node, name):
         )
     if not name:
         raise Exception("Unspecified name to find node for.")
-    try:
-        childNode = node.xpath("*[local-name() = '%s']" % name)[0]
-    except IndexError:
-        return None
-    return childNode
+    return next(_iterChildrenByName(node, name), None)
 
 
 def getNodesByName(parent, name):
     """
     Return a list of all of the child nodes matching a given local name
     """
-    childNodes = parent.xpath("*[local-name() = '%s']" % name)
+    childNodes = list(_iterChildrenByName(parent, name))
     return childNodes
 
 
@@ -197,31 +618,132 @@ def getNodeByNameChain(node, chain_list):
     return current_node
 
 
+class NodeIndex(object):
+    """
+    Index the child elements of a node by local name in a single pass,
+    so reading many fields of a record doesn't rescan the children for
+    each one. The index is not updated if the tree changes afterwards.
+    """
+
+    def __init__(self, node):
+        if isinstance(node, etree._ElementTree):
+            # Match the lookup functions, which search below the root
+            node = node.getroot()
+        self.node = node
+        self.children = {}
+        self.childIndexes = {}
+        for child in node.iterchildren(tag=etree.Element):
+            localName = child.tag.rpartition("}")[2]
+            if localName in self.children:
+                self.children[localName].append(child)
+            else:
+                self.children[localName] = [child]
+
+    def getValueByName(self, name):
+        """
+        Same as the getValueByName function, for the indexed node
+        """
+        childNodes = self.children.get(name)
+        if not childNodes:
+            return None
+        return childNodes[0].text.strip()
+
+    def getNodeByName(self, name):
+        """
+        Same as the getNodeByName function, for the indexed node
+        """
+        if not name:
+            raise Exception("Unspecified name to find node for.")
+        childNodes = self.children.get(name)
+        if not childNodes:
+            return None
+        return childNodes[0]
+
+    def getNodesByName(self, name):
+        """
+        Same as the getNodesByName function, for the indexed node
+        """
+        return list(self.children.get(name, ()))
+
+    def getIndexByName(self, name):
+        """
+        Return a NodeIndex for the first child with the given local name,
+        building it the first time it is asked for
+        """
+        if name not in self.childIndexes:
+            childNode = self.getNodeByName(name)
+            if childNode is None:
+                return None
+            self.childIndexes[name] = NodeIndex(childNode)
+        return self.childIndexes[name]
+
+    def getNodeByNameChain(self, chain_list):
+        """
+        Same as the getNodeByNameChain function, indexing each node
+        along the way
+        """
+        current_index = self
+        for current_name in chain_list:
+            child_index = current_index.getIndexByName(current_name)
+            if child_index is None:
+                raise Exception("Unable to find child node %s" % current_name)
+            current_index = child_index
+        return current_index.node
+
+
+def _makeTemplate(tag, nsmap, childTags):
+    """
+    Build an element with empty children, for the *ToXML functions to
+    copy and fill in rather than building the same skeleton every time
+    """
+
+    template = etree.Element(tag, nsmap=nsmap)
+    for childTag in childTags:
+        etree.SubElement(template, childTag)
+    return template
+
+
+# nodeToXML skeletons, keyed by whether there is a lastChecked element
+_NODE_TEMPLATES = dict(
+    (hasChecked, _makeTemplate(NODE + "node", NODE_NSMAP, [
+        NODE + name for name in
+        ["name", "url", "path", "capacity", "size"] +
+        ["lastChecked"] * hasChecked + ["status"]
+    ]))
+    for hasChecked in (False, True)
+)
+# queueEntryToXML skeletons, keyed by whether there are start and end
+# elements
+_QUEUE_ENTRY_TEMPLATES = dict(
+    ((hasStart, hasEnd), _makeTemplate(QXML + "queueEntry", QXML_NSMAP, [
+        QXML + name for name in
+        ["ark", "oxum", "urlListLink", "status"] +
+        ["start"] * hasStart + ["end"] * hasEnd + ["position"]
+    ]))
+    for hasStart in (False, True) for hasEnd in (False, True)
+)
+
+
 def nodeToXML(nodeObject):
     """
     Take a Django node object from our CODA store and make an XML
     representation
     """
     nodeObject_status = {'0': 'Inactive', '1': 'Active'}
-    xmlRoot = etree.Element(NODE + "node", nsmap=NODE_NSMAP)
-    nameNode = etree.SubElement(xmlRoot, NODE + "name")
-    nameNode.text = nodeObject.node_name
-    urlNode = etree.SubElement(xmlRoot, NODE + "url")
-    urlNode.text = nodeObject.node_url
-    pathNode = etree.SubElement(xmlRoot, NODE + "path")
-    pathNode.text = nodeObject.node_path
-    capNode = etree.SubElement(xmlRoot, NODE + "capacity")
-    capNode.text = str(nodeObject.node_capacity)
-    sizeNode = etree.SubElement(xmlRoot, NODE + "size")
-    sizeNode.text = str(nodeObject.node_size)
-    if nodeObject.last_checked:
-        checkedNode = etree.SubElement(xmlRoot, NODE + "lastChecked")
-        checkedNode.text = nodeObject.last_checked.strftime(TIME_FORMAT_STRING)
-    statusNode = etree.SubElement(xmlRoot, NODE + "status")
-    if hasattr(nodeObject, 'status'):
-        statusNode.text = nodeObject_status[nodeObject.status]
+    hasChecked = bool(nodeObject.last_checked)
+    xmlRoot = copy.copy(_NODE_TEMPLATES[hasChecked])
+    xmlRoot[0].text = nodeObject.node_name
+    xmlRoot[1].text = nodeObject.node_url
+    xmlRoot[2].text = nodeObject.node_path
+    xmlRoot[3].text = str(nodeObject.node_capacity)
+    xmlRoot[4].text = str(nodeObject.node_size)
+    if hasChecked:
+        xmlRoot[5].text = nodeObject.last_checked.strftime(TIME_FORMAT_STRING)
+    status = getattr(nodeObject, 'status', None)
+    if status is not None:
+        xmlRoot[-1].text = nodeObject_status[status]
     else:
-        statusNode.text = 'Active'
+        xmlRoot[-1].text = 'Active'
     return xmlRoot
 
 
@@ -230,31 +752,28 @@ def queueEntryToXML(queueEntry):
     Turn an instance of a QueueEntry model into an xml data format
     """
 
-    xmlRoot = etree.Element(QXML + "queueEntry", nsmap=QXML_NSMAP)
-    arkTag = etree.SubElement(xmlRoot, QXML + "ark")
-    arkTag.text = queueEntry.ark
-    oxumTag = etree.SubElement(xmlRoot, QXML + "oxum")
-    oxumTag.text = queueEntry.oxum
-    urlListLinkTag = etree.SubElement(xmlRoot, QXML + "urlListLink")
-    urlListLinkTag.text = queueEntry.url_list
-    statusTag = etree.SubElement(xmlRoot, QXML + "status")
-    statusTag.text = queueEntry.status
-    if hasattr(queueEntry, "harvest_start") and queueEntry.harvest_start:
-        startTag = etree.SubElement(xmlRoot, QXML + "start")
-        if isinstance(queueEntry.harvest_start, str):
-            startTag.text = queueEntry.harvest_start
+    harvestStart = getattr(queueEntry, "harvest_start", None)
+    harvestEnd = getattr(queueEntry, "harvest_end", None)
+    xmlRoot = copy.copy(
+        _QUEUE_ENTRY_TEMPLATES[bool(harvestStart), bool(harvestEnd)]
+    )
+    xmlRoot[0].text = queueEntry.ark
+    xmlRoot[1].text = queueEntry.oxum
+    xmlRoot[2].text = queueEntry.url_list
+    xmlRoot[3].text = queueEntry.status
+    index = 4
+    if harvestStart:
+        if isinstance(harvestStart, str):
+            xmlRoot[index].text = harvestStart
         else:
-            startTag.text = queueEntry.harvest_start.strftime(
-                TIME_FORMAT_STRING
-            )
-    if hasattr(queueEntry, "harvest_end") and queueEntry.harvest_end:
-        endTag = etree.SubElement(xmlRoot, QXML + "end")
-        if isinstance(queueEntry.harvest_end, str):
-            endTag.text = queueEntry.harvest_end
+            xmlRoot[index].text = harvestStart.strftime(TIME_FORMAT_STRING)
+        index += 1
+    if harvestEnd:
+        if isinstance(harvestEnd, str):
+            xmlRoot[index].text = harvestEnd
         else:
-            endTag.text = queueEntry.harvest_end.strftime(TIME_FORMAT_STRING)
-    positionTag = etree.SubElement(xmlRoot, QXML + "position")
-    positionTag.text = str(queueEntry.queue_position)
+            xmlRoot[index].text = harvestEnd.strftime(TIME_FORMAT_STRING)
+    xmlRoot[-1].text = str(queueEntry.queue_position)
     return xmlRoot
 
 
@@ -269,29 +788,132 @@ class AttrDict(dict):
         self.__dict__ = self
 
 
-def makeObjectFeed(
-        paginator, objectToXMLFunction, feedId, title, webRoot,
-        idAttr="id", nameAttr="name", dateAttr=None, request=None, page=1,
-        count=20, author=APP_AUTHOR):
+class _Record(object):
     """
-    Take a list of some kind of object, a conversion function, an id and a
-    title Return XML representing an ATOM feed
+    A fixed set of attributes stored in __slots__, without a per-instance
+    __dict__ (or, unlike AttrDict, a reference cycle).  Subclasses list
+    their fields in __slots__ and give trailing optional ones a default
+    in _defaults.
+    """
+
+    __slots__ = ()
+    _defaults = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = self.__slots__
+        if len(args) > len(fields):
+            raise TypeError("%s takes at most %d fields" % (
+                type(self).__name__, len(fields)))
+        for name, value in zip(fields, args):
+            setattr(self, name, value)
+        for name in fields[len(args):]:
+            if name in kwargs:
+                setattr(self, name, kwargs.pop(name))
+            elif name in self._defaults:
+                setattr(self, name, self._defaults[name])
+            else:
+                raise TypeError("%s is missing field %r" % (
+                    type(self).__name__, name))
+        if kwargs:
+            raise TypeError("%s got unexpected fields %s" % (
+                type(self).__name__, ", ".join(sorted(kwargs))))
+
+    @classmethod
+    def fromDict(cls, values):
+        """
+        Build a record from a dictionary, ignoring keys that aren't fields
+        """
+
+        record = cls.__new__(cls)
+        defaults = cls._defaults
+        for name in cls.__slots__:
+            if name in values:
+                setattr(record, name, values[name])
+            elif name in defaults:
+                setattr(record, name, defaults[name])
+            else:
+                raise TypeError("%s is missing field %r" % (cls.__name__, name))
+        return record
+
+    def asDict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % (name, getattr(self, name)) for name in self.__slots__
+        ))
+
+
+class QueueEntry(_Record):
+    """
+    A queue entry, as queueEntryToXML and util.updateQueue take it
+    """
+
+    __slots__ = ("ark", "oxum", "url_list", "status", "queue_position",
+                 "harvest_start", "harvest_end")
+    _defaults = {"harvest_start": None, "harvest_end": None}
+
+
+class Node(_Record):
+    """
+    A storage node, as nodeToXML takes it.  A status of None reads as
+    active.
+    """
+
+    __slots__ = ("node_name", "node_url", "node_path", "node_capacity",
+                 "node_size", "last_checked", "status")
+    _defaults = {"last_checked": None, "status": None}
+
+
+def _makePageLinkFunction(webRoot, feedId, GETStruct, param="page"):
+    """
+    Return a function giving the feed URL of a page number (or another
+    GET parameter), carrying the rest of the request's GET parameters.
+    Those are encoded once, split around the position of any existing
+    parameter of the same name, which is where the new value goes.
+    """
+
+    before = []
+    after = []
+    if GETStruct:
+        current = before
+        for key, value in GETStruct.items():
+            if key == param:
+                current = after
+                continue
+            current.append((key, value))
+    urlBase = "%s/%s?" % (webRoot, feedId)
+    before = urllib.parse.urlencode(before, doseq=True)
+    after = urllib.parse.urlencode(after, doseq=True)
+
+    def pageLink(pageNumber):
+        query = [before, urllib.parse.urlencode({param: pageNumber}), after]
+        return urlBase + "&".join([part for part in query if part])
+
+    return pageLink
+
+
+def _makeFeedRoot(feedId, title, webRoot, request, author, now=None):
+    """
+    Build an Atom feed element with its id, title, author, updated and
+    self link, ready for navigation links and entries. The feed is updated
+    at now, if given, as wrapAtom treats updated.
     """
 
-    listSize = paginator.count
-    if listSize:
-        object_list = paginator.page(page).object_list
-    else:
-        object_list = []
-    count = int(count)
-    originalId = feedId
-    idParts = feedId.split("?", 1)
-    if len(idParts) == 2:
-        feedId = idParts[0]
-    if request:
-        GETStruct = request.GET
-    else:
-        GETStruct = False
     feedTag = etree.Element(ATOM + "feed", nsmap=ATOM_NSMAP)
     # The id tag is very similar to the 'self' link
     idTag = etree.SubElement(feedTag, ATOM + "id")
@@ -308,7 +930,7 @@ def makeObjectFeed(
         urlTag.text = author.get('uri', 'http://library.unt.edu/')
     # The updated tag is a
     updatedTag = etree.SubElement(feedTag, ATOM + "updated")
-    updatedTag.text = xsDateTime_format(localize_datetime(datetime.now()))
+    updatedTag.text = _updatedText(now)
     # We will always show the link to the current 'self' page
     linkTag = etree.SubElement(feedTag, ATOM + "link")
     linkTag.set("rel", "self")
@@ -320,78 +942,384 @@ def makeObjectFeed(
                 webRoot, feedId, urllib.parse.urlencode(request.GET, doseq=True)
             )
         )
+    return feedTag
+
+
+def _makeFeedHead(paginator, feedId, title, webRoot, request, page, count,
+                  author, now=None):
+    """
+    Build the Atom feed element for a page, minus its entries. Returns
+    the feed element, the page's objects, and the feed id without and
+    with its query string.
+    """
+
+    listSize = paginator.count
+    # Fetch the page once; with a Django paginator every page() call can
+    # cost another COUNT and slice query.
+    pageObject = paginator.page(page)
+    if listSize:
+        object_list = pageObject.object_list
+    else:
+        object_list = []
+    count = int(count)
+    originalId = feedId
+    idParts = feedId.split("?", 1)
+    if len(idParts) == 2:
+        feedId = idParts[0]
+    if request:
+        GETStruct = request.GET
+    else:
+        GETStruct = False
+    pageLink = _makePageLinkFunction(webRoot, feedId, GETStruct)
+    feedTag = _makeFeedRoot(feedId, title, webRoot, request, author, now)
     # We always have a last page
     endLink = etree.SubElement(feedTag, ATOM + "link")
     endLink.set("rel", "last")
-    if GETStruct:
-        endLinkGS = GETStruct.copy()
-    else:
-        endLinkGS = {}
-    endLinkGS.update({"page": paginator.num_pages})
-    endLink.set(
-        "href", "%s/%s?%s" % (
-            webRoot, feedId, urllib.parse.urlencode(endLinkGS, doseq=True)
-        )
-    )
+    endLink.set("href", pageLink(paginator.num_pages))
     # We always have a first page
     startLink = etree.SubElement(feedTag, ATOM + "link")
     startLink.set("rel", "first")
-    if GETStruct:
-        startLinkGS = GETStruct.copy()
-    else:
-        startLinkGS = {}
-    startLinkGS.update({"page": paginator.page_range[0]})
-    startLink.set(
-        "href", "%s/%s?%s" % (
-            webRoot, feedId, urllib.parse.urlencode(startLinkGS, doseq=True)
-        )
-    )
+    startLink.set("href", pageLink(paginator.page_range[0]))
     # Potentially there is a previous page, list it's details
-    if paginator.page(page).has_previous():
+    if pageObject.has_previous():
         prevLink = etree.SubElement(feedTag, ATOM + "link")
         prevLink.set("rel", "previous")
-        if GETStruct:
-            prevLinkGS = GETStruct.copy()
-        else:
-            prevLinkGS = {}
-        prevLinkGS.update(
-            {"page": paginator.page(page).previous_page_number()}
-        )
-        prevLinkText = "%s/%s?%s" % (
-            webRoot, feedId, urllib.parse.urlencode(prevLinkGS, doseq=True)
-        )
-        prevLink.set("href", prevLinkText)
+        prevLink.set("href", pageLink(pageObject.previous_page_number()))
     # Potentially there is a next page, fill in it's details
-    if paginator.page(page).has_next():
+    if pageObject.has_next():
         nextLink = etree.SubElement(feedTag, ATOM + "link")
         nextLink.set("rel", "next")
-        if GETStruct:
-            nextLinkGS = GETStruct.copy()
-        else:
-            nextLinkGS = {}
-        nextLinkGS.update({"page": paginator.page(page).next_page_number()})
-        nextLinkText = "%s/%s?%s" % (
-            webRoot, feedId, urllib.parse.urlencode(nextLinkGS, doseq=True)
-        )
-        nextLink.set("href", nextLinkText)
+        nextLink.set("href", pageLink(pageObject.next_page_number()))
+    return feedTag, object_list, feedId, originalId
+
+
+def _makeFeedEntry(o, objectToXMLFunction, webRoot, feedId, originalId,
+                   idAttr, nameAttr, dateAttr, now=None):
+    """
+    Wrap the XML for one object of a feed in an Atom entry, updated at its
+    dateAttr, or else at now
+    """
+
+    objectXML = objectToXMLFunction(o)
+    dateStamp = None
+    if dateAttr:
+        dateStamp = getattr(o, dateAttr)
+    if dateStamp is None:
+        dateStamp = now
+    althref = feedId.strip('/').split('/')[-1]
+    althref = '%s/%s/%s/' % (
+        webRoot, althref, getattr(o, idAttr)
+    )
+    return wrapAtom(
+        xml=objectXML,
+        id='%s/%s%s/' % (webRoot, originalId, getattr(o, idAttr)),
+        title=getattr(o, nameAttr),
+        updated=dateStamp,
+        alt=althref
+    )
+
+
+def makeObjectFeed(
+        paginator, objectToXMLFunction, feedId, title, webRoot,
+        idAttr="id", nameAttr="name", dateAttr=None, request=None, page=1,
+        count=20, author=APP_AUTHOR, now=None):
+    """
+    Take a list of some kind of object, a conversion function, an id and a
+    title Return XML representing an ATOM feed
+
+    The feed, and every entry without a dateAttr value, is updated at now,
+    a naive local datetime defaulting to the time the feed is made.
+    """
+
+    if now is None:
+        now = datetime.now()
+    feedTag, object_list, feedId, originalId = _makeFeedHead(
+        paginator, feedId, title, webRoot, request, page, count, author, now
+    )
     for o in object_list:
-        objectXML = objectToXMLFunction(o)
-        if dateAttr:
-            dateStamp = getattr(o, dateAttr)
+        feedTag.append(_makeFeedEntry(
+            o, objectToXMLFunction, webRoot, feedId, originalId,
+            idAttr, nameAttr, dateAttr, now
+        ))
+    return feedTag
+
+
+def _streamObjectFeed(
+        output, paginator, objectToXMLFunction, feedId, title, webRoot,
+        idAttr, nameAttr, dateAttr, request, page, count, author, now):
+    """
+    Write a feed to output with etree.xmlfile, yielding after the feed
+    head and after each entry has been flushed.
+    """
+
+    if now is None:
+        now = datetime.now()
+    feedTag, object_list, feedId, originalId = _makeFeedHead(
+        paginator, feedId, title, webRoot, request, page, count, author, now
+    )
+    with etree.xmlfile(output, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element(feedTag.tag, nsmap=feedTag.nsmap):
+            for child in feedTag:
+                xf.write(child)
+            xf.flush()
+            yield
+            for o in object_list:
+                xf.write(_makeFeedEntry(
+                    o, objectToXMLFunction, webRoot, feedId, originalId,
+                    idAttr, nameAttr, dateAttr, now
+                ))
+                xf.flush()
+                yield
+
+
+def writeObjectFeed(
+        output, paginator, objectToXMLFunction, feedId, title, webRoot,
+        idAttr="id", nameAttr="name", dateAttr=None, request=None, page=1,
+        count=20, author=APP_AUTHOR, now=None):
+    """
+    Write the feed makeObjectFeed would build to output, a file-like
+    object or file name, as UTF-8. Entries are built and written one at
+    a time, so memory use doesn't grow with the page size.
+    """
+
+    for _ in _streamObjectFeed(
+            output, paginator, objectToXMLFunction, feedId, title, webRoot,
+            idAttr, nameAttr, dateAttr, request, page, count, author, now):
+        pass
+
+
+def iterObjectFeed(
+        paginator, objectToXMLFunction, feedId, title, webRoot,
+        idAttr="id", nameAttr="name", dateAttr=None, request=None, page=1,
+        count=20, author=APP_AUTHOR, now=None):
+    """
+    Generate the feed makeObjectFeed would build as chunks of UTF-8
+    bytes, one per entry, e.g. for a streaming HTTP response.
+    """
+
+    buffer = io.BytesIO()
+    for _ in _streamObjectFeed(
+            buffer, paginator, objectToXMLFunction, feedId, title, webRoot,
+            idAttr, nameAttr, dateAttr, request, page, count, author, now):
+        chunk = buffer.getvalue()
+        if chunk:
+            buffer.seek(0)
+            buffer.truncate()
+            yield chunk
+    chunk = buffer.getvalue()
+    if chunk:
+        yield chunk
+
+
+class InvalidFeedCursor(Exception):
+    pass
+
+
+def _encodeCursorValue(value):
+    if isinstance(value, datetime):
+        offset = value.utcoffset()
+        if offset is not None:
+            offset = int(offset.total_seconds())
+        return ["datetime", value.strftime("%Y-%m-%dT%H:%M:%S.%f"), offset]
+    if isinstance(value, uuid.UUID):
+        return ["uuid", str(value)]
+    if isinstance(value, Decimal):
+        return ["decimal", str(value)]
+    if isinstance(value, (str, int, float)):
+        return value
+    if value is None:
+        # NULLs sort differently from one database to the next, and no
+        # lookup pages past them
+        raise ValueError("Cannot build a feed cursor from a null key.")
+    raise TypeError("Cannot build a feed cursor from %s." % (type(value),))
+
+
+def _decodeCursorValue(value):
+    if value is None:
+        raise InvalidFeedCursor("Null cursor value.")
+    if not isinstance(value, list):
+        return value
+    if value[:1] == ["datetime"] and len(value) == 3:
+        try:
+            decoded = datetime.strptime(value[1], "%Y-%m-%dT%H:%M:%S.%f")
+            if value[2] is not None:
+                decoded = decoded.replace(
+                    tzinfo=timezone(timedelta(seconds=value[2]))
+                )
+        except (TypeError, ValueError):
+            raise InvalidFeedCursor("Malformed cursor date/time.")
+        return decoded
+    if value[:1] == ["uuid"] and len(value) == 2:
+        try:
+            return uuid.UUID(value[1])
+        except (AttributeError, TypeError, ValueError):
+            raise InvalidFeedCursor("Malformed cursor UUID.")
+    if value[:1] == ["decimal"] and len(value) == 2:
+        try:
+            return Decimal(value[1])
+        except (TypeError, InvalidOperation):
+            raise InvalidFeedCursor("Malformed cursor decimal.")
+    raise InvalidFeedCursor("Unrecognized cursor value.")
+
+
+def encodeFeedCursor(values, direction="next"):
+    """
+    Build the opaque cursor string for the page of a cursor feed after
+    (direction "next") or before (direction "previous") an object with
+    the given key values. Values of None start from the first or last
+    page.
+
+    Key values may be strings, numbers, datetimes, UUIDs or Decimals, but
+    not None; ValueError is raised for a null key and TypeError for any
+    other type.
+    """
+
+    if direction not in ("next", "previous"):
+        raise ValueError("Cursor direction must be 'next' or 'previous'.")
+    if values is not None:
+        values = [_encodeCursorValue(value) for value in values]
+    cursorJSON = json.dumps([direction, values], separators=(",", ":"))
+    cursor = base64.urlsafe_b64encode(cursorJSON.encode("utf-8"))
+    return cursor.decode("ascii").rstrip("=")
+
+
+def decodeFeedCursor(cursor):
+    """
+    Turn a cursor string from encodeFeedCursor back into a
+    (direction, values) pair. Raises InvalidFeedCursor if the cursor
+    can't be read.
+    """
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        cursorJSON = base64.urlsafe_b64decode(cursor + padding)
+        direction, values = json.loads(cursorJSON.decode("utf-8"))
+    except (TypeError, ValueError):
+        raise InvalidFeedCursor("Malformed feed cursor '%s'." % (cursor,))
+    if direction not in ("next", "previous"):
+        raise InvalidFeedCursor("Unrecognized cursor direction.")
+    if values is not None:
+        if not isinstance(values, list):
+            raise InvalidFeedCursor("Unrecognized cursor values.")
+        values = [_decodeCursorValue(value) for value in values]
+    return direction, values
+
+
+def _keysetPage(queryset, keys, values, direction, count, descending):
+    """
+    Fetch up to count objects of a queryset past the key values in the
+    given direction, using the keys as the ordering rather than an
+    offset. Returns the objects in feed order, and whether there were
+    more beyond them.
+    """
+
+    backwards = direction == "previous"
+    # Whether this query walks towards larger keys
+    ascending = descending == backwards
+    if ascending:
+        ordering = list(keys)
+    else:
+        ordering = ["-%s" % key for key in keys]
+    if values is not None:
+        if len(values) != len(keys):
+            raise InvalidFeedCursor("Cursor doesn't match the feed's keys.")
+        past, notPast = ("gt", "lte") if ascending else ("lt", "gte")
+        if len(keys) == 1:
+            queryset = queryset.filter(
+                **{"%s__%s" % (keys[0], past): values[0]}
+            )
         else:
-            dateStamp = None
-        althref = feedId.strip('/').split('/')[-1]
-        althref = '%s/%s/%s/' % (
-            webRoot, althref, getattr(o, idAttr)
-        )
-        objectEntry = wrapAtom(
-            xml=objectXML,
-            id='%s/%s%s/' % (webRoot, originalId, getattr(o, idAttr)),
-            title=getattr(o, nameAttr),
-            updated=dateStamp,
-            alt=althref
-        )
-        feedTag.append(objectEntry)
+            # (date, id) past the cursor: a later date, or the same date
+            # and a later id
+            queryset = queryset.filter(
+                **{"%s__%se" % (keys[0], past): values[0]}
+            ).exclude(**{
+                keys[0]: values[0],
+                "%s__%s" % (keys[1], notPast): values[1],
+            })
+    object_list = list(queryset.order_by(*ordering)[:count + 1])
+    hasMore = len(object_list) > count
+    object_list = object_list[:count]
+    if backwards:
+        object_list.reverse()
+    return object_list, hasMore
+
+
+def makeCursorFeed(
+        queryset, objectToXMLFunction, feedId, title, webRoot,
+        idAttr="id", nameAttr="name", dateAttr=None, request=None,
+        cursor=None, count=20, author=APP_AUTHOR,
+        descending=False, now=None):
+    """
+    Like makeObjectFeed, but paged with keyset cursors instead of page
+    numbers, so deep pages cost the same as the first one.
+
+    The queryset (a Django QuerySet, or anything with filter, exclude,
+    order_by and slicing) is ordered by dateAttr, if given, then idAttr,
+    which must together be unique. The first, last, previous and next
+    links carry an opaque 'cursor' GET parameter built from the keys of
+    the first or last entry; pass it back in as cursor. now is used as in
+    makeObjectFeed.
+
+    Neither key may be null, so filter a nullable dateAttr with __isnull
+    first; ValueError is raised for a page holding a null key. Keys may
+    be strings, numbers, datetimes, UUIDs or Decimals.
+    """
+
+    if now is None:
+        now = datetime.now()
+    count = int(count)
+    if cursor:
+        direction, values = decodeFeedCursor(cursor)
+    else:
+        direction, values = "next", None
+    keys = [idAttr]
+    if dateAttr:
+        keys.insert(0, dateAttr)
+    object_list, hasMore = _keysetPage(
+        queryset, keys, values, direction, count, descending
+    )
+    for o in object_list:
+        for key in keys:
+            if getattr(o, key) is None:
+                raise ValueError(
+                    "Cursor feeds can't page over objects with a null %s."
+                    % (key,)
+                )
+    if direction == "next":
+        hasPrevious, hasNext = values is not None, hasMore
+    else:
+        hasPrevious, hasNext = hasMore, values is not None
+    originalId = feedId
+    feedId = feedId.split("?", 1)[0]
+    if request:
+        GETStruct = request.GET
+    else:
+        GETStruct = False
+    cursorLink = _makePageLinkFunction(
+        webRoot, feedId, GETStruct, param="cursor"
+    )
+    feedTag = _makeFeedRoot(feedId, title, webRoot, request, author, now)
+    links = [
+        ("last", encodeFeedCursor(None, "previous")),
+        ("first", encodeFeedCursor(None, "next")),
+    ]
+    if hasPrevious and object_list:
+        firstValues = [getattr(object_list[0], key) for key in keys]
+        links.append(("previous", encodeFeedCursor(firstValues, "previous")))
+    if hasNext and object_list:
+        lastValues = [getattr(object_list[-1], key) for key in keys]
+        links.append(("next", encodeFeedCursor(lastValues, "next")))
+    for rel, linkCursor in links:
+        linkTag = etree.SubElement(feedTag, ATOM + "link")
+        linkTag.set("rel", rel)
+        linkTag.set("href", cursorLink(linkCursor))
+    for o in object_list:
+        feedTag.append(_makeFeedEntry(
+            o, objectToXMLFunction, webRoot, feedId, originalId,
+            idAttr, nameAttr, dateAttr, now
+        ))
     return feedTag
 
 
@@ -445,45 +1373,88 @@ def addObjectFromXML(xmlObject, XMLToObjectFunc,
     return newObject
 
 
-def updateObjectFromXML(xml_doc, obj, mapping):
+class CompiledMapping(object):
     """
-    Handle updating an object.  Based on XML input.
+    A tag-to-property mapping, as taken by updateObjectFromXML, with its
+    selectors compiled once into etree.XPath objects with the mapping's
+    namespaces bound. Build one to apply the same mapping to many
+    documents.
     """
-    nsmap = None
-    if isinstance(mapping, dict):
-        # The special key @namespaces is used to pass
-        # namespaces and prefix mappings for xpath selectors.
-        # e.g. {'x': 'http://example.com/namespace'}
-        if '@namespaces' in mapping:
-            nsmap = mapping['@namespaces']
-    else:
-        raise TypeError('Tag-to-property map must be a dict.')
-    # Iterate over the keys of the translation dictionary from event objects
-    # to xml objects, so we can update the fields with the new information
-    for k, v in mapping.items():
-        if k.startswith('@'):
-            continue
-        selected_text = None
-        if isinstance(v, str):
-            selector = v
-        elif isinstance(v, list):
-            selector = '/'.join(v)
+
+    def __init__(self, mapping):
+        nsmap = None
+        if isinstance(mapping, dict):
+            # The special key @namespaces is used to pass
+            # namespaces and prefix mappings for xpath selectors.
+            # e.g. {'x': 'http://example.com/namespace'}
+            if '@namespaces' in mapping:
+                nsmap = mapping['@namespaces']
         else:
-            raise TypeError(
-                'Invalid tag-to-property mapping dict: '
-                'values must be strings or lists, not %s.' % (type(v),)
+            raise TypeError('Tag-to-property map must be a dict.')
+        self.selectors = []
+        for k, v in mapping.items():
+            if k.startswith('@'):
+                continue
+            if isinstance(v, str):
+                selector = v
+            elif isinstance(v, list):
+                selector = '/'.join(v)
+            else:
+                raise TypeError(
+                    'Invalid tag-to-property mapping dict: '
+                    'values must be strings or lists, not %s.' % (type(v),)
+                )
+            self.selectors.append(
+                (k, etree.XPath(selector, namespaces=nsmap))
             )
-        try:
-            selected_text = xml_doc.xpath(selector, namespaces=nsmap)
-            if isinstance(selected_text, list):
-                selected_text = selected_text[0]
-            selected_text = selected_text.text
-            setattr(obj, k, selected_text)
-        except IndexError:
-            # Assume the value is missing. It's also possible that the
-            # given selector is valid but wrong, but the more common
-            # case is that the element is missing. To be consistent with
-            # the prior implementation, empty resultsets just mean empty
-            # attributes.
-            continue
-    return obj
+
+    def apply(self, xml_doc, obj):
+        """
+        Set the mapped properties of obj from xml_doc
+        """
+        for k, xpath in self.selectors:
+            try:
+                selected_text = xpath(xml_doc)
+                if isinstance(selected_text, list):
+                    selected_text = selected_text[0]
+                selected_text = selected_text.text
+                setattr(obj, k, selected_text)
+            except IndexError:
+                # Assume the value is missing. It's also possible that the
+                # given selector is valid but wrong, but the more common
+                # case is that the element is missing. To be consistent with
+                # the prior implementation, empty resultsets just mean empty
+                # attributes.
+                continue
+        return obj
+
+
+def updateObjectFromXML(xml_doc, obj, mapping):
+    """
+    Handle updating an object.  Based on XML input.
+
+    The mapping may be a dict or a CompiledMapping.
+    """
+    if not isinstance(mapping, CompiledMapping):
+        mapping = CompiledMapping(mapping)
+    return mapping.apply(xml_doc, obj)
+
+
+def updateObjectsFromXML(docs, objs, compiled_mapping):
+    """
+    Update each object from the XML document at the same position,
+    compiling the mapping only once. Returns the list of objects.
+    Raises ValueError, before updating any, if the counts differ.
+    """
+    docs = list(docs)
+    objs = list(objs)
+    if len(docs) != len(objs):
+        raise ValueError(
+            "%d XML documents given for %d objects" % (len(docs), len(objs))
+        )
+    if not isinstance(compiled_mapping, CompiledMapping):
+        compiled_mapping = CompiledMapping(compiled_mapping)
+    return [
+        compiled_mapping.apply(xml_doc, obj)
+        for xml_doc, obj in zip(docs, objs)
+    ]
@@ -0,0 +1,282 @@
+"""
+A durable outbox for the uploads codalib.util makes to a CODA server.
+
+Outbox.sendPREMISEvent and Outbox.updateQueue build the same Atom
+documents as their namesakes in codalib.util, but only write them to a
+SQLite database and return at once.  Outbox.flush, or the background
+thread Outbox.start runs, delivers them in the order they were recorded,
+backing off while the server is unreachable.  Anything not yet delivered
+is still in the database the next time the outbox is opened.
+
+Only one process should flush a given outbox file at a time.
+"""
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from . import util
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body BLOB,
+    expected_status INTEGER NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+)
+"""
+
+
+class OutboxItem(object):
+    """
+    A recorded upload, as listed by Outbox.failed
+    """
+
+    def __init__(self, id, method, url, body, expected_status, created,
+                 attempts, next_attempt, failed, last_error):
+        self.id = id
+        self.method = method
+        self.url = url
+        self.body = body
+        self.expected_status = expected_status
+        self.created = created
+        self.attempts = attempts
+        self.next_attempt = next_attempt
+        self.failed = bool(failed)
+        self.last_error = last_error
+
+
+class Outbox(object):
+    """
+    Uploads recorded in the SQLite database at `path` and delivered
+    with util.doWebRequest, over `session` if given.
+
+    Failures `retry` (a util.RetryPolicy) considers retryable are tried
+    again after its backoff delay, and nothing later in the outbox is sent
+    until they succeed.  Other failures, and retryable ones past the
+    policy's max_attempts or deadline, are set aside; see failed() and
+    requeueFailed().
+    """
+
+    def __init__(self, path, session=None, retry=None, flush_interval=5):
+        self.path = path
+        self.session = session
+        self.retry = retry or util.RetryPolicy(base_delay=5, max_delay=300)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flushLock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Waits for the background thread, however long a delivery in
+        # progress takes, so the connection isn't closed under it
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def put(self, method, url, data, expected_status):
+        """
+        Record a request to deliver later, returning its id
+        """
+
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (method, url, body, expected_status, created)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (method, url, data, expected_status, time.time())
+            )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def sendPREMISEvent(self, webRoot, eventType, agentIdentifier, eventDetail,
+                        eventOutcome, eventOutcomeDetail=None, linkObjectList=[],
+                        eventDate=None, eventIdentifier=None):
+        """
+        Record an event for util.sendPREMISEvent to have sent
+        """
+
+        atomXMLText = util._makePREMISEventAtom(
+            eventType, agentIdentifier, eventDetail, eventOutcome,
+            eventOutcomeDetail, linkObjectList, eventDate, eventIdentifier
+        )
+        return self.put("POST", webRoot, atomXMLText, 201)
+
+    def updateQueue(self, destinationRoot, queueDict):
+        """
+        Record a queue entry update for util.updateQueue to have sent
+        """
+
+        attrDict = util._asQueueEntry(queueDict)
+        url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + attrDict.ark + "/")
+        uploadXMLText = util._makeQueueEntryAtom(destinationRoot, attrDict)
+        return self.put("PUT", url, uploadXMLText, 200)
+
+    def pending(self):
+        """
+        Count the uploads waiting to be delivered
+        """
+
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE failed = 0"
+            ).fetchone()[0]
+
+    def failed(self):
+        """
+        List the uploads that were set aside, oldest first
+        """
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM outbox WHERE failed = 1 ORDER BY id"
+            ).fetchall()
+        return [OutboxItem(*row) for row in rows]
+
+    def requeueFailed(self):
+        """
+        Give every upload that was set aside a fresh set of attempts
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE outbox SET failed = 0, attempts = 0, next_attempt = 0,"
+                " created = ? WHERE failed = 1", (time.time(),)
+            )
+        self._wake.set()
+
+    def _next(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM outbox WHERE failed = 0 ORDER BY id LIMIT 1"
+            ).fetchone()
+        return row and OutboxItem(*row)
+
+    def _update(self, sql, *args):
+        with self._lock, self._db:
+            self._db.execute(sql, args)
+
+    def _deliver(self, item):
+        """
+        Try to send one upload.  Returns None on success, or the error and
+        whether it is worth retrying.
+        """
+
+        try:
+            response, content = util.doWebRequest(
+                item.url, item.method, data=item.body, session=self.session
+            )
+        except Exception as e:
+            return e, self.retry.retryable(e)
+        if response.getcode() != item.expected_status:
+            return Exception(
+                "Error sending %s to %s. Response code is %s\n%s" % (
+                    item.method, item.url, response.getcode(), content
+                )
+            ), False
+        return None
+
+    def _outOfAttempts(self, item, attempts, now):
+        retry = self.retry
+        if retry.max_attempts is not None and attempts >= retry.max_attempts:
+            return True
+        return retry.deadline is not None and now - item.created >= retry.deadline
+
+    def flush(self):
+        """
+        Deliver what is due, oldest first, stopping at the first upload
+        that has to wait for a retry.  Returns how many were delivered.
+        """
+
+        delivered = 0
+        with self._flushLock:
+            while True:
+                item = self._next()
+                if item is None or item.next_attempt > time.time():
+                    return delivered
+                failure = self._deliver(item)
+                if failure is None:
+                    self._update("DELETE FROM outbox WHERE id = ?", item.id)
+                    delivered += 1
+                    continue
+                error, retryable = failure
+                attempts = item.attempts + 1
+                now = time.time()
+                if not retryable or self._outOfAttempts(item, attempts, now):
+                    self._update(
+                        "UPDATE outbox SET failed = 1, attempts = ?,"
+                        " last_error = ? WHERE id = ?",
+                        attempts, str(error), item.id
+                    )
+                    continue
+                self._update(
+                    "UPDATE outbox SET attempts = ?, next_attempt = ?,"
+                    " last_error = ? WHERE id = ?",
+                    attempts, now + self.retry.delay(attempts), str(error),
+                    item.id
+                )
+                return delivered
+
+    def _run(self):
+        while not self._stopping:
+            # Cleared before flushing so that a put() made meanwhile still
+            # cuts the wait short
+            self._wake.clear()
+            try:
+                self.flush()
+                item = self._next()
+            except sqlite3.Error:
+                # The database is gone or locked; try again next round
+                item = None
+            timeout = self.flush_interval
+            if item is not None:
+                timeout = min(timeout, max(0, item.next_attempt - time.time()))
+            self._wake.wait(timeout)
+
+    def start(self):
+        """
+        Start delivering in a background thread
+        """
+
+        if self._thread is not None and self._stopping:
+            # A stop() that timed out; let that thread finish first
+            self._thread.join()
+            self._thread = None
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="codalib-outbox")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the background thread, letting any delivery in progress
+        finish.  Whatever is left stays in the outbox.  Returns False if
+        the thread was still running after `timeout` seconds.
+        """
+
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+            self._thread = None
+        return True
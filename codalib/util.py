@@ -1,24 +1,46 @@
 from datetime import datetime
+import gzip
 import http.client
+import io
 import json
 import os
+import random
+import sys
 import tempfile
+import threading
 import time
 import urllib.request
 import urllib.error
 import urllib.parse
 import uuid
+import zlib
 
 from lxml import etree
 
 from . import bagatom
-from .xsdatetime import xsDateTime_format
+from .xsdatetime import xsDateTime_format, xsDateTime_format_local
 
 # Not really thrilled about duplicating these globals here -- maybe define them in coda.bagatom?
 PREMIS_NAMESPACE = "info:lc/xmlns/premis-v2"
 PREMIS = "{%s}" % PREMIS_NAMESPACE
 PREMIS_NSMAP = {"premis": PREMIS_NAMESPACE}
 
+# Most events sendPREMISEvents packs into one feed document
+PREMIS_BATCH_SIZE = 100
+# Replies to a feed of events that mean the server doesn't take feeds
+PREMIS_FEED_UNSUPPORTED_STATUSES = (400, 405, 413, 415)
+# gzip level for uploads sent with compress=True
+UPLOAD_GZIP_LEVEL = 6
+# Fixed values createPREMISEventXML puts in every event
+PREMIS_UUID_TYPE = \
+    "http://purl.org/net/untl/vocabularies/identifier-qualifiers/#UUID"
+PREMIS_URL_TYPE = \
+    "http://purl.org/net/untl/vocabularies/identifier-qualifiers/#URL"
+PREMIS_AGENT_ROLE = \
+    "http://purl.org/net/untl/vocabularies/linkingAgentRoles/#executingProgram"
+# User-agent sent by the clients that don't go through urlopen
+USER_AGENT = "Python-urllib/%s.%s" % sys.version_info[:2]
+
 
 def parseVocabularySources(jsonFilePath):
     choiceList = []
@@ -45,17 +67,245 @@ class DELETEREQUEST(urllib.request.Request):
         return "DELETE"
 
 
-def waitForURL(url, max_seconds=None):
+def _prepareRequest(url, method, data, headers, userAgent=USER_AGENT):
+    """
+    Work out what a client other than urlopen sends for a doWebRequest
+    call.  Returns (parts, path, data, headers): the split url, the path
+    and query to request, the body and the request headers.
+    """
+
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise urllib.error.URLError("unknown url type: %s" % parts.scheme)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    # GET and DELETE never carried a body through doWebRequest
+    if method in ("GET", "DELETE"):
+        data = None
+    # Capitalized the way urllib.request.Request does it, so caller
+    # headers replace these defaults rather than doubling them
+    requestHeaders = {"User-agent": userAgent}
+    if data is not None:
+        requestHeaders["Content-type"] = "application/x-www-form-urlencoded"
+    for key, value in headers.items():
+        requestHeaders[key.capitalize()] = value
+    return parts, path, data, requestHeaders
+
+
+class CodaSession(object):
+    """
+    An HTTP client that keeps connections open between requests, pooled
+    per host, so repeated calls to one CODA server skip the TCP and TLS
+    handshakes.  It is safe to share between threads; each request
+    borrows a connection from the pool and returns it when done.
+
+    Pass it as the `session` argument of doWebRequest, updateQueue,
+    deleteQueue, sendPREMISEvent and friends.  Unlike urlopen it does not
+    follow redirects.
+    """
+
+    userAgent = USER_AGENT
+
+    def __init__(self, timeout=None, maxIdlePerHost=8):
+        self.timeout = timeout
+        self.maxIdlePerHost = maxIdlePerHost
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Close every idle connection in the pool
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _getConnection(self, hostKey):
+        """
+        Return (connection, reused), taking an idle connection for the
+        host if there is one
+        """
+
+        with self._lock:
+            connections = self._idle.get(hostKey)
+            if connections:
+                return connections.pop(), True
+        scheme, host, port = hostKey
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(
+                host, port, timeout=self.timeout
+            )
+        else:
+            connection = http.client.HTTPConnection(
+                host, port, timeout=self.timeout
+            )
+        return connection, False
+
+    def _putConnection(self, hostKey, connection):
+        with self._lock:
+            connections = self._idle.setdefault(hostKey, [])
+            if len(connections) < self.maxIdlePerHost:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def doWebRequest(self, url, method="GET", data=None, headers={}):
+        """
+        Make a request over a pooled connection.  Returns and raises the
+        same things util.doWebRequest does.
+        """
+
+        parts, path, data, requestHeaders = _prepareRequest(
+            url, method, data, headers, self.userAgent
+        )
+        hostKey = (parts.scheme, parts.hostname, parts.port)
+
+        while True:
+            connection, reused = self._getConnection(hostKey)
+            try:
+                connection.request(method, path, body=data, headers=requestHeaders)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError) as e:
+                connection.close()
+                # The server dropped an idle connection; try a fresh one
+                if reused:
+                    continue
+                raise urllib.error.URLError(e)
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                raise urllib.error.URLError(e)
+            break
+        if response.will_close:
+            connection.close()
+        else:
+            self._putConnection(hostKey, connection)
+        content = _decodeContent(response, content)
+        if not 200 <= response.status < 300:
+            raise urllib.error.HTTPError(
+                url, response.status, response.reason, response.msg,
+                io.BytesIO(content)
+            )
+        return response, content
+
+
+class RetryPolicy(object):
+    """
+    How the request helpers retry after a failure: exponential backoff
+    from base_delay, capped at max_delay, with up to `jitter` (a fraction)
+    of each delay taken off at random so that workers restarting together
+    don't retry in lockstep.  Retrying stops after max_attempts tries or
+    once `deadline` seconds have passed since the first, whichever comes
+    first; either may be None for no limit.
+
+    Connection failures are always retried.  HTTP errors are retried only
+    when their status is in retry_statuses.
+
+    A policy holds no state of its own, so one can be shared by every
+    call and thread.
+    """
+
+    def __init__(self, base_delay=1, max_delay=60, jitter=1.0,
+                 max_attempts=None, deadline=None,
+                 retry_statuses=(408, 429, 500, 502, 503, 504)):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def delay(self, attempt):
+        """
+        The time to wait after the given (1-based) failed attempt,
+        ignoring the limits
+        """
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if self.jitter:
+            delay -= delay * self.jitter * random.random()
+        return delay
+
+    def nextDelay(self, attempt, started):
+        """
+        The time to wait before trying again after the given failed
+        attempt of an operation begun at time.monotonic() `started`, or
+        None if it shouldn't be tried again
+        """
+
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        delay = self.delay(attempt)
+        if self.deadline is not None:
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                return None
+            delay = min(delay, remaining)
+        return delay
+
+    def wait(self, attempt, started):
+        """
+        Sleep before the next attempt.  Returns False, without sleeping,
+        when there shouldn't be one
+        """
+
+        delay = self.nextDelay(attempt, started)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def retryable(self, error):
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code in self.retry_statuses
+        return isinstance(error, urllib.error.URLError)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func until it returns, re-raising the last error once it
+        isn't worth retrying
+        """
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self.retryable(e) or not self.wait(attempt, started):
+                    raise
+
+
+def waitForURL(url, max_seconds=None, session=None, retry=None):
     """
     Give it a URL.  Keep trying to get a HEAD request from it until it works.
-    If it doesn't work, wait a while and try again
+    If it doesn't work, wait a while and try again, every 30 seconds or as
+    a RetryPolicy says.
     """
 
     startTime = datetime.now()
+    started = time.monotonic()
+    attempt = 0
     while True:
+        attempt += 1
         response = None
         try:
-            response = urllib.request.urlopen(HEADREQUEST(url))
+            if session is None:
+                response = urllib.request.urlopen(HEADREQUEST(url))
+            else:
+                response, content = session.doWebRequest(url, "HEAD")
         except urllib.error.URLError:
             pass
         if response is not None and isinstance(response, http.client.HTTPResponse):
@@ -67,30 +317,48 @@ def waitForURL(url, max_seconds=None):
         if max_seconds and max_seconds < timePassed.seconds:
             return
         print("%s: Waiting on URL %s for %s so far" % (str(timeNow), url, timePassed))
-        time.sleep(30)
+        if retry is None:
+            time.sleep(30)
+        elif not retry.wait(attempt, started):
+            return
 
 
-def doWaitWebRequest(url, method="GET", data=None, headers={}):
+def doWaitWebRequest(url, method="GET", data=None, headers={}, session=None,
+                     retry=None):
     """
-    Same as doWebRequest, but with built in wait-looping
+    Same as doWebRequest, but with built in wait-looping.  Without a
+    RetryPolicy it waits on the URL and tries again for as long as it
+    takes.
     """
 
+    if retry is not None:
+        return retry.call(
+            doWebRequest, url, method, data, headers, session=session
+        )
     completed = False
     while not completed:
         completed = True
         try:
-            response, content = doWebRequest(url, method, data, headers)
+            response, content = doWebRequest(
+                url, method, data, headers, session=session
+            )
         except urllib.error.URLError:
             completed = False
-            waitForURL(url)
+            waitForURL(url, session=session)
     return response, content
 
 
-def doWebRequest(url, method="GET", data=None, headers={}):
+def doWebRequest(url, method="GET", data=None, headers={}, session=None):
     """
-    A urllib wrapper to mimic the functionality of http2lib, but with timeout support
+    A urllib wrapper to mimic the functionality of http2lib, but with timeout support.
+    Goes through the pooled connections of a CodaSession when given one.
+    A body the server gzipped or deflated (if asked to, with an
+    Accept-Encoding header) is returned decoded.
     """
 
+    if session is not None:
+        return session.doWebRequest(url, method, data, headers)
+
     # Initialize variables
     response = None
     content = None
@@ -108,16 +376,56 @@ def doWebRequest(url, method="GET", data=None, headers={}):
         request = urllib.request.Request(url, data=data, headers=headers)
     response = urllib.request.urlopen(request)
     if response:
-        content = response.read()
+        content = _decodeContent(response, response.read())
     return response, content
 
 
-def sendPREMISEvent(webRoot, eventType, agentIdentifier, eventDetail,
-                    eventOutcome, eventOutcomeDetail=None, linkObjectList=[],
-                    eventDate=None, debug=False, eventIdentifier=None):
+def _decodeContent(response, content):
     """
-    A function to format an event to be uploaded and send it to a particular CODA server
-    in order to register it
+    Undo the Content-Encoding of a response body.  Bodies that won't
+    decode raise URLError, like any other garbled response.
+    """
+
+    headers = getattr(response, "headers", None)
+    encoding = headers.get("Content-Encoding") if headers is not None else None
+    if not content or not isinstance(encoding, str):
+        return content
+    encoding = encoding.strip().lower()
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            return gzip.decompress(content)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(content)
+            except zlib.error:
+                # Some servers send a raw deflate stream without the zlib
+                # header
+                return zlib.decompress(content, -zlib.MAX_WBITS)
+    except (OSError, EOFError, zlib.error) as e:
+        raise urllib.error.URLError(e)
+    return content
+
+
+def _encodeUpload(data, compress):
+    """
+    The body and headers to upload data with, gzipped if compress is
+    true, in which case a gzipped response is welcome too
+    """
+
+    if not compress:
+        return data, {}
+    return gzip.compress(data, UPLOAD_GZIP_LEVEL), {
+        "Content-Encoding": "gzip",
+        "Accept-Encoding": "gzip",
+    }
+
+
+def _makePREMISEventEntry(eventType, agentIdentifier, eventDetail,
+                          eventOutcome, eventOutcomeDetail=None,
+                          linkObjectList=[], eventDate=None,
+                          eventIdentifier=None):
+    """
+    Build the Atom entry element that carries an event
     """
 
     atomID = uuid.uuid1().hex
@@ -131,34 +439,156 @@ def sendPREMISEvent(webRoot, eventType, agentIdentifier, eventDetail,
         eventDate=eventDate,
         linkObjectList=linkObjectList
     )
-    atomXML = bagatom.wrapAtom(eventXML, id=atomID, title=atomID)
-    atomXMLText = b'<?xml version="1.0"?>\n%s' % etree.tostring(
-        atomXML, pretty_print=True
+    return bagatom.wrapAtom(eventXML, id=atomID, title=atomID)
+
+
+def _makePREMISEventEntryText(eventType, agentIdentifier, eventDetail,
+                              eventOutcome, eventOutcomeDetail=None,
+                              linkObjectList=[], eventDate=None,
+                              eventIdentifier=None, depth=0, standalone=True,
+                              pretty_print=True):
+    """
+    Write out the Atom entry _makePREMISEventEntry builds, pretty printed
+    `depth` levels in, or return None if only lxml can
+    """
+
+    atomID = uuid.uuid1().hex
+    eventText = _premisEventText(
+        eventType, agentIdentifier, eventDetail, eventOutcome,
+        eventOutcomeDetail, eventIdentifier, linkObjectList, eventDate,
+        depth=depth + 2, pretty_print=pretty_print
+    )
+    if eventText is None:
+        return None
+    return bagatom._wrapAtomText(
+        eventText, id=atomID, title=atomID, depth=depth,
+        pretty_print=pretty_print, declareNamespace=standalone
+    )
+
+
+def _makePREMISEventAtom(eventType, agentIdentifier, eventDetail,
+                         eventOutcome, eventOutcomeDetail, linkObjectList,
+                         eventDate, eventIdentifier, pretty_print=True):
+    """
+    Build the Atom entry document sendPREMISEvent uploads for an event
+    """
+
+    atomText = _makePREMISEventEntryText(
+        eventType, agentIdentifier, eventDetail, eventOutcome,
+        eventOutcomeDetail, linkObjectList, eventDate, eventIdentifier,
+        pretty_print=pretty_print
+    )
+    if atomText is not None:
+        if pretty_print:
+            atomText += "\n"
+        return b'<?xml version="1.0"?>\n%s' % atomText.encode(
+            "ascii", "xmlcharrefreplace"
+        )
+    atomXML = _makePREMISEventEntry(
+        eventType, agentIdentifier, eventDetail, eventOutcome,
+        eventOutcomeDetail, linkObjectList, eventDate, eventIdentifier
+    )
+    return b'<?xml version="1.0"?>\n%s' % etree.tostring(
+        atomXML, pretty_print=pretty_print
+    )
+
+
+def _makePREMISEventFeed(events):
+    """
+    Build an Atom feed document with an entry for each event, where the
+    events are dictionaries of sendPREMISEvent keyword arguments
+    """
+
+    feedID = uuid.uuid1().hex
+    entryTexts = []
+    for event in events:
+        entryText = _makePREMISEventEntryText(depth=1, standalone=False, **event)
+        if entryText is None:
+            break
+        entryTexts.append(entryText)
+    else:
+        element = bagatom._textElement
+        feedText = "".join([
+            '<feed xmlns="%s">' % (bagatom.ATOM_NAMESPACE,),
+            "\n  ", element("title", feedID),
+            "\n  ", element("id", feedID),
+            "\n  ", element("updated", xsDateTime_format_local(datetime.now())),
+        ] + ["\n  " + entryText for entryText in entryTexts] + ["\n</feed>\n"])
+        return b'<?xml version="1.0"?>\n%s' % feedText.encode(
+            "ascii", "xmlcharrefreplace"
+        )
+    feedTag = etree.Element(bagatom.ATOM + "feed", nsmap=bagatom.ATOM_NSMAP)
+    etree.SubElement(feedTag, bagatom.ATOM + "title").text = feedID
+    etree.SubElement(feedTag, bagatom.ATOM + "id").text = feedID
+    etree.SubElement(feedTag, bagatom.ATOM + "updated").text = \
+        xsDateTime_format_local(datetime.now())
+    for event in events:
+        feedTag.append(_makePREMISEventEntry(**event))
+    return b'<?xml version="1.0"?>\n%s' % etree.tostring(
+        feedTag, pretty_print=True
+    )
+
+
+def _writePREMISDebugResponse(content, code):
+    """
+    Save the body of a failed PREMIS event upload to a temporary file
+    and say where it is
+    """
+
+    tempdir = tempfile.gettempdir()
+    tfPath = os.path.join(
+        tempdir, "premis_upload_%s.html" % uuid.uuid1().hex
+    )
+    tf = open(tfPath, "wb")
+    tf.write(content)
+    tf.close()
+    print(
+        "Output from webserver available at %s. Response code %s" % (
+            tf.name, code
+        )
+    )
+
+
+def sendPREMISEvent(webRoot, eventType, agentIdentifier, eventDetail,
+                    eventOutcome, eventOutcomeDetail=None, linkObjectList=[],
+                    eventDate=None, debug=False, eventIdentifier=None,
+                    session=None, retry=None, pretty_print=True,
+                    compress=False):
+    """
+    A function to format an event to be uploaded and send it to a particular CODA server
+    in order to register it.  The XML is sent without indentation if
+    pretty_print is false, and gzipped if compress is true.
+    """
+
+    atomXMLText = _makePREMISEventAtom(
+        eventType, agentIdentifier, eventDetail, eventOutcome,
+        eventOutcomeDetail, linkObjectList, eventDate, eventIdentifier,
+        pretty_print=pretty_print
     )
     if debug:
         print("Uploading XML to %s\n---\n%s\n---\n" % (webRoot, atomXMLText))
+    body, headers = _encodeUpload(atomXMLText, compress)
     response = None
-    try:
-        response, content = doWebRequest(webRoot, "POST", data=atomXMLText)
-    except urllib.error.URLError:
-        pass
+    if retry is not None:
+        response, content = retry.call(
+            doWebRequest, webRoot, "POST", data=body, headers=headers,
+            session=session
+        )
+    else:
+        try:
+            response, content = doWebRequest(
+                webRoot, "POST", data=body, headers=headers, session=session
+            )
+        except urllib.error.URLError:
+            pass
     if not response:
-        waitForURL(webRoot, 60)
-        response, content = doWebRequest(webRoot, "POST", data=atomXMLText)
+        waitForURL(webRoot, 60, session=session)
+        response, content = doWebRequest(
+            webRoot, "POST", data=body, headers=headers, session=session
+        )
     if response.code != 201:
         if debug:
-            tempdir = tempfile.gettempdir()
-            tfPath = os.path.join(
-                tempdir, "premis_upload_%s.html" % uuid.uuid1().hex
-            )
-            tf = open(tfPath, "wb")
-            tf.write(content)
-            tf.close()
-            print(
-                "Output from webserver available at %s. Response code %s" % (
-                    tf.name, response.code
-                )
-            )
+            _writePREMISDebugResponse(content, response.code)
         raise Exception(
             "Error uploading PREMIS Event to %s. Response code is %s" % (
                 webRoot, response.code
@@ -167,6 +597,144 @@ def sendPREMISEvent(webRoot, eventType, agentIdentifier, eventDetail,
     return response, content
 
 
+class PREMISBatchResult(object):
+    """
+    What happened to one batch of events passed to sendPREMISEvents.
+
+    `batched` is True when the server accepted the batch as a single feed.
+    `response` and `content` are from the feed upload, if one was made.
+    `errors` lists an (event, exception) pair for every event in the batch
+    that could not be sent.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.batched = False
+        self.response = None
+        self.content = None
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def sendPREMISEvents(webRoot, events, batch_size=PREMIS_BATCH_SIZE,
+                     debug=False, session=None, retry=None):
+    """
+    Send many events to a CODA server, batch_size at a time, each batch as
+    one Atom feed.  The events are dictionaries of the keyword arguments
+    sendPREMISEvent takes.  Once the server turns down a feed as something
+    it doesn't support (see PREMIS_FEED_UNSUPPORTED_STATUSES), that batch
+    and all later ones are sent one event at a time instead.  Any other
+    error fails only its own batch, after whatever retries `retry` allows.
+
+    Returns a PREMISBatchResult for each batch, in order.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    events = list(events)
+    results = []
+    acceptsFeeds = True
+    for start in range(0, len(events), batch_size):
+        result = PREMISBatchResult(events[start:start + batch_size])
+        results.append(result)
+        feedXMLText = None
+        if acceptsFeeds:
+            try:
+                feedXMLText = _makePREMISEventFeed(result.events)
+            except (TypeError, ValueError):
+                # Some event can't be written out; sending the batch one
+                # event at a time puts the error against that event
+                pass
+        if feedXMLText is not None:
+            if debug:
+                print("Uploading XML to %s\n---\n%s\n---\n" % (webRoot, feedXMLText))
+            try:
+                response, content = _postPREMISFeed(
+                    webRoot, feedXMLText, session, retry
+                )
+            except urllib.error.HTTPError as e:
+                result.response, result.content = e, e.read()
+                if e.code not in PREMIS_FEED_UNSUPPORTED_STATUSES:
+                    # A server error or rate limit, likely to pass; later
+                    # batches still go as feeds
+                    result.errors = [(event, e) for event in result.events]
+                    continue
+            except urllib.error.URLError as e:
+                # The server can't be reached, so sending the events one
+                # by one won't get any further
+                result.errors = [(event, e) for event in result.events]
+                continue
+            else:
+                result.response, result.content = response, content
+                if response.code == 201:
+                    result.batched = True
+                    continue
+            # Turned down, or taken without being created: the server
+            # doesn't understand feeds
+            acceptsFeeds = False
+        for event in result.events:
+            try:
+                sendPREMISEvent(webRoot, debug=debug, session=session,
+                                retry=retry, **event)
+            except Exception as e:
+                result.errors.append((event, e))
+    return results
+
+
+def _postPREMISFeed(webRoot, feedXMLText, session, retry):
+    """
+    POST a feed of events for sendPREMISEvents.  Without a RetryPolicy,
+    an unreachable server is waited on once, as sendPREMISEvent does.
+    """
+
+    if retry is not None:
+        return retry.call(
+            doWebRequest, webRoot, "POST", data=feedXMLText, session=session
+        )
+    try:
+        return doWebRequest(webRoot, "POST", data=feedXMLText, session=session)
+    except urllib.error.URLError as e:
+        # An error response means the server is up; leave it to the caller
+        if isinstance(e, urllib.error.HTTPError):
+            raise
+    waitForURL(webRoot, 60, session=session)
+    return doWebRequest(webRoot, "POST", data=feedXMLText, session=session)
+
+
+class PremisEvent(bagatom._Record):
+    """
+    The fields of a PREMIS event, named as createPREMISEventXML's
+    arguments
+    """
+
+    __slots__ = ("eventType", "agentIdentifier", "eventDetail", "eventOutcome",
+                 "outcomeDetail", "eventIdentifier", "linkObjectList",
+                 "eventDate")
+    _defaults = {"outcomeDetail": None, "eventIdentifier": None,
+                 "linkObjectList": (), "eventDate": None}
+
+
+def _premisEventFields(event):
+    """
+    The fields of a PremisEvent, in createPREMISEventXML's argument order
+    """
+
+    return (event.eventType, event.agentIdentifier, event.eventDetail,
+            event.eventOutcome, event.outcomeDetail, event.eventIdentifier,
+            event.linkObjectList, event.eventDate)
+
+
+def premisEventToXML(event):
+    """
+    Create the PREMIS Event XML for a PremisEvent
+    """
+
+    return createPREMISEventXML(*_premisEventFields(event))
+
+
 def createPREMISEventXML(eventType, agentIdentifier, eventDetail, eventOutcome,
                          outcomeDetail=None, eventIdentifier=None,
                          linkObjectList=[], eventDate=None):
@@ -181,8 +749,7 @@ def createPREMISEventXML(eventType, agentIdentifier, eventDetail, eventOutcome,
     eventIDTypeXML = etree.SubElement(
         eventIDXML, PREMIS + "eventIdentifierType"
     )
-    eventIDTypeXML.text = \
-        "http://purl.org/net/untl/vocabularies/identifier-qualifiers/#UUID"
+    eventIDTypeXML.text = PREMIS_UUID_TYPE
     eventIDValueXML = etree.SubElement(
         eventIDXML, PREMIS + "eventIdentifierValue"
     )
@@ -218,8 +785,7 @@ def createPREMISEventXML(eventType, agentIdentifier, eventDetail, eventOutcome,
     linkAgentIDTypeXML = etree.SubElement(
         linkAgentIDXML, PREMIS + "linkingAgentIdentifierType"
     )
-    linkAgentIDTypeXML.text = \
-        "http://purl.org/net/untl/vocabularies/identifier-qualifiers/#URL"
+    linkAgentIDTypeXML.text = PREMIS_URL_TYPE
     linkAgentIDValueXML = etree.SubElement(
         linkAgentIDXML, PREMIS + "linkingAgentIdentifierValue"
     )
@@ -227,8 +793,7 @@ def createPREMISEventXML(eventType, agentIdentifier, eventDetail, eventOutcome,
     linkAgentIDRoleXML = etree.SubElement(
         linkAgentIDXML, PREMIS + "linkingAgentRole"
     )
-    linkAgentIDRoleXML.text = \
-        "http://purl.org/net/untl/vocabularies/linkingAgentRoles/#executingProgram"
+    linkAgentIDRoleXML.text = PREMIS_AGENT_ROLE
     for linkObject in linkObjectList:
         linkObjectIDXML = etree.SubElement(
             eventXML, PREMIS + "linkingObjectIdentifier"
@@ -249,13 +814,138 @@ def createPREMISEventXML(eventType, agentIdentifier, eventDetail, eventOutcome,
     return eventXML
 
 
-def deleteQueue(destinationRoot, queueArk, debug=False):
+# The parts of a serialized event that never change
+_PREMIS_EVENT_START = '<premis:event xmlns:premis="%s">' % (PREMIS_NAMESPACE,)
+_PREMIS_UUID_TYPE_TEXT = bagatom._textElement(
+    "premis:eventIdentifierType", PREMIS_UUID_TYPE
+)
+_PREMIS_URL_TYPE_TEXT = bagatom._textElement(
+    "premis:linkingAgentIdentifierType", PREMIS_URL_TYPE
+)
+_PREMIS_AGENT_ROLE_TEXT = bagatom._textElement(
+    "premis:linkingAgentRole", PREMIS_AGENT_ROLE
+)
+
+
+def _premisEventText(eventType, agentIdentifier, eventDetail, eventOutcome,
+                     outcomeDetail, eventIdentifier, linkObjectList, eventDate,
+                     depth=0, pretty_print=True):
+    """
+    Write out the event element createPREMISEventXML builds, indented
+    `depth` levels in, the way etree.tostring would.  Returns None if any
+    of the values aren't text lxml would take as it is, leaving them to
+    createPREMISEventXML.
+    """
+
+    if not eventIdentifier:
+        eventIdentifier = uuid.uuid4().hex
+    if eventDate is None:
+        eventDateText = xsDateTime_format(datetime.utcnow())
+    else:
+        eventDateText = xsDateTime_format(eventDate)
+    isXMLText = bagatom._isXMLText
+    if not (isXMLText(eventType) and isXMLText(agentIdentifier)
+            and isXMLText(eventDetail) and isXMLText(eventOutcome)
+            and isXMLText(eventIdentifier) and isXMLText(eventDateText)
+            and (not outcomeDetail or isXMLText(outcomeDetail))):
+        return None
+    for linkObject in linkObjectList:
+        if not (isXMLText(linkObject[0]) and isXMLText(linkObject[1])
+                and (not linkObject[2] or isXMLText(linkObject[2]))):
+            return None
+
+    element = bagatom._textElement
+    if pretty_print:
+        outer = "\n" + "  " * depth
+        inner = outer + "  "
+        inner2 = inner + "  "
+        inner3 = inner2 + "  "
+    else:
+        outer = inner = inner2 = inner3 = ""
+    parts = [
+        _PREMIS_EVENT_START,
+        inner, "<premis:eventIdentifier>",
+        inner2, _PREMIS_UUID_TYPE_TEXT,
+        inner2, element("premis:eventIdentifierValue", eventIdentifier),
+        inner, "</premis:eventIdentifier>",
+        inner, element("premis:eventType", eventType),
+        inner, element("premis:eventDateTime", eventDateText),
+        inner, element("premis:eventDetail", eventDetail),
+        inner, "<premis:eventOutcomeInformation>",
+        inner2, element("premis:eventOutcome", eventOutcome),
+    ]
+    if outcomeDetail:
+        parts += [
+            inner2, "<premis:eventOutcomeDetail>",
+            inner3, element("premis:eventOutcomeDetailNote", outcomeDetail),
+            inner2, "</premis:eventOutcomeDetail>",
+        ]
+    parts += [
+        inner, "</premis:eventOutcomeInformation>",
+        inner, "<premis:linkingAgentIdentifier>",
+        inner2, _PREMIS_URL_TYPE_TEXT,
+        inner2, element("premis:linkingAgentIdentifierValue", agentIdentifier),
+        inner2, _PREMIS_AGENT_ROLE_TEXT,
+        inner, "</premis:linkingAgentIdentifier>",
+    ]
+    for linkObject in linkObjectList:
+        parts += [
+            inner, "<premis:linkingObjectIdentifier>",
+            inner2, element("premis:linkingObjectIdentifierType", linkObject[1]),
+            inner2, element("premis:linkingObjectIdentifierValue", linkObject[0]),
+        ]
+        if linkObject[2]:
+            parts += [inner2, element("premis:linkingObjectRole", linkObject[2])]
+        parts += [inner, "</premis:linkingObjectIdentifier>"]
+    parts += [outer, "</premis:event>"]
+    return "".join(parts)
+
+
+def premisEventToBytes(event, pretty_print=False):
+    """
+    Serialize a PremisEvent as createPREMISEventBytes does
+    """
+
+    return createPREMISEventBytes(*_premisEventFields(event),
+                                  pretty_print=pretty_print)
+
+
+def createPREMISEventBytes(eventType, agentIdentifier, eventDetail,
+                           eventOutcome, outcomeDetail=None,
+                           eventIdentifier=None, linkObjectList=[],
+                           eventDate=None, pretty_print=False):
+    """
+    Serialize a PREMIS Event straight to bytes, the same as
+    etree.tostring(createPREMISEventXML(...), pretty_print=pretty_print)
+    but without building the tree
+    """
+
+    if not eventIdentifier:
+        eventIdentifier = uuid.uuid4().hex
+    eventText = _premisEventText(
+        eventType, agentIdentifier, eventDetail, eventOutcome, outcomeDetail,
+        eventIdentifier, linkObjectList, eventDate, pretty_print=pretty_print
+    )
+    if eventText is None:
+        return etree.tostring(createPREMISEventXML(
+            eventType, agentIdentifier, eventDetail, eventOutcome,
+            outcomeDetail, eventIdentifier, linkObjectList, eventDate
+        ), pretty_print=pretty_print)
+    if pretty_print:
+        eventText += "\n"
+    return eventText.encode("ascii", "xmlcharrefreplace")
+
+
+def deleteQueue(destinationRoot, queueArk, debug=False, session=None,
+                retry=None):
     """
     Delete an entry from the queue
     """
 
     url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + queueArk + "/")
-    response, content = doWaitWebRequest(url, "DELETE")
+    response, content = doWaitWebRequest(
+        url, "DELETE", session=session, retry=retry
+    )
     if response.getcode() != 200:
         raise Exception(
             "Error updating queue %s to url %s.  Response code is %s\n%s" %
@@ -263,29 +953,62 @@ def deleteQueue(destinationRoot, queueArk, debug=False):
         )
 
 
-def updateQueue(destinationRoot, queueDict, debug=False):
+def _asQueueEntry(queueDict):
     """
-    With a dictionary that represents a queue entry, update the queue entry with
-    the values
+    Give attribute access to a queue entry dictionary, passing a
+    bagatom.QueueEntry through as it is
+    """
+
+    if isinstance(queueDict, bagatom.QueueEntry):
+        return queueDict
+    return bagatom.AttrDict(queueDict)
+
+
+def _makeQueueEntryAtom(destinationRoot, attrDict, pretty_print=True):
+    """
+    Build the Atom entry document updateQueue uploads for a queue entry
     """
 
-    attrDict = bagatom.AttrDict(queueDict)
-    url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + attrDict.ark + "/")
     queueXML = bagatom.queueEntryToXML(attrDict)
     urlID = os.path.join(destinationRoot, attrDict.ark)
     uploadXML = bagatom.wrapAtom(queueXML, id=urlID, title=attrDict.ark)
-    uploadXMLText = b'<?xml version="1.0"?>\n' + etree.tostring(
-        uploadXML, pretty_print=True
+    return b'<?xml version="1.0"?>\n' + etree.tostring(
+        uploadXML, pretty_print=pretty_print
     )
+
+
+def updateQueue(destinationRoot, queueDict, debug=False, session=None,
+                retry=None, pretty_print=True, compress=False):
+    """
+    With a dictionary that represents a queue entry, update the queue entry with
+    the values.  A bagatom.QueueEntry may be passed instead of the dictionary.
+    Without a RetryPolicy, a failed upload is tried once more five minutes
+    later.  pretty_print and compress are as for sendPREMISEvent.
+    """
+
+    attrDict = _asQueueEntry(queueDict)
+    url = urllib.parse.urljoin(destinationRoot, "APP/queue/" + attrDict.ark + "/")
+    uploadXMLText = _makeQueueEntryAtom(destinationRoot, attrDict, pretty_print)
     if debug:
         print("Sending XML to %s" % url)
         print(uploadXMLText)
-    try:
-        response, content = doWebRequest(url, "PUT", data=uploadXMLText)
-    except urllib.error.URLError:
-        # Sleep a few minutes then give it a second shot before dying
-        time.sleep(300)
-        response, content = doWebRequest(url, "PUT", data=uploadXMLText)
+    body, headers = _encodeUpload(uploadXMLText, compress)
+    if retry is not None:
+        response, content = retry.call(
+            doWebRequest, url, "PUT", data=body, headers=headers,
+            session=session
+        )
+    else:
+        try:
+            response, content = doWebRequest(
+                url, "PUT", data=body, headers=headers, session=session
+            )
+        except urllib.error.URLError:
+            # Sleep a few minutes then give it a second shot before dying
+            time.sleep(300)
+            response, content = doWebRequest(
+                url, "PUT", data=body, headers=headers, session=session
+            )
     if response.getcode() != 200:
         raise Exception(
             "Error updating queue %s to url %s.  Response code is %s\n%s" %
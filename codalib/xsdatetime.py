@@ -1,6 +1,9 @@
-from datetime import datetime, tzinfo, timedelta
+from bisect import bisect_right
+from datetime import datetime, tzinfo, timedelta, timezone
+import re
 
 from pytz import utc as utc_tz
+from pytz.tzinfo import DstTzInfo
 from tzlocal import get_localzone
 
 # Constants for time parsing/formatting
@@ -34,6 +37,137 @@ class XSDateTimezone(tzinfo):
         return timedelta(0)
 
 
+# The forms of xs:dateTime _parse_fast_parts handles: the fixed-width
+# date and time, up to six digits of fractional seconds, and no offset, Z
+# or +HH:MM
+_XSDT_FAST = re.compile(
+    r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?"
+    r"(?:(Z)|([+-])(\d{2}):(\d{2}))?\Z",
+    re.ASCII
+)
+
+
+# Not in Python 3.6; _parse_fast_parts builds the datetime itself there
+_fromisoformat = getattr(datetime, 'fromisoformat', None)
+_ONE_DAY = timedelta(days=1)
+_ONE_HOUR = timedelta(hours=1)
+_TICK = timedelta(microseconds=1)
+_offset_deltas = {}
+# Cached utcoffsets of local timezones: for each tz, a dict of UTC day
+# ordinals, holding None for days with a transition, and a dict of UTC
+# hours (day ordinal * 24 + hour) used on those days
+_offset_cache = {}
+_OFFSET_CACHE_LIMIT = 100000
+
+
+def _offset_delta(minutes):
+    delta = _offset_deltas.get(minutes)
+    if delta is None:
+        delta = _offset_deltas[minutes] = timedelta(minutes=minutes)
+    return delta
+
+
+def _steady_offset(local_tz, start, length):
+    """
+    The utcoffset of local_tz from UTC start for `length`, or None if it
+    changes along the way
+    """
+    try:
+        offset = utc_tz.localize(start).astimezone(local_tz).utcoffset()
+        end = utc_tz.localize(start + length - _TICK)
+        if end.astimezone(local_tz).utcoffset() == offset:
+            return offset
+    except OverflowError:
+        pass
+    return None
+
+
+def _utc_to_local(utc_dt, local_tz):
+    """
+    Convert a naive UTC datetime to naive local time, as
+    utc_tz.localize(utc_dt).astimezone(local_tz) does.  The offset is
+    cached for each UTC day, or on days when it changes each UTC hour,
+    where it is the same at both ends.
+    """
+    cache = _offset_cache.get(local_tz)
+    if cache is None:
+        if len(_offset_cache) > 64:
+            _offset_cache.clear()
+        cache = _offset_cache[local_tz] = ({}, {})
+    days, hours = cache
+    day = utc_dt.toordinal()
+    offset = days.get(day, False)
+    if offset is False:
+        if len(days) >= _OFFSET_CACHE_LIMIT:
+            days.clear()
+        offset = days[day] = _steady_offset(
+            local_tz, datetime.fromordinal(day), _ONE_DAY
+        )
+    if offset is None:
+        hour = day * 24 + utc_dt.hour
+        offset = hours.get(hour, False)
+        if offset is False:
+            if len(hours) >= _OFFSET_CACHE_LIMIT:
+                hours.clear()
+            offset = hours[hour] = _steady_offset(
+                local_tz, datetime.fromordinal(day) + utc_dt.hour * _ONE_HOUR,
+                _ONE_HOUR
+            )
+        if offset is None:
+            return utc_tz.localize(utc_dt).astimezone(local_tz).replace(tzinfo=None)
+    return utc_dt + offset
+
+
+def _parse_fast_parts(xdt_str):
+    """
+    Parse the forms of xs:dateTime matched by _XSDT_FAST.  Returns the
+    naive datetime as written and the offset in minutes (None if there is
+    none), or None for anything else, to be left to _parse_slow and its
+    error reporting.
+    """
+    match = _XSDT_FAST.match(xdt_str)
+    if match is None:
+        return None
+    head, fraction, zulu, sign, hours, minutes = match.groups()
+    try:
+        if _fromisoformat is not None:
+            if fraction:
+                naive_dt = _fromisoformat(head + '.' + fraction.ljust(6, '0'))
+            else:
+                naive_dt = _fromisoformat(head)
+        else:
+            naive_dt = datetime(
+                int(head[0:4]), int(head[5:7]), int(head[8:10]),
+                int(head[11:13]), int(head[14:16]), int(head[17:19]),
+                int(fraction.ljust(6, '0')) if fraction else 0
+            )
+    except ValueError:
+        return None
+    if zulu:
+        return naive_dt, 0
+    if sign is None:
+        return naive_dt, None
+    offset = int(hours) * 60 + int(minutes)
+    # Out of range offsets fail in _parse_slow
+    if offset >= 24 * 60:
+        return None
+    return naive_dt, -offset if sign == '-' else offset
+
+
+def _parse_fast(xdt_str, local_tz):
+    parts = _parse_fast_parts(xdt_str)
+    if parts is None:
+        return None
+    naive_dt, offset = parts
+    if offset is None:
+        return naive_dt
+    if local_tz is None:
+        local_tz = DEFAULT_LOCAL_TZ
+    if offset:
+        naive_dt -= _offset_delta(offset)
+    return _utc_to_local(naive_dt, local_tz)
+
+
 def xsDateTime_parse(xdt_str, local_tz=None):
     """
     Parses xsDateTime strings of form 2017-01-27T14:58:00+0600, etc.
@@ -43,7 +177,76 @@ def xsDateTime_parse(xdt_str, local_tz=None):
         raise InvalidXSDateTime(
             "Expecting str or unicode, got {}.".format(type(xdt_str))
         )
+    parsed = _parse_fast(xdt_str, local_tz)
+    if parsed is None:
+        parsed = _parse_slow(xdt_str, local_tz)
+    return parsed
+
+
+def xsDateTime_parse_many(xdt_strs, local_tz=None, errors=None):
+    """
+    Parses a sequence of xsDateTime strings as xsDateTime_parse does,
+    returning a list of naive local datetimes in the same order.  Values
+    that can't be parsed come back as None, and if an `errors` list is
+    given an (index, exception) pair is appended to it for each.
+    """
+    if local_tz is None:
+        local_tz = DEFAULT_LOCAL_TZ
+    results = []
+    failures = []
+    # Indexes and values of the strings with offsets, grouped by offset
+    byOffset = {}
+    parse_parts = _parse_fast_parts
+    for index, xdt_str in enumerate(xdt_strs):
+        parts = parse_parts(xdt_str) if isinstance(xdt_str, str) else None
+        if parts is None:
+            try:
+                if not isinstance(xdt_str, str):
+                    raise InvalidXSDateTime(
+                        "Expecting str or unicode, got {}.".format(type(xdt_str))
+                    )
+                results.append(_parse_slow(xdt_str, local_tz))
+            except (InvalidXSDateTime, ValueError, OverflowError) as e:
+                failures.append((index, e))
+                results.append(None)
+            continue
+        naive_dt, offset = parts
+        if offset is None:
+            results.append(naive_dt)
+            continue
+        group = byOffset.get(offset)
+        if group is None:
+            group = byOffset[offset] = ([], [])
+        group[0].append(index)
+        group[1].append(naive_dt)
+        results.append(None)
+    if byOffset:
+        utc_to_local = _utc_to_local
+        # Prime the zone's cache, then read its day table directly
+        utc_to_local(datetime(2000, 1, 1), local_tz)
+        days = _offset_cache[local_tz][0]
+    for offset, (indexes, values) in byOffset.items():
+        delta = _offset_delta(offset)
+        for index, naive_dt in zip(indexes, values):
+            try:
+                utc_dt = naive_dt - delta
+                day_offset = days.get(utc_dt.toordinal())
+                if day_offset is None:
+                    results[index] = utc_to_local(utc_dt, local_tz)
+                else:
+                    results[index] = utc_dt + day_offset
+            except OverflowError as e:
+                failures.append((index, e))
+    if errors is not None:
+        errors.extend(sorted(failures, key=lambda failure: failure[0]))
+    return results
 
+
+def _parse_slow(xdt_str, local_tz=None):
+    """
+    The general parser behind xsDateTime_parse, for everything
+    _parse_fast passes over
+    """
     try:
         # This won't parse the offset (or other tzinfo)
         naive_dt = datetime.strptime(xdt_str[0:XSDT_TZ_OFFSET], XSDT_FMT)
@@ -153,6 +356,153 @@ def xsDateTime_format(xdt):
     return xdt.isoformat()
 
 
+# Wall clock offset tables of local timezones, built a year at a time by
+# _wall_offsets: for each tz, a dict of years holding a sorted list of
+# naive local times and the utcoffset from each one on, where None marks
+# the hours repeated or skipped around a transition
+_wall_offset_cache = {}
+_offset_strs = {}
+
+
+def _transitions(local_tz, start, end):
+    """
+    The UTC instants between naive UTC start and end where the utcoffset
+    of local_tz changes, with the offsets before and after.  Offsets are
+    compared a day apart, so a change that is undone within a day is
+    missed.
+    """
+    def offset_at(utc_dt):
+        return utc_tz.localize(utc_dt).astimezone(local_tz).utcoffset()
+
+    result = []
+    day = start
+    offset = offset_at(day)
+    while day < end:
+        next_day = day + _ONE_DAY
+        next_offset = offset_at(next_day)
+        low, low_offset = day, offset
+        while low_offset != next_offset:
+            high = next_day
+            while high - low > _TICK:
+                middle = low + (high - low) // 2
+                if offset_at(middle) == low_offset:
+                    low = middle
+                else:
+                    high = middle
+            high_offset = offset_at(high)
+            result.append((high, low_offset, high_offset))
+            low, low_offset = high, high_offset
+        day, offset = next_day, next_offset
+    return result
+
+
+def _wall_offsets(local_tz, year):
+    """
+    Build the table of local_tz offsets _local_offset reads for local
+    times in `year`, or None where it can't be built
+    """
+    if not 1 < year < 9999:
+        return None
+    start = datetime(year, 1, 1) - 2 * _ONE_DAY
+    end = datetime(year + 1, 1, 1) + 2 * _ONE_DAY
+    starts = [datetime.min]
+    offsets = [utc_tz.localize(start).astimezone(local_tz).utcoffset()]
+    for instant, before, after in _transitions(local_tz, start, end):
+        gap_start = instant + min(before, after)
+        if gap_start < starts[-1]:
+            # Transitions too close together to tell apart
+            return None
+        starts.append(gap_start)
+        offsets.append(None)
+        starts.append(instant + max(before, after))
+        offsets.append(after)
+    return starts, offsets
+
+
+def _local_offset(dt, local_tz):
+    """
+    The utcoffset local_tz gives naive local time dt, or None if dt is
+    close enough to a transition for it to be ambiguous or skipped, where
+    it is up to local_tz.
+    """
+    years = _wall_offset_cache.get(local_tz)
+    if years is None:
+        if len(_wall_offset_cache) > 64:
+            _wall_offset_cache.clear()
+        years = _wall_offset_cache[local_tz] = {}
+    year = dt.year
+    try:
+        table = years[year]
+    except KeyError:
+        table = years[year] = _wall_offsets(local_tz, year)
+    if table is None:
+        return None
+    starts, offsets = table
+    return offsets[bisect_right(starts, dt) - 1]
+
+
+def _offset_str(offset):
+    """
+    The suffix isoformat() gives a datetime with the utcoffset `offset`
+    """
+    offset_str = _offset_strs.get(offset)
+    if offset_str is None:
+        offset_str = _offset_strs[offset] = datetime(
+            2000, 1, 1, tzinfo=timezone(offset)
+        ).isoformat()[XSDT_TZ_OFFSET:]
+    return offset_str
+
+
+# The strings xsDateTime_format_local gives naive datetimes, split into
+# the date and time to the second and the offset, by date, time to the
+# second, fold and timezone.  Offsets are taken to hold for a whole second.
+_format_cache = {}
+_FORMAT_CACHE_LIMIT = 10000
+
+
+def xsDateTime_format_local(dt, local_tz=None):
+    """
+    Takes a naive local datetime and returns it as an xs:datetime string
+    with its offset, like xsDateTime_format(localize_datetime(dt)), looking
+    the offset up in a table of the timezone's transitions.  What it gives
+    for each second is kept, so times in the same second only need their
+    microseconds formatted.
+    """
+    if local_tz is None:
+        local_tz = DEFAULT_LOCAL_TZ
+    if type(dt) is not datetime or dt.tzinfo is not None:
+        return xsDateTime_format(localize_datetime(dt, local_tz))
+    key = (dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.fold,
+           local_tz)
+    try:
+        parts = _format_cache.get(key)
+    except TypeError:
+        # An unhashable tzinfo
+        return xsDateTime_format(localize_datetime(dt, local_tz))
+    microsecond = dt.microsecond
+    if parts is None:
+        offset = None
+        # pytz zones attached with replace() keep their first offset, not
+        # the one the table holds
+        if not isinstance(local_tz, DstTzInfo):
+            offset = _local_offset(dt, local_tz)
+        if offset is None:
+            iso = localize_datetime(dt, local_tz).isoformat()
+        else:
+            iso = dt.isoformat() + _offset_str(offset)
+        if len(_format_cache) >= _FORMAT_CACHE_LIMIT:
+            _format_cache.clear()
+        if microsecond:
+            # Leave the microseconds out
+            _format_cache[key] = (iso[:XSDT_TZ_OFFSET], iso[XSDT_TZ_OFFSET + 7:])
+        else:
+            _format_cache[key] = (iso[:XSDT_TZ_OFFSET], iso[XSDT_TZ_OFFSET:])
+        return iso
+    if microsecond:
+        return "%s.%06d%s" % (parts[0], microsecond, parts[1])
+    return parts[0] + parts[1]
+
+
 def localize_datetime(dt, local_tz=None):
     """
     Takes a naive datetime and makes it timezone-aware,
@@ -172,7 +522,14 @@ def current_offset(local_tz=None):
     """
     if local_tz is None:
         local_tz = DEFAULT_LOCAL_TZ
-    return local_tz.utcoffset(datetime.now())
+    now = datetime.now()
+    # pytz zones localize naive times to find their offsets, which takes
+    # much longer than reading the table; other zones keep tables of their own
+    if isinstance(local_tz, DstTzInfo):
+        offset = _local_offset(now, local_tz)
+        if offset is not None:
+            return offset
+    return local_tz.utcoffset(now)
 
 
 def set_default_local_tz(new_local_tz):
@@ -181,6 +538,8 @@ def set_default_local_tz(new_local_tz):
     Returns the previous default timezone info object
     """
     global DEFAULT_LOCAL_TZ
+    _wall_offset_cache.clear()
+    _format_cache.clear()
     old_local_tz = DEFAULT_LOCAL_TZ
     DEFAULT_LOCAL_TZ = new_local_tz
     return old_local_tz
@@ -0,0 +1,11 @@
+from unittest.mock import Mock
+
+
+def stub_response(code):
+    """
+    Mock HTTP response with the given status, read through either
+    .code or .getcode()
+    """
+    response = Mock(code=code)
+    response.getcode.return_value = code
+    return response
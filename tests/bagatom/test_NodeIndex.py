@@ -0,0 +1,93 @@
+import pytest
+from lxml import etree
+
+from codalib import bagatom
+
+
+@pytest.fixture(scope='module')
+def entry_xml():
+    return """<entry xmlns="http://www.w3.org/2005/Atom">
+                  <title>Bag</title>
+                  <!-- title -->
+                  <link rel="self"/>
+                  <link rel="alternate"/>
+                  <content>
+                    <bag:codaXML
+                        xmlns:bag="http://digital2.library.unt.edu/coda/bagxml/">
+                      <bag:fileCount> 3 </bag:fileCount>
+                    </bag:codaXML>
+                  </content>
+              </entry>
+    """
+
+
+@pytest.fixture
+def root(entry_xml):
+    return etree.fromstring(entry_xml)
+
+
+@pytest.fixture
+def index(root):
+    return bagatom.NodeIndex(root)
+
+
+@pytest.mark.parametrize('name', ['title', 'link', 'content', 'missing'])
+def test_matches_lookup_functions(root, index, name):
+    """
+    Check that NodeIndex answers the same as the lookup functions.
+    """
+    assert index.getNodeByName(name) is bagatom.getNodeByName(root, name)
+    assert index.getNodesByName(name) == bagatom.getNodesByName(root, name)
+
+
+def test_getValueByName(index):
+    """
+    Verify values are stripped and missing names give None.
+    """
+    assert index.getValueByName('title') == 'Bag'
+    assert index.getValueByName('missing') is None
+
+
+def test_getNodeByName_without_name(index):
+    """
+    Check that an empty name raises the same exception as getNodeByName.
+    """
+    with pytest.raises(Exception) as e:
+        index.getNodeByName('')
+    assert 'Unspecified name to find node for.' == str(e.value)
+
+
+def test_getNodeByNameChain(root, index):
+    """
+    Verify chains are walked the same way as getNodeByNameChain.
+    """
+    chain = ['content', 'codaXML', 'fileCount']
+    node = index.getNodeByNameChain(chain)
+    assert node is bagatom.getNodeByNameChain(root, chain)
+    assert index.getNodeByNameChain([]) is root
+
+
+def test_getNodeByNameChain_raises_exception(index):
+    """
+    Check that a chain through a missing node raises an exception.
+    """
+    with pytest.raises(Exception) as e:
+        index.getNodeByNameChain(['content', 'queueEntry'])
+    assert 'Unable to find child node queueEntry' == str(e.value)
+
+
+def test_getIndexByName_is_cached(index):
+    """
+    Verify that child indexes are built once.
+    """
+    assert index.getIndexByName('content') is index.getIndexByName('content')
+    assert index.getIndexByName('missing') is None
+
+
+def test_element_tree_indexes_root(root):
+    """
+    Check that an ElementTree is indexed below its root element.
+    """
+    index = bagatom.NodeIndex(etree.ElementTree(root))
+    assert index.node is root
+    assert index.getValueByName('title') == 'Bag'
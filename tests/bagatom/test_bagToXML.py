@@ -26,11 +26,11 @@ def bagxml(monkeypatch):
     """
     m = mock_open(read_data=BAGIT_CONTENTS)
 
-    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x: {})
+    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x, **kwargs: {})
 
     monkeypatch.setattr(
         'codalib.bagatom.getOxum',
-        lambda x: '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT)
+        lambda x, **kwargs: '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT)
     )
     with patch('codalib.bagatom.open', m):
         return bagatom.bagToXML(TEST_PATH)
@@ -52,11 +52,11 @@ def bagxml_with_tags(monkeypatch):
         'Source-Organization': 'Test Org',
         'Bag-Size': '1GB'
     }
-    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x: bagtags)
+    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x, **kwargs: bagtags)
 
     monkeypatch.setattr(
         'codalib.bagatom.getOxum',
-        lambda x: '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT)
+        lambda x, **kwargs: '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT)
     )
     with patch('codalib.bagatom.open', m):
         return bagatom.bagToXML(TEST_PATH)
@@ -78,7 +78,7 @@ def bagxml_with_bagging_date(monkeypatch):
         'Payload-Oxum': '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT),
         'Bagging-Date': BAGGING_DATE
     }
-    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x: bagtags)
+    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x, **kwargs: bagtags)
     with patch('codalib.bagatom.open', m):
         return bagatom.bagToXML(TEST_PATH)
 
@@ -99,7 +99,7 @@ def bagxml_with_nondefault_ark(monkeypatch):
         'Payload-Oxum': '{0}.{1}'.format(PAYLOAD_SIZE, FILE_COUNT),
         'Bagging-Date': BAGGING_DATE
     }
-    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x: bagtags)
+    monkeypatch.setattr('codalib.bagatom.getBagTags', lambda x, **kwargs: bagtags)
     with patch('codalib.bagatom.open', m):
         return bagatom.bagToXML(TEST_PATH, ark_naan=TEST_ARK_NAAN)
 
@@ -238,3 +238,30 @@ def test_set_ark_nan(bagxml_with_nondefault_ark):
     bag_el, ark = bagxml
     ark = int(ark.split('/')[1])
     assert ark == TEST_ARK_NAAN
+
+
+def test_multi_emits_repeated_tags(tmp_path):
+    """
+    Verify bagToXML with multi=True writes a bag:item for every
+    occurrence of a repeated tag, in file order.
+    """
+    bag = tmp_path / TEST_NAME
+    (bag / 'data').mkdir(parents=True)
+    (bag / 'data' / 'file').write_bytes(b'x' * 10)
+    (bag / 'bagit.txt').write_text(BAGIT_CONTENTS)
+    (bag / 'bag-info.txt').write_text(
+        'Contact-Name: First\n'
+        'Bag-Size: 1GB\n'
+        'Contact-Name: Second\n'
+    )
+    bag_el, ark = bagatom.bagToXML(str(bag), multi=True)
+    names = bag_el.xpath(
+        '/a:codaXML/a:bagInfo/a:item/a:name/text()',
+        namespaces={'a': bagatom.BAG_NAMESPACE}
+    )
+    bodies = bag_el.xpath(
+        '/a:codaXML/a:bagInfo/a:item/a:body/text()',
+        namespaces={'a': bagatom.BAG_NAMESPACE}
+    )
+    assert names == ['Contact-Name', 'Bag-Size', 'Contact-Name', 'Payload-Oxum']
+    assert bodies == ['First', '1GB', 'Second', '10.1']
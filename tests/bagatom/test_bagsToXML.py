@@ -0,0 +1,162 @@
+import os
+
+import pytest
+from lxml import etree
+
+from codalib import bagatom
+
+_bagToXMLBytes = bagatom._bagToXMLBytes
+
+
+def crash_on_coda1(bagArgs):
+    """
+    Stand in for bagatom._bagToXMLBytes, killing the worker process
+    outright when given the coda1 bag.
+    """
+    if bagArgs[0].endswith('coda1'):
+        os._exit(1)
+    return _bagToXMLBytes(bagArgs)
+
+
+def make_bag(path, bag_info='Bagging-Date: 2015-01-01\n'):
+    (path / 'data').mkdir(parents=True)
+    (path / 'data' / 'file').write_bytes(b'x' * 10)
+    (path / 'bagit.txt').write_text('BagIt-Version: 0.97\n')
+    (path / 'bag-info.txt').write_text(bag_info)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """
+    A storage tree with bags at different depths, one of them broken,
+    and a bag-like directory inside a bag's payload.
+    """
+    make_bag(tmp_path / 'b' / 'coda2')
+    make_bag(tmp_path / 'a' / 'coda1')
+    make_bag(tmp_path / 'a' / 'coda0', bag_info='no colon here\n')
+    make_bag(tmp_path / 'coda3')
+    (tmp_path / 'coda3' / 'data' / 'nested').mkdir()
+    (tmp_path / 'coda3' / 'data' / 'nested' / 'bagit.txt').write_text('')
+    (tmp_path / 'empty').mkdir()
+    return tmp_path
+
+
+def test_findBags(storage):
+    """
+    Check bags are found in sorted order without looking inside them.
+    """
+    assert bagatom.findBags(str(storage)) == [
+        str(storage / 'a' / 'coda0'),
+        str(storage / 'a' / 'coda1'),
+        str(storage / 'b' / 'coda2'),
+        str(storage / 'coda3'),
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_yields_bags_in_order(storage, workers):
+    """
+    Verify every readable bag is yielded in order, and the broken one
+    is reported without stopping the run.
+    """
+    errors = []
+    results = list(bagatom.bagsToXML(str(storage), workers=workers,
+                                     errors=errors))
+
+    assert [name for name, xml in results] == [
+        'ark:/67531/coda1', 'ark:/67531/coda2', 'ark:/67531/coda3'
+    ]
+    bag_xml = etree.fromstring(results[0][1])
+    assert bagatom.getValueByName(bag_xml, 'payloadSize') == '10'
+    assert len(errors) == 1
+    assert errors[0][0] == str(storage / 'a' / 'coda0')
+    assert 'InvalidANVLRecord' in errors[0][1]
+
+
+def test_raises_after_run_without_errors_list(storage):
+    """
+    Check that failures are raised together once every other bag has
+    been yielded, when no errors list is given.
+    """
+    results = bagatom.bagsToXML(str(storage), workers=1, ark_naan=85781)
+    names = []
+    with pytest.raises(bagatom.BagCrawlError) as e:
+        for name, xml in results:
+            names.append(name)
+
+    assert len(names) == 3
+    assert names[0] == 'ark:/85781/coda1'
+    assert [path for path, error in e.value.errors] == [
+        str(storage / 'a' / 'coda0')
+    ]
+
+
+def test_stopping_early_cancels_pending_bags(storage, monkeypatch):
+    """
+    Check that bags not yet started are cancelled, without waiting on
+    them, when the caller stops iterating.
+    """
+    executors = []
+
+    class RecordingExecutor(bagatom.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.futures = []
+            self.shutdownWait = None
+            executors.append(self)
+
+        def submit(self, *args, **kwargs):
+            future = super().submit(*args, **kwargs)
+            self.futures.append(future)
+            return future
+
+        def shutdown(self, wait=True, **kwargs):
+            self.shutdownWait = wait
+            super().shutdown(wait=wait, **kwargs)
+
+    monkeypatch.setattr(bagatom, 'ProcessPoolExecutor', RecordingExecutor)
+    for i in range(100):
+        make_bag(storage / 'more' / ('coda%03d' % (i + 10)))
+
+    results = bagatom.bagsToXML(str(storage), workers=2, errors=[])
+    next(results)
+    results.close()
+
+    [executor] = executors
+    assert executor.shutdownWait is False
+    assert executor.futures[-1].cancelled()
+
+
+def test_oxum_cache_dir_left_alone(storage, tmp_path_factory, monkeypatch):
+    """
+    Check that bags without a Payload-Oxum are cached in OXUM_CACHE_DIR
+    as it was when the run started, without changing the setting.
+    """
+    cacheDir = tmp_path_factory.mktemp('oxum')
+    monkeypatch.setattr(bagatom, 'OXUM_CACHE_DIR', str(cacheDir))
+    results = bagatom.bagsToXML(str(storage), workers=1, errors=[])
+    next(results)
+    bagatom.OXUM_CACHE_DIR = None
+    list(results)
+
+    assert bagatom.OXUM_CACHE_DIR is None
+    assert len(list(cacheDir.iterdir())) == 3
+
+
+def test_crashed_worker_fails_only_its_bag(storage, monkeypatch):
+    """
+    Check that a worker process dying takes down only the bag it was
+    reading, and the crawl carries on with a new pool.
+    """
+    monkeypatch.setattr(bagatom, '_bagToXMLBytes', crash_on_coda1)
+    errors = []
+    results = list(bagatom.bagsToXML(str(storage), workers=2, errors=errors))
+
+    assert [name for name, xml in results] == [
+        'ark:/67531/coda2', 'ark:/67531/coda3'
+    ]
+    assert [path for path, error in errors] == [
+        str(storage / 'a' / 'coda0'), str(storage / 'a' / 'coda1')
+    ]
+    assert 'InvalidANVLRecord' in errors[0][1]
+    assert 'BrokenProcessPool' in errors[1][1]
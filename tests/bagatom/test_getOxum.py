@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+
+import pytest
+
+from codalib import bagatom
+
+
+# An mtime safely older than OXUM_CACHE_RACY_NS
+OLD_MTIME = 1500000000
+
+
+def age(*paths):
+    """
+    Backdate the mtime of the given paths so the cache will trust them.
+    """
+    for i, path in enumerate(paths):
+        os.utime(str(path), (OLD_MTIME + i, OLD_MTIME + i))
+
+
+@pytest.fixture
+def payload_dir(tmp_path):
+    """
+    A payload tree of three 500 byte files whose directories are old
+    enough to be cached.
+    """
+    data = tmp_path / 'data'
+    (data / 'bar').mkdir(parents=True)
+    (data / 'baz').write_bytes(b'x' * 500)
+    (data / 'bar' / 'spam').write_bytes(b'x' * 500)
+    (data / 'bar' / 'eggs').write_bytes(b'x' * 500)
+    age(data / 'bar', data)
+    return data
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'oxum.json')
+
+
+def test_cache_is_written(payload_dir, cache_path):
+    """
+    Check that getOxum stores per-directory totals in the cache file.
+    """
+    assert bagatom.getOxum(str(payload_dir), cachePath=cache_path) == '1500.3'
+    with open(cache_path) as f:
+        cacheDict = json.load(f)
+    assert cacheDict['root'] == str(payload_dir)
+    assert cacheDict['dirs']['.'][2:] == [500, 1, ['bar']]
+    assert cacheDict['dirs']['bar'][2:] == [1000, 2, []]
+
+
+def test_concurrent_saves(payload_dir, cache_path):
+    """
+    Check that threads caching the same payload don't trip over each
+    other's temporary files.
+    """
+    errors = []
+
+    def worker():
+        try:
+            for i in range(20):
+                assert bagatom.getOxum(str(payload_dir), workers=1,
+                                       cachePath=cache_path) == '1500.3'
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with open(cache_path) as f:
+        assert json.load(f)['dirs']['bar'][2:] == [1000, 2, []]
+    assert not [name for name in os.listdir(os.path.dirname(cache_path))
+                if name.endswith('.tmp')]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_unchanged_dirs_are_not_listed(payload_dir, cache_path, monkeypatch,
+                                       workers):
+    """
+    Verify a second call answers from the cache without scandir.
+    """
+    bagatom.getOxum(str(payload_dir), workers=workers, cachePath=cache_path)
+
+    def fail(path):
+        raise AssertionError('%s was listed again' % path)
+
+    monkeypatch.setattr('codalib.bagatom._scanOxumDir', fail)
+    oxum = bagatom.getOxum(str(payload_dir), workers=workers,
+                           cachePath=cache_path)
+    assert oxum == '1500.3'
+
+
+def test_changed_dir_is_rescanned(payload_dir, cache_path):
+    """
+    Check that adding a file to a subdirectory is picked up.
+    """
+    bagatom.getOxum(str(payload_dir), cachePath=cache_path)
+    (payload_dir / 'bar' / 'ham').write_bytes(b'x' * 100)
+    os.utime(str(payload_dir / 'bar'), (OLD_MTIME + 10, OLD_MTIME + 10))
+    oxum = bagatom.getOxum(str(payload_dir), cachePath=cache_path)
+    assert oxum == '1600.4'
+
+
+def test_recent_dirs_are_not_cached(payload_dir, cache_path):
+    """
+    Verify that directories modified within the racy window are left
+    out of the cache.
+    """
+    (payload_dir / 'bar' / 'ham').write_bytes(b'x' * 100)
+    bagatom.getOxum(str(payload_dir), cachePath=cache_path)
+    with open(cache_path) as f:
+        cacheDict = json.load(f)
+    assert 'bar' not in cacheDict['dirs']
+    assert '.' in cacheDict['dirs']
+
+
+def test_corrupt_cache_is_ignored(payload_dir, cache_path):
+    """
+    Check that an unreadable cache file is treated as empty.
+    """
+    with open(cache_path, 'w') as f:
+        f.write('not json')
+    assert bagatom.getOxum(str(payload_dir), cachePath=cache_path) == '1500.3'
+
+
+def test_cache_for_other_root_is_ignored(payload_dir, cache_path, tmp_path):
+    """
+    Verify that a cache written for another payload is not used.
+    """
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'file').write_bytes(b'x' * 10)
+    age(other)
+    bagatom.getOxum(str(other), cachePath=cache_path)
+    assert bagatom.getOxum(str(payload_dir), cachePath=cache_path) == '1500.3'
+
+
+def test_OXUM_CACHE_DIR(payload_dir, tmp_path, monkeypatch):
+    """
+    Check that setting OXUM_CACHE_DIR turns on caching by default.
+    """
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr('codalib.bagatom.OXUM_CACHE_DIR', str(cache_dir))
+    bagatom.getOxum(str(payload_dir))
+    assert os.path.exists(bagatom.getOxumCachePath(str(payload_dir)))
+
+
+def test_getOxumCachePath_disabled(payload_dir):
+    """
+    Verify no cache path is given when OXUM_CACHE_DIR is unset.
+    """
+    assert bagatom.getOxumCachePath(str(payload_dir)) is None
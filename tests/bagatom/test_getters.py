@@ -6,21 +6,51 @@ from lxml import etree
 from codalib import bagatom
 
 
-@patch('codalib.bagatom.os.stat')
-@patch('codalib.bagatom.os.walk')
-def test_getOxum(mock_walk, mock_stat):
+@pytest.fixture
+def payload_dir(tmp_path):
     """
-    Check the return value of getOxum with patched system calls.
+    A small payload tree holding three 500 byte files, one at the top
+    level and two in a subdirectory.
+    """
+    (tmp_path / 'baz').write_bytes(b'x' * 500)
+    (tmp_path / 'bar').mkdir()
+    (tmp_path / 'bar' / 'spam').write_bytes(b'x' * 500)
+    (tmp_path / 'bar' / 'eggs').write_bytes(b'x' * 500)
+    return tmp_path
+
+
+def test_getOxum(payload_dir):
+    """
+    Check the return value of getOxum.
 
     getOxum should return the total size and the total number
     of files in the directory in the form of
     `<total size>.<total files>`
     """
-    mock_walk.return_value = [('/foo', ('bar',), ('baz',)),
-                              ('/foo/bar', (), ('spam', 'eggs'))]
-    mock_stat.return_value.st_size = 500
+    assert bagatom.getOxum(str(payload_dir)) == '1500.3'
 
-    assert bagatom.getOxum('/some/fake/dir') == '1500.3'
+
+@pytest.mark.parametrize('workers', [1, 2, 16])
+def test_getOxum_workers(payload_dir, workers):
+    """
+    Check that the serial and threaded scans agree.
+    """
+    assert bagatom.getOxum(str(payload_dir), workers=workers) == '1500.3'
+
+
+def test_getOxum_skips_symlinked_dirs(payload_dir):
+    """
+    Verify symlinked directories are not followed, matching os.walk.
+    """
+    (payload_dir / 'link').symlink_to(payload_dir / 'bar')
+    assert bagatom.getOxum(str(payload_dir)) == '1500.3'
+
+
+def test_getOxum_missing_dir(tmp_path):
+    """
+    Verify a missing payload directory totals to zero.
+    """
+    assert bagatom.getOxum(str(tmp_path / 'missing')) == '0.0'
 
 
 @pytest.fixture(scope='module')
@@ -83,6 +113,17 @@ def test_getBagTags_open_iso8859_1(tmp_path):
     assert tags == {'tag': 'Norén leaves Malmö and crosses the Øresund'}
 
 
+def test_getBagTags_multi(tmp_path):
+    """
+    Check that getBagTags keeps repeated tags with multi=True.
+    """
+    bag_info = tmp_path / 'bag-info.txt'
+    bag_info.write_text('Contact-Name: First\nContact-Name: Second\n')
+    tags = bagatom.getBagTags(str(bag_info), multi=True)
+    assert tags.getlist('Contact-Name') == ['First', 'Second']
+    assert tags == {'Contact-Name': 'Second'}
+
+
 def test_getValueByName_returns_value(note_xml):
     """
     Check that getValueByName returns the correct value.
@@ -202,3 +243,34 @@ def test_getNodeByNameChain_returns_same_node_with_empty_chain_list(note_xml):
     root = etree.fromstring(note_xml)
     node = bagatom.getNodeByNameChain(root, [])
     assert node == root
+
+
+def test_getNodesByName_skips_comments_and_matches_any_namespace():
+    """
+    Check that children are matched by local name in any namespace,
+    or none, and that comments and processing instructions are skipped.
+    """
+    root = etree.fromstring(
+        '<r xmlns:a="urn:a"><!--name--><name/><a:name/><?name x?></r>'
+    )
+    nodes = bagatom.getNodesByName(root, 'name')
+    assert [node.tag for node in nodes] == ['name', '{urn:a}name']
+
+
+def test_getNodeByName_with_element_tree(note_xml):
+    """
+    Verify an ElementTree is searched below its root element, as lxml's
+    xpath does.
+    """
+    tree = etree.ElementTree(etree.fromstring(note_xml))
+    node = bagatom.getNodeByName(tree, 'to')
+    assert node is tree.getroot()[0]
+
+
+def test_getValueByName_with_quote_in_name(note_xml):
+    """
+    Check that a name that could not be quoted in an XPath string
+    simply matches nothing.
+    """
+    root = etree.fromstring(note_xml)
+    assert bagatom.getValueByName(root, "it's") is None
@@ -0,0 +1,240 @@
+import operator
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from lxml import etree
+
+from codalib import bagatom
+
+
+LOOKUPS = {
+    'gt': operator.gt, 'gte': operator.ge,
+    'lt': operator.lt, 'lte': operator.le,
+}
+
+
+class FakeQuerySet(object):
+    """
+    Enough of the Django QuerySet API for keyset paging, which records
+    how many objects were sliced out of it.
+    """
+
+    def __init__(self, objects, log=None):
+        self.objects = objects
+        self.log = log if log is not None else []
+
+    def _matches(self, obj, lookups):
+        for lookup, value in lookups.items():
+            name, _, op = lookup.partition('__')
+            if not LOOKUPS.get(op, operator.eq)(getattr(obj, name), value):
+                return False
+        return True
+
+    def filter(self, **lookups):
+        return FakeQuerySet(
+            [o for o in self.objects if self._matches(o, lookups)], self.log
+        )
+
+    def exclude(self, **lookups):
+        return FakeQuerySet(
+            [o for o in self.objects if not self._matches(o, lookups)],
+            self.log
+        )
+
+    def order_by(self, *fields):
+        objects = list(self.objects)
+        for field in reversed(fields):
+            objects.sort(key=operator.attrgetter(field.lstrip('-')),
+                         reverse=field.startswith('-'))
+        return FakeQuerySet(objects, self.log)
+
+    def __getitem__(self, index):
+        objects = self.objects[index]
+        self.log.append(len(objects))
+        return objects
+
+
+class Event(object):
+
+    def __init__(self, i):
+        self.id = i
+        self.name = 'Event %d' % i
+        # Two events share each date, so ids break the ties
+        self.date = datetime(2020, 1, 1) + timedelta(hours=i // 2)
+
+
+def obj2xml(obj):
+    node = etree.Element('event')
+    node.text = str(obj.id)
+    return node
+
+
+@pytest.fixture
+def queryset():
+    return FakeQuerySet([Event(i) for i in (7, 3, 9, 0, 4, 8, 1, 6, 2, 5)])
+
+
+def feed_ids(feed):
+    return [
+        int(node.text)
+        for node in feed.xpath('a:entry/a:content/event',
+                               namespaces={'a': bagatom.ATOM_NAMESPACE})
+    ]
+
+
+def feed_cursors(feed):
+    cursors = {}
+    for link in feed.iterchildren('{%s}link' % bagatom.ATOM_NAMESPACE):
+        query = parse_qs(urlsplit(link.get('href')).query)
+        if 'cursor' in query:
+            cursors[link.get('rel')] = query['cursor'][0]
+    return cursors
+
+
+def make_feed(queryset, **kwargs):
+    return bagatom.makeCursorFeed(
+        queryset, obj2xml, 'APP/event/', 'Events', 'http://localhost:8787',
+        dateAttr='date', count=4, **kwargs
+    )
+
+
+def test_walks_forwards_and_backwards(queryset):
+    """
+    Check that following next and then previous links visits every
+    object once, in key order.
+    """
+    feed = make_feed(queryset)
+    assert feed_ids(feed) == [0, 1, 2, 3]
+    assert 'previous' not in feed_cursors(feed)
+
+    feed = make_feed(queryset, cursor=feed_cursors(feed)['next'])
+    assert feed_ids(feed) == [4, 5, 6, 7]
+
+    feed = make_feed(queryset, cursor=feed_cursors(feed)['next'])
+    assert feed_ids(feed) == [8, 9]
+    assert 'next' not in feed_cursors(feed)
+
+    feed = make_feed(queryset, cursor=feed_cursors(feed)['previous'])
+    assert feed_ids(feed) == [4, 5, 6, 7]
+
+
+def test_last_link(queryset):
+    """
+    Verify the last link gives the final page of objects.
+    """
+    feed = make_feed(queryset)
+    feed = make_feed(queryset, cursor=feed_cursors(feed)['last'])
+    assert feed_ids(feed) == [6, 7, 8, 9]
+    assert 'next' not in feed_cursors(feed)
+    assert 'previous' in feed_cursors(feed)
+
+
+def test_descending(queryset):
+    """
+    Check that a descending feed starts from the largest keys.
+    """
+    feed = make_feed(queryset, descending=True)
+    assert feed_ids(feed) == [9, 8, 7, 6]
+    feed = make_feed(queryset, descending=True,
+                     cursor=feed_cursors(feed)['next'])
+    assert feed_ids(feed) == [5, 4, 3, 2]
+
+
+def test_deep_page_fetches_one_page(queryset):
+    """
+    Verify a deep page slices objects past the cursor, not an offset.
+    """
+    cursor = bagatom.encodeFeedCursor([Event(5).date, 5])
+    feed = make_feed(queryset, cursor=cursor)
+    assert feed_ids(feed) == [6, 7, 8, 9]
+    assert queryset.log == [4]
+
+
+def test_links_keep_query():
+    """
+    Check that cursor links carry the request's other GET parameters.
+    """
+    class Request(object):
+        GET = {'status': '1', 'cursor': 'old'}
+        META = {'QUERY_STRING': 'status=1&cursor=old'}
+
+    feed = make_feed(FakeQuerySet([Event(i) for i in range(10)]),
+                     request=Request())
+    link = feed.xpath('a:link[@rel="next"]/@href',
+                      namespaces={'a': bagatom.ATOM_NAMESPACE})[0]
+    assert link.startswith('http://localhost:8787/APP/event/?status=1&cursor=')
+
+
+@pytest.mark.parametrize('values', [
+    None,
+    [5, 'ark:/67531/coda5'],
+    [datetime(2020, 1, 1, 12, 30, 15, 123)],
+    [datetime(2020, 1, 1, 12, 30, tzinfo=timezone(timedelta(hours=-6)))],
+    [uuid.UUID('20b28e4e-e568-11e9-9051-54bf64888bf3')],
+    [Decimal('12.50'), 3],
+])
+def test_cursor_round_trip(values):
+    """
+    Verify cursor values come back from decodeFeedCursor unchanged.
+    """
+    cursor = bagatom.encodeFeedCursor(values, 'previous')
+    assert bagatom.decodeFeedCursor(cursor) == ('previous', values)
+
+
+@pytest.mark.parametrize('cursor', [
+    '', '!!!', 'WzEsMl0', 'WyJ1cCIsbnVsbF0',
+    # A null value, and a tagged value of an unknown type
+    'WyJuZXh0IixbbnVsbCwxXV0', 'WyJuZXh0IixbWyJ0aW1lIiwiMTI6MDAiXV1d',
+    # A malformed UUID and Decimal
+    'WyJuZXh0IixbWyJ1dWlkIiwieHl6Il1dXQ', 'WyJuZXh0IixbWyJkZWNpbWFsIiwieHl6Il1dXQ',
+])
+def test_invalid_cursor(cursor):
+    """
+    Check that unreadable cursors raise InvalidFeedCursor.
+    """
+    with pytest.raises(bagatom.InvalidFeedCursor):
+        bagatom.decodeFeedCursor(cursor)
+
+
+def test_null_cursor_value():
+    """
+    Check that a null key can't be put in a cursor.
+    """
+    with pytest.raises(ValueError):
+        bagatom.encodeFeedCursor([None, 1])
+
+
+def test_null_date_raises():
+    """
+    Verify a page holding an object with a null dateAttr is refused,
+    rather than paged past wrongly.
+    """
+    event = Event(0)
+    event.date = None
+    with pytest.raises(ValueError):
+        make_feed(FakeQuerySet([event]))
+
+
+@pytest.mark.parametrize('make_id', [
+    lambda i: uuid.UUID(int=i),
+    lambda i: Decimal(i) / 4,
+])
+def test_walks_uuid_and_decimal_keys(queryset, make_id):
+    """
+    Check that UUID and Decimal ids page like any other.
+    """
+    for event in queryset.objects:
+        event.id = make_id(event.id)
+    seen = []
+    feed = make_feed(queryset)
+    while True:
+        seen.extend(feed.xpath('a:entry/a:content/event/text()',
+                               namespaces={'a': bagatom.ATOM_NAMESPACE}))
+        cursors = feed_cursors(feed)
+        if 'next' not in cursors:
+            break
+        feed = make_feed(queryset, cursor=cursors['next'])
+    assert seen == [str(make_id(i)) for i in range(10)]
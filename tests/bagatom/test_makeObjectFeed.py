@@ -1,8 +1,14 @@
-from unittest.mock import Mock
+import io
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
 
+import pytest
 from lxml import etree
 
-from codalib.bagatom import makeObjectFeed, ATOM_NAMESPACE as atom_ns
+from codalib.bagatom import (
+    makeObjectFeed, writeObjectFeed, iterObjectFeed, ATOM_NAMESPACE as atom_ns
+)
+from codalib.xsdatetime import xsDateTime_format_local
 
 
 def test_simpleFeed():
@@ -55,3 +61,168 @@ def test_simpleFeed():
     assert elements[0].attrib['href'] == '%s/%s/%s/' % (
         web_root, 'randomcollection', obj.id
     )
+
+
+@pytest.fixture
+def feed_args():
+    """
+    Positional arguments for the feed functions: a one-page paginator
+    over three objects with fixed dates, and an object-to-XML function.
+    """
+    objs = []
+    for i in range(3):
+        obj = Mock()
+        obj.id = 'object%d' % i
+        obj.name = 'Object %d' % i
+        obj.updated = datetime(2019, 10, 2, 17, 58, i)
+        objs.append(obj)
+    paginator = Mock()
+    paginator.num_pages = 1
+    paginator.page_range = (1,)
+    paginator.count = len(objs)
+    page_return = Mock()
+    page_return.object_list = objs
+    page_return.has_next = Mock(return_value=False)
+    page_return.has_previous = Mock(return_value=False)
+    paginator.page = Mock(return_value=page_return)
+
+    def obj2xml(obj):
+        node = etree.Element('note')
+        node.text = obj.name
+        return node
+
+    return (paginator, obj2xml, 'APP/randomcollection/', 'Bag Feed',
+            'http://localhost:8787')
+
+
+def canonical(xml):
+    """
+    Return the C14N form of an element or of serialized XML.
+    """
+    if isinstance(xml, bytes):
+        xml = etree.fromstring(xml)
+    return etree.tostring(xml, method='c14n')
+
+
+@patch('codalib.bagatom.xsDateTime_format', return_value='2019-10-02T17:58:19-05:00')
+@patch('codalib.bagatom.xsDateTime_format_local', return_value='2019-10-02T17:58:19-05:00')
+def test_writeObjectFeed_matches_makeObjectFeed(mock_xsdt_local, mock_xsdt, feed_args):
+    """
+    Check that writeObjectFeed writes the feed makeObjectFeed builds.
+    """
+    output = io.BytesIO()
+    writeObjectFeed(output, *feed_args, dateAttr='updated')
+    feed = makeObjectFeed(*feed_args, dateAttr='updated')
+
+    assert output.getvalue().startswith(b"<?xml version='1.0' encoding='utf-8'?>")
+    assert canonical(output.getvalue()) == canonical(feed)
+
+
+@patch('codalib.bagatom.xsDateTime_format', return_value='2019-10-02T17:58:19-05:00')
+@patch('codalib.bagatom.xsDateTime_format_local', return_value='2019-10-02T17:58:19-05:00')
+def test_iterObjectFeed_yields_chunk_per_entry(mock_xsdt_local, mock_xsdt, feed_args):
+    """
+    Verify iterObjectFeed yields the feed head, one chunk per entry and
+    the closing tag, which together form the makeObjectFeed feed.
+    """
+    chunks = list(iterObjectFeed(*feed_args))
+    feed = makeObjectFeed(*feed_args)
+
+    assert len(chunks) == 5
+    assert chunks[1].startswith(b'<entry')
+    assert chunks[-1] == b'</feed>'
+    assert canonical(b''.join(chunks)) == canonical(feed)
+
+
+def test_iterObjectFeed_is_lazy(feed_args):
+    """
+    Check that entries are only converted as chunks are consumed.
+    """
+    obj2xml = Mock(return_value=etree.Element('note'))
+    chunks = iterObjectFeed(feed_args[0], obj2xml, *feed_args[2:])
+    next(chunks)
+    assert obj2xml.call_count == 0
+    next(chunks)
+    assert obj2xml.call_count == 1
+
+
+def test_page_is_fetched_once(feed_args):
+    """
+    Check that makeObjectFeed asks the paginator for the page only once.
+    """
+    paginator = feed_args[0]
+    makeObjectFeed(*feed_args)
+    assert paginator.page.call_count == 1
+
+
+def test_navigation_links_keep_query(feed_args):
+    """
+    Verify the navigation links carry the other GET parameters, with
+    the page number in place of any existing page parameter.
+    """
+    paginator = feed_args[0]
+    paginator.num_pages = 3
+    page_return = paginator.page.return_value
+    page_return.has_previous.return_value = True
+    page_return.previous_page_number.return_value = 1
+    page_return.has_next.return_value = True
+    page_return.next_page_number.return_value = 3
+    request = Mock()
+    request.GET = {'q': 'a b', 'page': '2', 'sort': ['name', 'date']}
+    request.META = {'QUERY_STRING': 'q=a+b&page=2&sort=name&sort=date'}
+
+    feed = makeObjectFeed(*feed_args, request=request, page=2)
+    links = {
+        link.get('rel'): link.get('href')
+        for link in feed.iterchildren('{%s}link' % atom_ns)
+    }
+    base = 'http://localhost:8787/APP/randomcollection/?'
+    assert links == {
+        'self': base + 'q=a+b&page=2&sort=name&sort=date',
+        'first': base + 'q=a+b&page=1&sort=name&sort=date',
+        'last': base + 'q=a+b&page=3&sort=name&sort=date',
+        'previous': base + 'q=a+b&page=1&sort=name&sort=date',
+        'next': base + 'q=a+b&page=3&sort=name&sort=date',
+    }
+
+
+def updatedTimes(feed):
+    return [node.text for node in feed.iter('{%s}updated' % atom_ns)]
+
+
+def test_now_is_used_for_feed_and_undated_entries(feed_args):
+    """
+    Check that every updated tag takes the feed's now when there is no
+    dateAttr.
+    """
+    now = datetime(2020, 1, 2, 3, 4, 5, 678)
+    feed = makeObjectFeed(*feed_args, now=now)
+
+    assert updatedTimes(feed) == [xsDateTime_format_local(now)] * 4
+
+
+def test_aware_now_keeps_its_zone(feed_args):
+    """
+    Check that an aware now is written with its own offset rather than
+    having the local zone put in its place.
+    """
+    now = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=9)))
+    feed = makeObjectFeed(*feed_args, now=now)
+
+    assert updatedTimes(feed) == ['2020-01-02T03:04:05+09:00'] * 4
+
+
+def test_now_is_not_used_for_dated_entries(feed_args):
+    now = datetime(2020, 1, 2, 3, 4, 5)
+    feed = makeObjectFeed(*feed_args, dateAttr='updated', now=now)
+
+    assert updatedTimes(feed) == [xsDateTime_format_local(now)] + [
+        xsDateTime_format_local(datetime(2019, 10, 2, 17, 58, i)) for i in range(3)
+    ]
+
+
+def test_iterObjectFeed_matches_makeObjectFeed_at_same_now(feed_args):
+    now = datetime(2020, 1, 2, 3, 4, 5)
+    chunks = list(iterObjectFeed(*feed_args, now=now))
+
+    assert canonical(b''.join(chunks)) == canonical(makeObjectFeed(*feed_args, now=now))
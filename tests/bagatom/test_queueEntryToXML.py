@@ -122,3 +122,18 @@ def test_queue_empty_start_end(queue_stub):
     )
     assert len(end) == 0
     assert len(start) == 0
+
+
+def test_returns_independent_trees(queue_stub):
+    """
+    Check that each call returns its own tree, so changing one result
+    does not leak into later ones.
+    """
+    first = bagatom.queueEntryToXML(queue_stub)
+    first[0].text = 'changed'
+    etree.SubElement(first, 'extra')
+    second = bagatom.queueEntryToXML(queue_stub)
+
+    assert second[0].text == queue_stub.ark
+    assert len(second) == len(first) - 1
+    assert first.getroottree() is not second.getroottree()
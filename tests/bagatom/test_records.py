@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from lxml import etree
+import pytest
+
+from codalib import bagatom
+
+
+QUEUE_DICT = {
+    'ark': 'ark:/67531/coda1',
+    'oxum': '1024.3',
+    'url_list': 'http://example.com/urls.txt',
+    'status': '1',
+    'queue_position': 7,
+    'harvest_start': datetime(2015, 1, 1),
+}
+
+
+def test_fields_positional_and_keyword():
+    entry = bagatom.QueueEntry('ark', 'oxum', 'urls', '1', queue_position=3)
+    assert entry.ark == 'ark'
+    assert entry.queue_position == 3
+    assert entry.harvest_start is None
+    assert entry.harvest_end is None
+
+
+def test_no_instance_dict():
+    entry = bagatom.QueueEntry.fromDict(QUEUE_DICT)
+    assert not hasattr(entry, '__dict__')
+    with pytest.raises(AttributeError):
+        entry.not_a_field = 1
+
+
+def test_missing_field():
+    with pytest.raises(TypeError):
+        bagatom.QueueEntry('ark', 'oxum')
+
+
+def test_unexpected_field():
+    with pytest.raises(TypeError):
+        bagatom.QueueEntry('ark', 'oxum', 'urls', '1', 3, colour='red')
+
+
+def test_too_many_fields():
+    with pytest.raises(TypeError):
+        bagatom.Node(*range(8))
+
+
+def test_fromDict_ignores_extra_keys():
+    values = dict(QUEUE_DICT, id=12)
+    entry = bagatom.QueueEntry.fromDict(values)
+    assert entry.asDict() == dict(QUEUE_DICT, harvest_end=None)
+
+
+def test_equality_and_repr():
+    entry = bagatom.QueueEntry.fromDict(QUEUE_DICT)
+    assert entry == bagatom.QueueEntry.fromDict(QUEUE_DICT)
+    assert entry != bagatom.QueueEntry.fromDict(dict(QUEUE_DICT, status='2'))
+    assert repr(entry).startswith("QueueEntry(ark='ark:/67531/coda1', ")
+
+
+def test_queueEntryToXML_matches_AttrDict():
+    fromRecord = bagatom.queueEntryToXML(bagatom.QueueEntry.fromDict(QUEUE_DICT))
+    fromAttrDict = bagatom.queueEntryToXML(bagatom.AttrDict(QUEUE_DICT))
+    assert etree.tostring(fromRecord) == etree.tostring(fromAttrDict)
+
+
+@pytest.mark.parametrize('status, text', [
+    (None, 'Active'),
+    ('0', 'Inactive'),
+    ('1', 'Active'),
+])
+def test_nodeToXML_accepts_Node(status, text):
+    node = bagatom.Node('Test Name', 'http://example.com/node', '/foo/bar/node',
+                        4096, 2048, datetime(2015, 1, 1), status)
+    node_xml = bagatom.nodeToXML(node)
+    assert node_xml.findtext(bagatom.NODE + 'name') == 'Test Name'
+    assert node_xml.findtext(bagatom.NODE + 'lastChecked') == '2015-01-01T00:00:00Z'
+    assert node_xml.findtext(bagatom.NODE + 'status') == text
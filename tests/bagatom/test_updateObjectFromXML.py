@@ -198,3 +198,82 @@ def test_mapping_w_namespaces(event_atom, mini_mock):
     event = mini_mock()
     bagatom.updateObjectFromXML(event_tree, event, map_dict)
     assert expected == event.event_outcome.strip()
+
+
+def test_mapping_must_be_dict():
+    """
+    Check that a mapping that is not a dict raises a TypeError.
+    """
+    with pytest.raises(TypeError):
+        bagatom.CompiledMapping([('nickname', 'x:nickname')])
+
+
+def test_mapping_values_must_be_str_or_list():
+    """
+    Verify a selector that is neither a string nor a list raises a
+    TypeError when the mapping is compiled.
+    """
+    with pytest.raises(TypeError):
+        bagatom.CompiledMapping({'nickname': 5})
+
+
+def test_compiled_mapping(person_xml, mini_mock):
+    """
+    Check that updateObjectFromXML accepts a CompiledMapping.
+    """
+    tree = etree.fromstring(person_xml)
+    mapping = bagatom.CompiledMapping({
+        '@namespaces': {'x': 'http://example.com/namespace'},
+        'nickname': ['x:nickname'], 'phone': ['x:phone']
+    })
+    person = mini_mock()
+    bagatom.updateObjectFromXML(tree, person, mapping)
+
+    assert person.nickname == 'Jim'
+    assert hasattr(person, 'phone') is False
+
+
+def test_updateObjectsFromXML(mini_mock):
+    """
+    Verify updateObjectsFromXML updates every object from the
+    document at the same position.
+    """
+    docs = [
+        etree.fromstring(
+            '<person xmlns="http://example.com/namespace">'
+            '<nickname>%s</nickname></person>' % nickname
+        )
+        for nickname in ('Jim', 'Tove', 'Jani')
+    ]
+    people = [mini_mock() for doc in docs]
+    mapping = bagatom.CompiledMapping({
+        '@namespaces': {'x': 'http://example.com/namespace'},
+        'nickname': 'x:nickname'
+    })
+    updated = bagatom.updateObjectsFromXML(docs, people, mapping)
+
+    assert updated == people
+    assert [person.nickname for person in people] == ['Jim', 'Tove', 'Jani']
+
+
+@pytest.mark.parametrize('doc_count, obj_count', [(2, 3), (3, 2)])
+def test_updateObjectsFromXML_count_mismatch(mini_mock, doc_count, obj_count):
+    """
+    Verify updateObjectsFromXML refuses documents and objects that
+    don't pair up, without updating any of them.
+    """
+    docs = [
+        etree.fromstring(
+            '<person xmlns="http://example.com/namespace">'
+            '<nickname>Jim</nickname></person>'
+        )
+        for i in range(doc_count)
+    ]
+    people = [mini_mock() for i in range(obj_count)]
+    mapping = {
+        '@namespaces': {'x': 'http://example.com/namespace'},
+        'nickname': 'x:nickname'
+    }
+    with pytest.raises(ValueError):
+        bagatom.updateObjectsFromXML(docs, people, mapping)
+    assert not any(hasattr(person, 'nickname') for person in people)
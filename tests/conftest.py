@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture
+def queue_dict():
+    """
+    Fixture to provide a valid queue dictionary as required by
+    updateQueue.
+
+    updateQueue expects all of the keys below to be present.
+    """
+    return {
+        'ark': 'fake_ark',
+        'oxum': 'fake oxum',
+        'url_list': 'fake url list',
+        'status': 'fake status',
+        'queue_position': 'fake queue position'
+    }
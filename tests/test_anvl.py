@@ -1,3 +1,7 @@
+import copy
+import io
+import pickle
+
 import pytest
 
 from codalib import anvl
@@ -92,6 +96,182 @@ class Test_readANVLString(object):
         assert actual == expected
 
 
+class Test_readANVLString_multi(object):
+    anvl_string = ('Contact-Name: First\n'
+                   'Bag-Size: 1GB\n'
+                   'Contact-Name: Second\n')
+
+    def test_keeps_repeated_keys(self):
+        """
+        Check that multi=True keeps every value of a repeated key.
+        """
+        actual = anvl.readANVLString(self.anvl_string, multi=True)
+        assert actual.getlist('Contact-Name') == ['First', 'Second']
+        assert actual.allItems() == [
+            ('Contact-Name', 'First'),
+            ('Bag-Size', '1GB'),
+            ('Contact-Name', 'Second'),
+        ]
+
+    def test_acts_like_plain_result(self):
+        """
+        Verify the multi result compares equal to the plain dict, which
+        holds the last value of each key.
+        """
+        actual = anvl.readANVLString(self.anvl_string, multi=True)
+        assert isinstance(actual, anvl.ANVLMultiDict)
+        assert actual == anvl.readANVLString(self.anvl_string)
+        assert actual['Contact-Name'] == 'Second'
+
+
+class Test_ANVLMultiDict(object):
+    def test_setitem_replaces_all_values(self):
+        """
+        Check that assigning a key replaces its values in place.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('b', '2'), ('a', '3')])
+        tags['a'] = '4'
+        assert tags.allItems() == [('a', '4'), ('b', '2')]
+        tags['c'] = '5'
+        assert tags.allItems() == [('a', '4'), ('b', '2'), ('c', '5')]
+
+    def test_delitem_removes_all_values(self):
+        """
+        Verify deleting a key drops every occurrence.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('b', '2'), ('a', '3')])
+        del tags['a']
+        assert tags.allItems() == [('b', '2')]
+        assert tags.getlist('a') == []
+
+    def test_add_appends_value(self):
+        """
+        Check that add keeps earlier values of a key.
+        """
+        tags = anvl.ANVLMultiDict()
+        tags.add('a', '1')
+        tags.add('a', '2')
+        assert tags['a'] == '2'
+        assert tags.getlist('a') == ['1', '2']
+
+    def test_update_replaces_values(self):
+        """
+        Check that update keeps the pairs in step with the dictionary.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('b', '2'), ('a', '3')])
+        tags.update({'a': '4'}, c='5')
+        tags.update([('d', '6')])
+        assert tags.allItems() == [('a', '4'), ('b', '2'), ('c', '5'), ('d', '6')]
+        assert dict(tags) == {'a': '4', 'b': '2', 'c': '5', 'd': '6'}
+
+    def test_setdefault(self):
+        """
+        Verify setdefault adds a missing key only.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1')])
+        assert tags.setdefault('a', '2') == '1'
+        assert tags.setdefault('b', '3') == '3'
+        assert tags.allItems() == [('a', '1'), ('b', '3')]
+
+    def test_pop_and_popitem_remove_all_values(self):
+        """
+        Check that pop and popitem drop every occurrence of the key.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('b', '2'), ('a', '3')])
+        assert tags.pop('a') == '3'
+        assert tags.pop('a', None) is None
+        with pytest.raises(KeyError):
+            tags.pop('a')
+        assert tags.allItems() == [('b', '2')]
+        assert tags.popitem() == ('b', '2')
+        assert tags.allItems() == []
+        assert tags == {}
+
+    def test_clear_and_copy(self):
+        """
+        Verify clear empties the pairs and copy keeps the repeats.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('a', '2')])
+        copied = tags.copy()
+        tags.clear()
+        assert tags.allItems() == [] and tags == {}
+        assert isinstance(copied, anvl.ANVLMultiDict)
+        assert copied.getlist('a') == ['1', '2']
+
+    @pytest.mark.parametrize('duplicate', [
+        copy.copy,
+        copy.deepcopy,
+        lambda tags: pickle.loads(pickle.dumps(tags)),
+    ])
+    def test_copies_rebuilt_from_pairs(self, duplicate):
+        """
+        Check that copy, deepcopy and pickle give an independent
+        dictionary with the same pairs.
+        """
+        tags = anvl.ANVLMultiDict([('a', '1'), ('a', '2'), ('b', '3')])
+        copied = duplicate(tags)
+        assert isinstance(copied, anvl.ANVLMultiDict)
+        assert copied.allItems() == [('a', '1'), ('a', '2'), ('b', '3')]
+        assert copied == tags
+        copied.add('c', '4')
+        assert tags.allItems() == [('a', '1'), ('a', '2'), ('b', '3')]
+
+
+class Test_readANVLStream(object):
+    def test_yields_pairs_from_file_object(self):
+        """
+        Check that readANVLStream yields key/value pairs from a file
+        object, folding continuation lines.
+        """
+        anvl_file = io.StringIO('key1: value1\n'
+                                '# comment\n'
+                                'key2: Buffered\n'
+                                '      Content\n')
+
+        actual = list(anvl.readANVLStream(anvl_file))
+        expected = [('key1', 'value1'), ('key2', 'Buffered Content')]
+        assert actual == expected
+
+    def test_is_lazy(self):
+        """
+        Verify a record is yielded before later lines are read.
+        """
+        def lines():
+            yield 'key1: value1\n'
+            yield 'key2: value2\n'
+            raise AssertionError('read too far')
+
+        stream = anvl.readANVLStream(lines())
+        assert next(stream) == ('key1', 'value1')
+
+    def test_matches_readANVLString(self):
+        """
+        Check that readANVLStream and readANVLString agree on values
+        with blank, comment and whitespace-only lines.
+        """
+        anvl_string = ('key1:\n'
+                       '   \n'
+                       '  first\n'
+                       '# comment\n'
+                       '  \n'
+                       '  second\n'
+                       '\n'
+                       'key2: value2 \n')
+
+        actual = dict(anvl.readANVLStream(io.StringIO(anvl_string)))
+        assert actual == anvl.readANVLString(anvl_string)
+        assert actual == {'key1': 'first  second', 'key2': 'value2 '}
+
+    def test_line_without_colon(self):
+        """
+        Verify the line number of a malformed line is reported.
+        """
+        stream = anvl.readANVLStream(['key: value', '', 'foo bar'])
+        with pytest.raises(anvl.InvalidANVLRecord) as e:
+            list(stream)
+        assert 'line 3' in str(e.value)
+
+
 class Test_breakString(object):
     def test_breakString_breaks_line(self):
         """
@@ -113,6 +293,54 @@ class Test_breakString(object):
         assert len(lines[0]) == 11
         assert len(lines[1]) == 19
 
+    def test_breakString_long_value(self):
+        """
+        Check that a value folding to far more lines than the recursion
+        limit is broken without error.
+        """
+        string = ' '.join(['word'] * 200000)
+        lines = anvl.breakString(string, width=20).split('\n')
+
+        assert len(lines) > 40000
+        assert max(len(line) for line in lines) <= 20
+        assert ''.join(lines) == string
+
+    def test_breakString_trailing_space(self):
+        """
+        Verify a space just past the line width at the end of the text
+        is not used as a break point.
+        """
+        assert anvl.breakString('abc def ', width=7) == 'abc\n def '
+
+
+class Test_writeANVL(object):
+    def test_matches_writeANVLString(self):
+        """
+        Check that writeANVL writes what writeANVLString returns.
+        """
+        input_dict = {
+            'foo': 'bar',
+            'Internal-Sender-Description': ' '.join(['folded'] * 50),
+        }
+        output = io.StringIO()
+        anvl.writeANVL(output, input_dict)
+
+        assert output.getvalue() == anvl.writeANVLString(input_dict)
+        assert '\n' in output.getvalue()
+
+    def test_writes_repeated_keys(self):
+        """
+        Verify every value of a repeated key in an ANVLMultiDict is
+        written, in order within the key.
+        """
+        tags = anvl.ANVLMultiDict(
+            [('b', 'first'), ('a', 'value'), ('b', 'second')]
+        )
+        output = io.StringIO()
+        anvl.writeANVL(output, tags)
+
+        assert output.getvalue() == 'a: value\nb: first\nb: second'
+
 
 class Test_writeANVLString(object):
     def test_output_is_valid_ANVL(self):
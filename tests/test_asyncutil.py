@@ -0,0 +1,338 @@
+import asyncio
+import gzip
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from codalib import asyncutil, util
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class StubServer(object):
+    """
+    A minimal asyncio HTTP server that records requests and answers with
+    a canned status, optionally holding each reply for `delay` seconds
+    and labelling the body with a Content-Encoding.  With a redirect of
+    (status, path), requests for any other path are sent there.
+    """
+
+    def __init__(self, status=200, body=b"ok", delay=0, chunked=False,
+                 encoding=None, redirect=None):
+        self.status = status
+        self.body = body
+        self.delay = delay
+        self.chunked = chunked
+        self.encoding = encoding
+        self.redirect = redirect
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, "127.0.0.1", 0
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = "http://127.0.0.1:%d/" % port
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            requestLine = (await reader.readline()).decode().split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode().rstrip("\r\n")
+                if not line:
+                    break
+                key, value = line.split(":", 1)
+                headers[key.lower()] = value.strip()
+            body = await reader.readexactly(
+                int(headers.get("content-length", 0))
+            )
+            self.requests.append((requestLine[0], requestLine[1], headers, body))
+            await asyncio.sleep(self.delay)
+            if self.redirect and requestLine[1] != self.redirect[1]:
+                writer.write(b"HTTP/1.1 %d Moved\r\nLocation: %s\r\n"
+                             b"Content-Length: 0\r\n\r\n" % (
+                                 self.redirect[0], self.redirect[1].encode()))
+                await writer.drain()
+                return
+            writer.write(b"HTTP/1.1 %d Stub\r\n" % self.status)
+            if self.encoding:
+                writer.write(b"Content-Encoding: %s\r\n" % self.encoding)
+            if self.chunked:
+                writer.write(b"Transfer-Encoding: chunked\r\n\r\n")
+                for i in range(0, len(self.body), 3):
+                    chunk = self.body[i:i + 3]
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                writer.write(b"0\r\n\r\n")
+            else:
+                writer.write(b"Content-Length: %d\r\n\r\n" % len(self.body))
+                writer.write(self.body)
+            await writer.drain()
+        finally:
+            self.active -= 1
+            writer.close()
+
+
+def serve(test, **kwargs):
+    """
+    Run `test(server)` on a fresh loop with a stub server listening.
+    """
+    async def main():
+        server = await StubServer(**kwargs).start()
+        try:
+            return await test(server)
+        finally:
+            await server.stop()
+    return run(main())
+
+
+class Test_doWebRequest(object):
+
+    def test_get(self):
+        async def test(server):
+            response, content = await asyncutil.doWebRequest(
+                server.url + "path?q=1", headers={"X-Test": "yes"}
+            )
+            assert response.getcode() == 200
+            assert content == b"ok"
+            method, path, headers, body = server.requests[0]
+            assert (method, path, body) == ("GET", "/path?q=1", b"")
+            assert headers["x-test"] == "yes"
+        serve(test)
+
+    def test_put_sends_body(self):
+        async def test(server):
+            await asyncutil.doWebRequest(server.url, "PUT", data=b"<xml/>")
+            method, path, headers, body = server.requests[0]
+            assert method == "PUT"
+            assert body == b"<xml/>"
+        serve(test)
+
+    def test_chunked_response(self):
+        async def test(server):
+            response, content = await asyncutil.doWebRequest(server.url)
+            assert content == b"a chunked body"
+        serve(test, body=b"a chunked body", chunked=True)
+
+    def test_gzipped_response(self):
+        async def test(server):
+            response, content = await asyncutil.doWebRequest(
+                server.url, headers={"Accept-Encoding": "gzip"}
+            )
+            assert content == b"a gzipped body"
+            method, path, headers, body = server.requests[0]
+            assert headers["accept-encoding"] == "gzip"
+        serve(test, body=gzip.compress(b"a gzipped body"), chunked=True,
+              encoding=b"gzip")
+
+    def test_error_status_raises_HTTPError(self):
+        async def test(server):
+            with pytest.raises(HTTPError) as exc:
+                await asyncutil.doWebRequest(server.url)
+            assert exc.value.code == 404
+        serve(test, status=404)
+
+    def test_connection_refused_raises_URLError(self):
+        async def test(server):
+            url = server.url
+            await server.stop()
+            with pytest.raises(URLError):
+                await asyncutil.doWebRequest(url)
+        serve(test)
+
+    def test_follows_redirect(self):
+        async def test(server):
+            response, content = await asyncutil.doWebRequest(server.url + "old")
+            assert response.geturl() == server.url + "new"
+            assert content == b"ok"
+            assert [r[1] for r in server.requests] == ["/old", "/new"]
+        serve(test, redirect=(302, "/new"))
+
+    def test_redirected_post_becomes_get(self):
+        async def test(server):
+            await asyncutil.doWebRequest(server.url, "POST", data=b"<xml/>")
+            (method, path, headers, body), = server.requests[1:]
+            assert (method, path, body) == ("GET", "/new", b"")
+            assert "content-length" not in headers
+        serve(test, redirect=(303, "/new"))
+
+    def test_redirected_put_raises_HTTPError(self):
+        async def test(server):
+            with pytest.raises(HTTPError) as exc:
+                await asyncutil.doWebRequest(server.url, "PUT", data=b"<xml/>")
+            assert exc.value.code == 307
+            assert len(server.requests) == 1
+        serve(test, redirect=(307, "/new"))
+
+    def test_too_many_redirects_raise_HTTPError(self, monkeypatch):
+        monkeypatch.setattr(asyncutil, "MAX_REDIRECTS", 0)
+
+        async def test(server):
+            with pytest.raises(HTTPError) as exc:
+                await asyncutil.doWebRequest(server.url)
+            assert exc.value.code == 302
+            assert len(server.requests) == 1
+        serve(test, redirect=(302, "/new"))
+
+    def test_stalled_server_times_out(self, monkeypatch):
+        monkeypatch.setattr(asyncutil, "TIMEOUT", 0.05)
+
+        async def test(server):
+            with pytest.raises(URLError) as exc:
+                await asyncutil.doWebRequest(server.url)
+            assert "timed out" in str(exc.value.reason)
+            # Let the stub finish answering before the loop closes
+            await asyncio.sleep(0.2)
+        serve(test, delay=0.1)
+
+    def test_concurrency_limit(self, monkeypatch):
+        monkeypatch.setattr(asyncutil, "CONCURRENCY_LIMIT", 3)
+
+        async def test(server):
+            results = await asyncio.gather(*[
+                asyncutil.doWebRequest(server.url) for _ in range(10)
+            ])
+            assert len(results) == 10
+            assert len(server.requests) == 10
+            assert server.peak == 3
+        serve(test, delay=0.05)
+
+
+class Test_sendPREMISEvent(object):
+
+    def test_posts_event(self):
+        async def test(server):
+            response, content = await asyncutil.sendPREMISEvent(
+                server.url, "ingest", "agent", "detail", "success"
+            )
+            method, path, headers, body = server.requests[0]
+            assert method == "POST"
+            assert body.startswith(b'<?xml version="1.0"?>\n')
+            assert b"premis:event" in body
+        serve(test, status=201)
+
+    def test_posts_compressed_event(self):
+        async def test(server):
+            await asyncutil.sendPREMISEvent(
+                server.url, "ingest", "agent", "detail", "success",
+                pretty_print=False, compress=True
+            )
+            method, path, headers, body = server.requests[0]
+            assert headers["content-encoding"] == "gzip"
+            body = gzip.decompress(body)
+            assert body.startswith(b'<?xml version="1.0"?>\n<entry')
+            assert body.count(b"\n") == 1
+        serve(test, status=201)
+
+    def test_raises_on_wrong_status(self):
+        async def test(server):
+            with pytest.raises(Exception) as exc:
+                await asyncutil.sendPREMISEvent(
+                    server.url, "ingest", "agent", "detail", "success"
+                )
+            assert "Response code is 200" in str(exc.value)
+        serve(test, status=200)
+
+
+class Test_queue(object):
+
+    def test_updateQueue(self, queue_dict):
+        async def test(server):
+            await asyncutil.updateQueue(server.url, queue_dict)
+            method, path, headers, body = server.requests[0]
+            assert (method, path) == ("PUT", "/APP/queue/fake_ark/")
+            assert b"fake oxum" in body
+        serve(test)
+
+    def test_updateQueue_compressed(self, queue_dict):
+        async def test(server):
+            await asyncutil.updateQueue(server.url, queue_dict,
+                                        pretty_print=False, compress=True)
+            method, path, headers, body = server.requests[0]
+            assert headers["content-encoding"] == "gzip"
+            assert b"fake oxum" in gzip.decompress(body)
+        serve(test)
+
+    def test_updateQueue_raises_on_wrong_status(self, queue_dict):
+        async def test(server):
+            with pytest.raises(Exception):
+                await asyncutil.updateQueue(server.url, queue_dict)
+        serve(test, status=201)
+
+    def test_deleteQueue(self):
+        async def test(server):
+            await asyncutil.deleteQueue(server.url, "fake_ark")
+            method, path, headers, body = server.requests[0]
+            assert (method, path) == ("DELETE", "/APP/queue/fake_ark/")
+        serve(test)
+
+
+def test_doWaitWebRequest_retries_until_reachable(monkeypatch):
+    realDoWebRequest = asyncutil.doWebRequest
+    calls = []
+    waits = []
+
+    async def flakyDoWebRequest(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise URLError("connection refused")
+        return await realDoWebRequest(*args)
+
+    async def fakeWaitForURL(url, max_seconds=None):
+        waits.append(url)
+
+    monkeypatch.setattr(asyncutil, "doWebRequest", flakyDoWebRequest)
+    monkeypatch.setattr(asyncutil, "waitForURL", fakeWaitForURL)
+
+    async def test(server):
+        response, content = await asyncutil.doWaitWebRequest(server.url)
+        assert response.getcode() == 200
+        assert waits == [server.url]
+    serve(test)
+    assert len(calls) == 2
+
+
+def test_updateQueue_retries_with_policy(queue_dict, monkeypatch):
+    realDoWebRequest = asyncutil.doWebRequest
+    calls = []
+
+    async def flakyDoWebRequest(*args, **kwargs):
+        calls.append(args)
+        if len(calls) < 3:
+            raise URLError("connection refused")
+        return await realDoWebRequest(*args, **kwargs)
+
+    monkeypatch.setattr(asyncutil, "doWebRequest", flakyDoWebRequest)
+    policy = util.RetryPolicy(base_delay=0.01, max_attempts=3)
+
+    async def test(server):
+        await asyncutil.updateQueue(server.url, queue_dict, retry=policy)
+        assert len(server.requests) == 1
+    serve(test)
+    assert len(calls) == 3
+
+
+def test_doWaitWebRequest_gives_up_with_policy():
+    async def test(server):
+        url = server.url
+        await server.stop()
+        with pytest.raises(URLError):
+            await asyncutil.doWaitWebRequest(
+                url, retry=util.RetryPolicy(base_delay=0.01, max_attempts=2)
+            )
+    serve(test)
@@ -0,0 +1,196 @@
+from io import BytesIO
+from unittest.mock import Mock
+from urllib.error import HTTPError, URLError
+import sqlite3
+import threading
+import time
+
+from lxml import etree
+import pytest
+
+from codalib import util
+from . import stub_response
+from codalib.outbox import Outbox
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / 'outbox.sqlite')
+
+
+@pytest.fixture
+def outbox(outbox_path):
+    with Outbox(outbox_path, retry=util.RetryPolicy(base_delay=60, jitter=0)) as outbox:
+        yield outbox
+
+
+def test_recording_does_not_send(outbox, queue_dict, monkeypatch):
+    doWebRequest = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    outbox.sendPREMISEvent('http://example.com/event/', 'type', 'agent',
+                           'detail', 'outcome')
+    outbox.updateQueue('http://example.com/', queue_dict)
+
+    assert outbox.pending() == 2
+    assert not doWebRequest.called
+
+
+def test_survives_reopening(outbox_path, monkeypatch):
+    with Outbox(outbox_path) as outbox:
+        outbox.sendPREMISEvent('http://example.com/event/', 'type', 'agent',
+                               'detail', 'outcome')
+    doWebRequest = Mock(return_value=(stub_response(201), b''))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    with Outbox(outbox_path) as outbox:
+        assert outbox.pending() == 1
+        assert outbox.flush() == 1
+        assert outbox.pending() == 0
+
+
+def test_flush_delivers_in_order(outbox, queue_dict, monkeypatch):
+    doWebRequest = Mock(side_effect=[(stub_response(201), b''), (stub_response(200), b'')])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    outbox.sendPREMISEvent('http://example.com/event/', 'type', 'agent',
+                           'detail', 'outcome', eventIdentifier='abc123')
+    outbox.updateQueue('http://example.com/', queue_dict)
+
+    assert outbox.flush() == 2
+    assert outbox.pending() == 0
+    (url, method), kwargs = doWebRequest.call_args_list[0]
+    assert (url, method) == ('http://example.com/event/', 'POST')
+    event = etree.fromstring(kwargs['data'])
+    assert event.findtext('.//{info:lc/xmlns/premis-v2}eventIdentifierValue') == 'abc123'
+    (url, method), kwargs = doWebRequest.call_args_list[1]
+    assert (url, method) == ('http://example.com/APP/queue/fake_ark/', 'PUT')
+
+
+def test_unreachable_server_backs_off(outbox, monkeypatch):
+    doWebRequest = Mock(side_effect=URLError('refused'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    outbox.put('POST', 'http://example.com/1', b'one', 201)
+    outbox.put('POST', 'http://example.com/2', b'two', 201)
+
+    assert outbox.flush() == 0
+    # Nothing behind the failed upload is tried, and it waits its delay
+    assert doWebRequest.call_count == 1
+    assert outbox.flush() == 0
+    assert doWebRequest.call_count == 1
+    assert outbox.pending() == 2
+
+    doWebRequest.side_effect = None
+    doWebRequest.return_value = (stub_response(201), b'')
+    now = time.time()
+    monkeypatch.setattr('time.time', lambda: now + 61)
+    assert outbox.flush() == 2
+
+
+def test_rejected_upload_is_set_aside(outbox, monkeypatch):
+    error = HTTPError('http://example.com/1', 400, 'Bad', {}, BytesIO(b''))
+    doWebRequest = Mock(side_effect=[error, (stub_response(201), b'')])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    outbox.put('POST', 'http://example.com/1', b'one', 201)
+    outbox.put('POST', 'http://example.com/2', b'two', 201)
+
+    assert outbox.flush() == 1
+    assert outbox.pending() == 0
+    failed = outbox.failed()
+    assert [item.url for item in failed] == ['http://example.com/1']
+    assert 'HTTP Error 400' in failed[0].last_error
+
+    doWebRequest.side_effect = None
+    doWebRequest.return_value = (stub_response(201), b'')
+    outbox.requeueFailed()
+    assert outbox.flush() == 1
+    assert outbox.failed() == []
+
+
+def test_unexpected_status_is_set_aside(outbox, monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(200), b'huh'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    outbox.put('POST', 'http://example.com/1', b'one', 201)
+
+    assert outbox.flush() == 0
+    assert 'Response code is 200' in outbox.failed()[0].last_error
+
+
+def test_gives_up_after_max_attempts(outbox_path, monkeypatch):
+    doWebRequest = Mock(side_effect=URLError('refused'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    policy = util.RetryPolicy(base_delay=0, jitter=0, max_attempts=3)
+    with Outbox(outbox_path, retry=policy) as outbox:
+        outbox.put('POST', 'http://example.com/1', b'one', 201)
+        for i in range(3):
+            outbox.flush()
+        assert doWebRequest.call_count == 3
+        assert outbox.pending() == 0
+        assert outbox.failed()[0].attempts == 3
+
+
+def test_background_flusher(outbox, monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(201), b''))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    outbox.start()
+    for i in range(5):
+        outbox.put('POST', 'http://example.com/%d' % i, b'', 201)
+    deadline = time.time() + 5
+    while outbox.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    outbox.stop()
+    assert outbox.pending() == 0
+    assert [c[0][0] for c in doWebRequest.call_args_list] == [
+        'http://example.com/%d' % i for i in range(5)
+    ]
+
+
+def test_background_flusher_survives_database_errors(outbox, monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(201), b''))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    next_ = outbox._next
+    failures = [sqlite3.OperationalError('database is locked')] * 3
+
+    def flakyNext():
+        if failures:
+            raise failures.pop()
+        return next_()
+
+    monkeypatch.setattr(outbox, '_next', flakyNext)
+    outbox.flush_interval = 0.01
+    outbox.put('POST', 'http://example.com/', b'', 201)
+    outbox.start()
+    deadline = time.time() + 5
+    while outbox.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    assert outbox._thread.is_alive()
+    outbox.stop()
+    assert failures == []
+    assert outbox.pending() == 0
+    assert doWebRequest.call_count == 1
+
+
+def test_close_waits_for_delivery_after_stop_times_out(outbox, monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+
+    def slowRequest(*args, **kwargs):
+        entered.set()
+        release.wait(5)
+        return stub_response(201), b''
+
+    monkeypatch.setattr('codalib.util.doWebRequest', slowRequest)
+    outbox.put('POST', 'http://example.com/', b'', 201)
+    outbox.start()
+    assert entered.wait(5)
+    assert outbox.stop(timeout=0.05) is False
+    thread = outbox._thread
+    assert thread.is_alive()
+
+    closer = threading.Thread(target=outbox.close)
+    closer.start()
+    closer.join(0.1)
+    assert closer.is_alive()
+    release.set()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert not thread.is_alive()
+    assert outbox._thread is None
@@ -0,0 +1,199 @@
+import gzip
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError, URLError
+import threading
+
+import pytest
+
+from codalib import util
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Answers every request with the status in server.status and records
+    (method, path, body, client port) on the server, and the request
+    headers in server.headers.  Responses are gzipped for clients that
+    accept it when server.gzipResponses is set.
+    """
+    protocol_version = "HTTP/1.1"
+    # Send each response in one write rather than header and body apart
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.requests.append(
+            (self.command, self.path, body, self.client_address[1])
+        )
+        self.server.headers.append(self.headers)
+        content = b"content"
+        self.send_response(self.server.status)
+        if (self.server.gzipResponses and
+                "gzip" in self.headers.get("Accept-Encoding", "")):
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+        # Drop the connection without telling the client, like a server
+        # timing out an idle keep-alive connection
+        if self.server.dropConnections:
+            self.close_connection = True
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = respond
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.status = 200
+    httpd.dropConnections = False
+    httpd.requests = []
+    httpd.headers = []
+    httpd.gzipResponses = False
+    httpd.url = "http://127.0.0.1:%d/" % httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session():
+    with util.CodaSession(timeout=5) as session:
+        yield session
+
+
+def connections(server):
+    return set(request[3] for request in server.requests)
+
+
+def test_reuses_connection(server, session):
+    for i in range(5):
+        response, content = session.doWebRequest(server.url + "item/%d" % i)
+        assert response.getcode() == 200
+        assert content == b"content"
+    assert len(server.requests) == 5
+    assert len(connections(server)) == 1
+
+
+def test_sends_body_and_headers(server, session):
+    session.doWebRequest(server.url, "PUT", data=b"<xml/>",
+                         headers={"content-type": "application/atom+xml"})
+    method, path, body, port = server.requests[0]
+    assert (method, path, body) == ("PUT", "/", b"<xml/>")
+
+
+def test_error_status_raises_HTTPError(server, session):
+    server.status = 404
+    with pytest.raises(HTTPError) as exc:
+        session.doWebRequest(server.url)
+    assert exc.value.code == 404
+    server.status = 200
+    session.doWebRequest(server.url)
+    assert len(connections(server)) == 1
+
+
+def test_reconnects_after_server_drops_connection(server, session):
+    server.dropConnections = True
+    for i in range(3):
+        response, content = session.doWebRequest(server.url)
+        assert response.getcode() == 200
+    assert len(connections(server)) == 3
+
+
+def test_connection_refused_raises_URLError(session):
+    with pytest.raises(URLError):
+        session.doWebRequest("http://127.0.0.1:1/")
+
+
+def test_shared_between_threads(server, session):
+    errors = []
+
+    def worker():
+        try:
+            for i in range(20):
+                session.doWebRequest(server.url)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(server.requests) == 80
+    assert len(connections(server)) <= 4
+
+
+def test_doWebRequest_uses_session(server, session):
+    util.doWebRequest(server.url, session=session)
+    util.doWebRequest(server.url, "POST", data=b"x", session=session)
+    assert len(connections(server)) == 1
+
+
+def test_queue_helpers_use_session(server, session, queue_dict):
+    util.updateQueue(server.url, queue_dict, session=session)
+    util.deleteQueue(server.url, 'fake_ark', session=session)
+    assert [r[:2] for r in server.requests] == [
+        ("PUT", "/APP/queue/fake_ark/"),
+        ("DELETE", "/APP/queue/fake_ark/"),
+    ]
+    assert len(connections(server)) == 1
+
+
+def test_sendPREMISEvent_uses_session(server, session):
+    server.status = 201
+    util.sendPREMISEvent(server.url, "ingest", "agent", "detail", "success",
+                         session=session)
+    util.sendPREMISEvent(server.url, "ingest", "agent", "detail", "success",
+                         session=session)
+    assert [r[0] for r in server.requests] == ["POST", "POST"]
+    assert len(connections(server)) == 1
+
+
+def test_decodes_gzip_response(server, session):
+    server.gzipResponses = True
+    for s in (session, None):
+        response, content = util.doWebRequest(
+            server.url, headers={"Accept-Encoding": "gzip"}, session=s
+        )
+        assert content == b"content"
+    response, content = util.doWebRequest(server.url, session=session)
+    assert content == b"content"
+    assert [h["Accept-Encoding"] for h in server.headers] == \
+        ["gzip", "gzip", "identity"]
+
+
+def test_decodes_gzip_error_body(server, session):
+    server.gzipResponses = True
+    server.status = 500
+    with pytest.raises(HTTPError) as exc:
+        session.doWebRequest(server.url, headers={"Accept-Encoding": "gzip"})
+    assert exc.value.read() == b"content"
+
+
+def test_uploads_compressed(server, session):
+    server.status = 201
+    server.gzipResponses = True
+    response, content = util.sendPREMISEvent(
+        server.url, "ingest", "agent", "detail", "success", session=session,
+        pretty_print=False, compress=True
+    )
+    assert content == b"content"
+    body = gzip.decompress(server.requests[0][2])
+    assert body.startswith(b'<?xml version="1.0"?>\n<entry')
+    assert b"\n" not in body.split(b"\n", 1)[1]
+    assert server.headers[0]["Content-Encoding"] == "gzip"
@@ -0,0 +1,137 @@
+from io import BytesIO
+from unittest.mock import Mock
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from codalib import util
+
+
+def http_error(code):
+    return HTTPError('http://example.com', code, 'Error', {}, BytesIO(b''))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Record the sleeps a policy asks for instead of sleeping.
+    """
+    sleeps = []
+    monkeypatch.setattr('time.sleep', sleeps.append)
+    return sleeps
+
+
+def test_delay_backs_off_exponentially_to_cap():
+    policy = util.RetryPolicy(base_delay=1, max_delay=10, jitter=0)
+    assert [policy.delay(n) for n in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+
+
+def test_jitter_shortens_delay(monkeypatch):
+    policy = util.RetryPolicy(base_delay=8, jitter=0.5)
+    monkeypatch.setattr('random.random', lambda: 1.0)
+    assert policy.delay(1) == 4
+    monkeypatch.setattr('random.random', lambda: 0.0)
+    assert policy.delay(1) == 8
+
+
+def test_max_attempts():
+    policy = util.RetryPolicy(jitter=0, max_attempts=3)
+    assert policy.nextDelay(2, 0) == 2
+    assert policy.nextDelay(3, 0) is None
+
+
+def test_deadline(monkeypatch):
+    policy = util.RetryPolicy(base_delay=4, jitter=0, deadline=10)
+    monkeypatch.setattr('time.monotonic', lambda: 107)
+    # Never sleeps past the deadline
+    assert policy.nextDelay(1, 100) == 3
+    assert policy.nextDelay(1, 90) is None
+
+
+@pytest.mark.parametrize('error, expected', [
+    (URLError('refused'), True),
+    (http_error(503), True),
+    (http_error(404), False),
+    (ValueError('not a request error'), False),
+])
+def test_retryable(error, expected):
+    assert util.RetryPolicy().retryable(error) is expected
+
+
+def test_call_retries_until_success(sleeps):
+    func = Mock(side_effect=[URLError('refused'), http_error(503), 'done'])
+    policy = util.RetryPolicy(base_delay=1, jitter=0)
+    assert policy.call(func, 'a', b='c') == 'done'
+    assert func.call_count == 3
+    func.assert_called_with('a', b='c')
+    assert sleeps == [1, 2]
+
+
+def test_call_raises_when_attempts_run_out(sleeps):
+    func = Mock(side_effect=URLError('refused'))
+    policy = util.RetryPolicy(jitter=0, max_attempts=4)
+    with pytest.raises(URLError):
+        policy.call(func)
+    assert func.call_count == 4
+    assert len(sleeps) == 3
+
+
+def test_call_does_not_retry_other_errors(sleeps):
+    func = Mock(side_effect=http_error(400))
+    with pytest.raises(HTTPError):
+        util.RetryPolicy().call(func)
+    assert func.call_count == 1
+    assert sleeps == []
+
+
+def test_updateQueue_uses_policy(queue_dict, sleeps, monkeypatch):
+    response = Mock()
+    response.getcode.return_value = 200
+    doWebRequest = Mock(side_effect=[URLError('refused'),
+                                     URLError('refused'),
+                                     (response, 'content')])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    policy = util.RetryPolicy(base_delay=0.5, jitter=0)
+    util.updateQueue('http://example.com/', queue_dict, retry=policy)
+
+    assert doWebRequest.call_count == 3
+    assert sleeps == [0.5, 1]
+
+
+def test_doWaitWebRequest_gives_up(sleeps, monkeypatch):
+    doWebRequest = Mock(side_effect=URLError('refused'))
+    waitForURL = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.waitForURL', waitForURL)
+
+    with pytest.raises(URLError):
+        util.doWaitWebRequest('http://example.com',
+                              retry=util.RetryPolicy(max_attempts=5))
+    assert doWebRequest.call_count == 5
+    assert not waitForURL.called
+
+
+def test_waitForURL_gives_up(sleeps, monkeypatch):
+    urlopen = Mock(side_effect=URLError('refused'))
+    monkeypatch.setattr('urllib.request.urlopen', urlopen)
+
+    util.waitForURL('http://example.com',
+                    retry=util.RetryPolicy(base_delay=2, jitter=0, max_attempts=3))
+    assert urlopen.call_count == 3
+    assert sleeps == [2, 4]
+
+
+def test_sendPREMISEvent_uses_policy(sleeps, monkeypatch):
+    response = Mock()
+    response.code = 201
+    doWebRequest = Mock(side_effect=[http_error(502), (response, 'content')])
+    waitForURL = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.waitForURL', waitForURL)
+
+    util.sendPREMISEvent('http://example.com', 'type', 'agent', 'detail',
+                         'outcome', retry=util.RetryPolicy(jitter=0))
+    assert doWebRequest.call_count == 2
+    assert sleeps == [1]
+    assert not waitForURL.called
@@ -0,0 +1,90 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from lxml import etree
+import pytest
+
+from codalib import util
+
+
+@pytest.fixture()
+def premis_args():
+    return dict(
+        eventType='big event',
+        agentIdentifier='me',
+        eventDetail='details of my event',
+        eventOutcome='huge success',
+        outcomeDetail='lots of music',
+        eventIdentifier='1102 ave B.',
+        linkObjectList=[('ark:/67531/coda1', 'ark', 'source'),
+                        ('ark:/67531/coda2', 'ark', None)],
+        eventDate=datetime(2015, 1, 1)
+    )
+
+
+@pytest.mark.parametrize('pretty_print', [False, True])
+@pytest.mark.parametrize('changes', [
+    {},
+    {'outcomeDetail': None},
+    {'linkObjectList': []},
+    {'linkObjectList': ['abc', 'bcd']},
+    {'eventType': None, 'eventDetail': '', 'agentIdentifier': None},
+    {'eventDetail': 'a < b && c > "d"\r\n\t\'e\''},
+    {'eventOutcome': 'caf\xe9 ☃ \U0001F600'},
+    {'eventDate': datetime(2015, 1, 1, 12, 30, 15, 1234)},
+])
+def test_matches_tostring(premis_args, changes, pretty_print):
+    premis_args.update(changes)
+    expected = etree.tostring(util.createPREMISEventXML(**premis_args),
+                              pretty_print=pretty_print)
+    assert util.createPREMISEventBytes(pretty_print=pretty_print,
+                                       **premis_args) == expected
+
+
+def test_default_identifier_and_date(premis_args):
+    premis_args.update(eventIdentifier=None, eventDate=None)
+    event = etree.fromstring(util.createPREMISEventBytes(**premis_args))
+    value = event.find('.//%seventIdentifierValue' % util.PREMIS)
+    assert len(value.text) == 32
+    assert event.find('%seventDateTime' % util.PREMIS).text
+
+
+@pytest.mark.parametrize('pretty_print', [False, True])
+def test_premisEventToBytes(premis_args, pretty_print):
+    event = util.PremisEvent(**premis_args)
+    assert util.premisEventToBytes(event, pretty_print=pretty_print) == \
+        util.createPREMISEventBytes(pretty_print=pretty_print, **premis_args)
+
+
+def test_requires_fields():
+    with pytest.raises(TypeError):
+        util.createPREMISEventBytes('big event')
+
+
+@pytest.mark.parametrize('value, error', [
+    ('bell \x07', ValueError),
+    (5, TypeError),
+])
+def test_rejects_what_lxml_rejects(premis_args, value, error):
+    premis_args['eventDetail'] = value
+    with pytest.raises(error):
+        util.createPREMISEventBytes(**premis_args)
+
+
+def test_leaves_bytes_to_lxml(premis_args):
+    premis_args['eventDetail'] = b'details'
+    expected = etree.tostring(util.createPREMISEventXML(**premis_args))
+    assert util.createPREMISEventBytes(**premis_args) == expected
+
+
+@pytest.mark.parametrize('pretty_print', [False, True])
+@patch('codalib.util.uuid.uuid1')
+@patch('codalib.bagatom.xsDateTime_format_local', return_value='2019-10-02T17:58:19-05:00')
+def test_atom_matches_wrapAtom(mock_xsdt, mock_uuid1, premis_args, pretty_print):
+    mock_uuid1.return_value.hex = '20b28e4ee56811e9905154bf64888bf3'
+    premis_args['eventOutcomeDetail'] = premis_args.pop('outcomeDetail')
+    expected = b'<?xml version="1.0"?>\n' + etree.tostring(
+        util._makePREMISEventEntry(**premis_args), pretty_print=pretty_print
+    )
+    assert util._makePREMISEventAtom(pretty_print=pretty_print,
+                                     **premis_args) == expected
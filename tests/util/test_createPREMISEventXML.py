@@ -472,3 +472,21 @@ def test_linkObjectList_handles_any_size_tuple(object_list, premis_args):
     """
     premis_args.update(linkObjectList=object_list)
     util.createPREMISEventXML(**premis_args)
+
+
+def test_premisEventToXML(premis_args):
+    """
+    Check that a PremisEvent gives the same XML as the separate fields.
+    """
+    event = util.PremisEvent(**premis_args)
+    from_fields = util.createPREMISEventXML(**premis_args)
+    from_record = util.premisEventToXML(event)
+    assert etree.tostring(from_record) == etree.tostring(from_fields)
+
+
+def test_requires_fields():
+    """
+    Check that leaving out the required fields is still an error.
+    """
+    with pytest.raises(TypeError):
+        util.createPREMISEventXML('event type')
@@ -39,5 +39,5 @@ def test_retries_request(monkeypatch):
     return_value = util.doWaitWebRequest(url)
 
     assert waitForURL.call_count == 1
-    waitForURL.assert_called_with(url)
+    waitForURL.assert_called_with(url, session=None)
     assert return_value == (response, 'fake content')
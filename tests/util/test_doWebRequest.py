@@ -1,4 +1,9 @@
+import gzip
 from unittest.mock import Mock
+from urllib.error import URLError
+import zlib
+
+import pytest
 
 from codalib import util
 
@@ -126,3 +131,33 @@ def test_with_get_method(monkeypatch):
 
     assert return_value == (response, response.read())
     request.assert_called_with(url, headers={})
+
+
+@pytest.mark.parametrize('encoding, compress', [
+    ('gzip', gzip.compress),
+    ('x-gzip', gzip.compress),
+    ('deflate', zlib.compress),
+    ('deflate', lambda data: zlib.compress(data)[2:-4]),
+])
+def test_decodes_content_encoding(monkeypatch, encoding, compress):
+    """
+    Check that a compressed response body is returned decoded.
+    """
+    response = Mock(headers={'Content-Encoding': encoding})
+    response.read.return_value = compress(b'test content')
+    monkeypatch.setattr('urllib.request.urlopen', Mock(return_value=response))
+
+    return_value = util.doWebRequest('http://example.com/foo/bar')
+    assert return_value == (response, b'test content')
+
+
+def test_raises_on_corrupt_content_encoding(monkeypatch):
+    """
+    Verify a body that does not decode raises URLError.
+    """
+    response = Mock(headers={'Content-Encoding': 'gzip'})
+    response.read.return_value = b'not gzip'
+    monkeypatch.setattr('urllib.request.urlopen', Mock(return_value=response))
+
+    with pytest.raises(URLError):
+        util.doWebRequest('http://example.com/foo/bar')
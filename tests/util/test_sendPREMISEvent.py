@@ -1,4 +1,5 @@
 from datetime import datetime
+import gzip
 from unittest.mock import Mock, patch, mock_open, call
 from urllib.error import URLError
 
@@ -39,7 +40,8 @@ EVENT = b"""<?xml version="1.0"?>
 @patch('codalib.util.uuid.uuid4')
 @patch('codalib.util.uuid.uuid1')
 @patch('codalib.bagatom.xsDateTime_format', return_value='2019-10-02T17:58:19.982448-05:00')
-def test_is_successful(mock_xsdt, mock_uuid1, mock_uuid4, mock_doWebRequest):
+@patch('codalib.bagatom.xsDateTime_format_local', return_value='2019-10-02T17:58:19.982448-05:00')
+def test_is_successful(mock_xsdt_local, mock_xsdt, mock_uuid1, mock_uuid4, mock_doWebRequest):
     """
     Check that sendPremisEvent returns the response and content.
 
@@ -55,7 +57,8 @@ def test_is_successful(mock_xsdt, mock_uuid1, mock_uuid4, mock_doWebRequest):
                                   eventDate=datetime(2019, 10, 2, 22, 58, 19))
 
     assert actual == expected
-    mock_doWebRequest.assert_called_once_with('http://example.com', 'POST', data=EVENT)
+    mock_doWebRequest.assert_called_once_with('http://example.com', 'POST', data=EVENT,
+                                              headers={}, session=None)
 
 
 def test_raises_exception_when_doWebRequest_fails(monkeypatch):
@@ -114,3 +117,27 @@ def test_raises_exception_without_201_status_with_debug(monkeypatch):
     calls = [call().write(b'Fake content'), call().close()]
     m.assert_has_calls(calls)
     assert doWebRequest.call_count == 1
+
+
+@patch('codalib.util.doWebRequest')
+@patch('codalib.util.uuid.uuid4')
+@patch('codalib.util.uuid.uuid1')
+@patch('codalib.bagatom.xsDateTime_format', return_value='2019-10-02T17:58:19.982448-05:00')
+@patch('codalib.bagatom.xsDateTime_format_local', return_value='2019-10-02T17:58:19.982448-05:00')
+def test_compact_and_compressed(mock_xsdt_local, mock_xsdt, mock_uuid1, mock_uuid4,
+                                mock_doWebRequest):
+    """
+    Check that the event is sent without indentation and gzipped when
+    asked to.
+    """
+    mock_doWebRequest.return_value = (Mock(code=201), b'Fake content')
+    mock_uuid1.return_value.hex = mock_uuid4.return_value.hex = '20b28e4ee56811e9905154bf64888bf3'
+
+    util.sendPREMISEvent('http://example.com', None, None, None, None,
+                         eventDate=datetime(2019, 10, 2, 22, 58, 19),
+                         pretty_print=False, compress=True)
+
+    args, kwargs = mock_doWebRequest.call_args
+    assert kwargs['headers'] == {'Content-Encoding': 'gzip', 'Accept-Encoding': 'gzip'}
+    compact = b''.join(line.strip() for line in EVENT.split(b'\n')[1:])
+    assert gzip.decompress(kwargs['data']) == b'<?xml version="1.0"?>\n' + compact
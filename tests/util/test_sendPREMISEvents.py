@@ -0,0 +1,207 @@
+from io import BytesIO
+from unittest.mock import Mock
+from urllib.error import HTTPError, URLError
+
+from lxml import etree
+import pytest
+
+from codalib import util
+from .. import stub_response
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+def make_events(count):
+    return [
+        {
+            'eventType': 'http://example.com/fixity',
+            'agentIdentifier': 'http://example.com/agent',
+            'eventDetail': 'Checked file %d' % i,
+            'eventOutcome': 'pass',
+            'linkObjectList': [('ark:/67531/coda%d' % i, 'ark', None)],
+        }
+        for i in range(count)
+    ]
+
+
+def rejected(code=415):
+    return HTTPError('http://example.com', code, 'Rejected', {},
+                     BytesIO(b'no feeds'))
+
+
+def test_sends_batches_as_feeds(monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(201), b'created'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    results = util.sendPREMISEvents('http://example.com', make_events(5),
+                                    batch_size=2)
+
+    assert doWebRequest.call_count == 3
+    assert [len(r.events) for r in results] == [2, 2, 1]
+    assert all(r.batched and r.ok for r in results)
+    feed = etree.fromstring(doWebRequest.call_args_list[0][1]['data'])
+    assert feed.tag == ATOM + 'feed'
+    entries = feed.findall(ATOM + 'entry')
+    assert len(entries) == 2
+    details = feed.findall('.//{info:lc/xmlns/premis-v2}eventDetail')
+    assert [d.text for d in details] == ['Checked file 0', 'Checked file 1']
+
+
+def test_no_events():
+    assert util.sendPREMISEvents('http://example.com', []) == []
+
+
+def test_bad_batch_size():
+    with pytest.raises(ValueError):
+        util.sendPREMISEvents('http://example.com', make_events(1),
+                              batch_size=0)
+
+
+def test_falls_back_to_single_sends(monkeypatch):
+    doWebRequest = Mock(side_effect=rejected())
+    sendPREMISEvent = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+    events = make_events(5)
+
+    results = util.sendPREMISEvents('http://example.com', events,
+                                    batch_size=2)
+
+    # Only the first batch is offered as a feed
+    assert doWebRequest.call_count == 1
+    assert sendPREMISEvent.call_count == 5
+    assert sendPREMISEvent.call_args_list[4][1]['eventDetail'] == 'Checked file 4'
+    assert not any(r.batched for r in results)
+    assert all(r.ok for r in results)
+    assert results[0].content == b'no feeds'
+
+
+def test_falls_back_on_unexpected_status(monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(200), b'ok'))
+    sendPREMISEvent = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+
+    results = util.sendPREMISEvents('http://example.com', make_events(3))
+
+    assert sendPREMISEvent.call_count == 3
+    assert not results[0].batched
+
+
+def test_reports_single_send_failures(monkeypatch):
+    error = Exception('Error uploading PREMIS Event')
+    doWebRequest = Mock(side_effect=rejected())
+    sendPREMISEvent = Mock(side_effect=[None, error, None])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+    events = make_events(3)
+
+    results = util.sendPREMISEvents('http://example.com', events)
+
+    assert not results[0].ok
+    assert results[0].errors == [(events[1], error)]
+
+
+def test_unreachable_server_fails_batch(monkeypatch):
+    error = URLError('Fake Error')
+    doWebRequest = Mock(side_effect=[error, error, (stub_response(201), b'')])
+    waitForURL = Mock()
+    sendPREMISEvent = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.waitForURL', waitForURL)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+    events = make_events(3)
+
+    results = util.sendPREMISEvents('http://example.com', events,
+                                    batch_size=2)
+
+    assert waitForURL.call_count == 1
+    assert not sendPREMISEvent.called
+    assert results[0].errors == [(events[0], error), (events[1], error)]
+    assert results[1].batched and results[1].ok
+
+
+def test_unwritable_event_sent_alone(monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(201), b'created'))
+    sendPREMISEvent = Mock(side_effect=[None, ValueError('bad character')])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+    events = make_events(4)
+    events[3]['eventDetail'] = 'bad \x01'
+
+    results = util.sendPREMISEvents('http://example.com', events,
+                                    batch_size=2)
+
+    assert doWebRequest.call_count == 1
+    assert results[0].batched and results[0].ok
+    assert not results[1].batched
+    assert sendPREMISEvent.call_count == 2
+    assert sendPREMISEvent.call_args_list[1][1]['eventDetail'] == 'bad \x01'
+    [(event, error)] = results[1].errors
+    assert event is events[3]
+    assert isinstance(error, ValueError)
+
+
+def test_unwritable_event_reported(monkeypatch):
+    doWebRequest = Mock(return_value=(stub_response(201), b'created'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    events = make_events(4)
+    events[3]['eventDetail'] = 'bad \x01'
+    events[2]['notAnArgument'] = True
+
+    results = util.sendPREMISEvents('http://example.com', events,
+                                    batch_size=2)
+
+    assert doWebRequest.call_count == 1
+    errors = results[1].errors
+    assert [event for event, error in errors] == events[2:]
+    assert isinstance(errors[0][1], TypeError)
+    assert isinstance(errors[1][1], ValueError)
+
+
+@pytest.mark.parametrize('code', [429, 500, 502, 503])
+def test_transient_error_fails_only_its_batch(monkeypatch, code):
+    error = rejected(code)
+    doWebRequest = Mock(side_effect=[error, (stub_response(201), b''),
+                                     (stub_response(201), b'')])
+    sendPREMISEvent = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+    events = make_events(5)
+
+    results = util.sendPREMISEvents('http://example.com', events,
+                                    batch_size=2)
+
+    assert not sendPREMISEvent.called
+    assert results[0].errors == [(events[0], error), (events[1], error)]
+    assert results[0].content == b'no feeds'
+    assert [r.batched for r in results] == [False, True, True]
+
+
+@pytest.mark.parametrize('code', [400, 405, 413, 415])
+def test_unsupported_status_stops_batching(monkeypatch, code):
+    doWebRequest = Mock(side_effect=rejected(code))
+    sendPREMISEvent = Mock()
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.sendPREMISEvent', sendPREMISEvent)
+
+    results = util.sendPREMISEvents('http://example.com', make_events(4),
+                                    batch_size=2)
+
+    assert doWebRequest.call_count == 1
+    assert sendPREMISEvent.call_count == 4
+    assert all(r.ok for r in results)
+
+
+def test_transient_error_retried_with_policy(monkeypatch):
+    doWebRequest = Mock(side_effect=[rejected(503), (stub_response(201), b'')])
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+    monkeypatch.setattr('codalib.util.time.sleep', Mock())
+
+    results = util.sendPREMISEvents(
+        'http://example.com', make_events(2),
+        retry=util.RetryPolicy(base_delay=0, jitter=0)
+    )
+
+    assert doWebRequest.call_count == 2
+    assert results[0].batched and results[0].ok
@@ -1,26 +1,11 @@
+import gzip
 from unittest.mock import Mock
 from urllib.error import URLError
 
+from lxml import etree
 import pytest
 
-from codalib import util
-
-
-@pytest.fixture
-def queue_dict():
-    """
-    Fixture to provide a valid queue dictionary as required by
-    updateQueue.
-
-    updateQueue expects all of the keys below to be present.
-    """
-    return {
-        'ark': 'fake ark',
-        'oxum': 'fake oxum',
-        'url_list': 'fake url list',
-        'status': 'fake status',
-        'queue_position': 'fake queue position'
-    }
+from codalib import bagatom, util
 
 
 def test_request_is_successful(queue_dict, monkeypatch):
@@ -94,3 +79,49 @@ def test_second_request_attempt_succeeds(queue_dict, monkeypatch):
 
     assert response.getcode.call_count == 1
     assert doWebRequest.call_count == 2
+
+
+def strip_updated(data):
+    return data.split(b'<updated>')[0] + data.split(b'</updated>')[1]
+
+
+def test_accepts_QueueEntry(queue_dict, monkeypatch):
+    """
+    Check that updateQueue uploads the same entry for a QueueEntry as
+    for the dictionary.
+    """
+    response = Mock()
+    response.getcode.return_value = 200
+    doWebRequest = Mock(return_value=(response, 'Fake content'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    util.updateQueue('http://example.com/', queue_dict)
+    util.updateQueue('http://example.com/', bagatom.QueueEntry.fromDict(queue_dict))
+
+    first, second = doWebRequest.call_args_list
+    assert first[0] == second[0]
+    assert strip_updated(first[1]['data']) == strip_updated(second[1]['data'])
+
+
+def test_compact_and_compressed(queue_dict, monkeypatch):
+    """
+    Check that updateQueue sends the entry without indentation and
+    gzipped when asked to.
+    """
+    response = Mock()
+    response.getcode.return_value = 200
+    doWebRequest = Mock(return_value=(response, 'Fake content'))
+    monkeypatch.setattr('codalib.util.doWebRequest', doWebRequest)
+
+    util.updateQueue('http://example.com/', queue_dict)
+    util.updateQueue('http://example.com/', queue_dict, pretty_print=False,
+                     compress=True)
+
+    pretty, compact = doWebRequest.call_args_list
+    assert pretty[1]['headers'] == {}
+    assert compact[1]['headers'] == {'Content-Encoding': 'gzip',
+                                     'Accept-Encoding': 'gzip'}
+    data = gzip.decompress(compact[1]['data'])
+    parser = etree.XMLParser(remove_blank_text=True)
+    expected = etree.tostring(etree.fromstring(pretty[1]['data'], parser))
+    assert strip_updated(data) == strip_updated(b'<?xml version="1.0"?>\n' + expected)
@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta
 from codalib.xsdatetime import (
     xsDateTime_parse, xsDateTime_format, XSDateTimezone,
-    current_offset, localize_datetime, set_default_local_tz
+    current_offset, localize_datetime, set_default_local_tz,
+    InvalidXSDateTime, xsDateTime_parse_many, _parse_slow,
+    xsDateTime_format_local, _wall_offset_cache
 )
 from pytz import timezone
+import pytest
 from tzlocal import get_localzone
 
 
@@ -151,3 +154,157 @@ def test_change_default_local_tz():
     # The difference between the offsets should be -2 hours, since
     # pacific time is 2 hours behind central
     assert osdiff == -2
+
+
+@pytest.mark.parametrize('dt_str', [
+    "2017-01-27T15:14:00",
+    "2017-01-27T15:14:00.5",
+    "2017-01-27T15:14:00.1234567Z",
+    "2017-03-12T07:59:59.999999Z",
+    "2017-03-12T08:00:00Z",
+    "2017-11-05T01:30:00-05:00",
+    "2017-11-05T01:30:00-06:00",
+])
+def test_parse_matches_slow_parser(dt_str):
+    central = timezone("US/Central")
+    assert xsDateTime_parse(dt_str, central) == _parse_slow(dt_str, central)
+
+
+@pytest.mark.parametrize('dt_str', [
+    "2017-01-27T15:14",
+    "2017-02-30T15:14:00Z",
+    "2017-01-27T15:14:60Z",
+    "2017-01-27 15:14:00Z",
+    "2017-01-27T15:14:00.",
+    "2017-01-27T15:14:00+0600",
+    "2017-01-27T15:14:00*06:00",
+    "2017-01-27T15:14:00+06-00",
+    "2017-01-27T15:14:00Y",
+])
+def test_parse_malformed(dt_str):
+    with pytest.raises(InvalidXSDateTime):
+        xsDateTime_parse(dt_str)
+
+
+def test_parse_not_a_string():
+    with pytest.raises(InvalidXSDateTime):
+        xsDateTime_parse(b"2017-01-27T15:14:00Z")
+
+
+def test_parse_across_dst_change():
+    central = timezone("US/Central")
+    # Clocks went forward at 08:00 UTC
+    assert xsDateTime_parse("2017-03-12T07:59:00Z", central) == \
+        datetime(2017, 3, 12, 1, 59)
+    assert xsDateTime_parse("2017-03-12T08:00:00Z", central) == \
+        datetime(2017, 3, 12, 3, 0)
+
+
+def test_parse_many_matches_parse():
+    central = timezone("US/Central")
+    dt_strs = [
+        "2017-01-27T15:14:00+06:00",
+        "2017-01-27T15:14:00",
+        "2017-03-12T08:00:00Z",
+        "2017-01-27T15:14:00.1234567Z",
+        "2017-07-04T12:00:00-05:00",
+        "2017-01-27T15:14:00+06:00",
+    ]
+    assert xsDateTime_parse_many(dt_strs, central) == [
+        xsDateTime_parse(dt_str, central) for dt_str in dt_strs
+    ]
+
+
+def test_parse_many_reports_errors_per_item():
+    errors = []
+    dt_strs = [
+        "2017-01-27T15:14:00Z",
+        "2017-01-27T15:14",
+        None,
+        "2017-01-27T15:14:00+06:00",
+        "9999-12-31T23:59:59-05:00",
+    ]
+    parsed = xsDateTime_parse_many(dt_strs, timezone("US/Central"), errors=errors)
+    assert parsed[1:3] == [None, None]
+    assert parsed[4] is None
+    assert parsed[0] is not None and parsed[3] is not None
+    assert [index for index, error in errors] == [1, 2, 4]
+    assert isinstance(errors[0][1], InvalidXSDateTime)
+    assert isinstance(errors[1][1], InvalidXSDateTime)
+    assert isinstance(errors[2][1], OverflowError)
+
+
+def test_parse_many_without_errors_list():
+    assert xsDateTime_parse_many(["bad", "2017-01-27T15:14:00"]) == [
+        None, datetime(2017, 1, 27, 15, 14)
+    ]
+
+
+@pytest.mark.parametrize('dt', [
+    datetime(2017, 1, 27, 15, 14),
+    datetime(2017, 1, 27, 15, 14, 0, 123456),
+    datetime(2017, 3, 12, 1, 59, 59),
+    datetime(2017, 3, 12, 2, 30),
+    datetime(2017, 3, 12, 3, 0),
+    datetime(2017, 11, 5, 0, 59, 59),
+    datetime(2017, 11, 5, 1, 30),
+    datetime(2017, 11, 5, 1, 30, fold=1),
+    datetime(2017, 11, 5, 2, 0),
+    datetime(1850, 6, 1),
+])
+def test_format_local_matches_localize_and_format(dt):
+    zoneinfo = pytest.importorskip('zoneinfo')
+    for local_tz in (zoneinfo.ZoneInfo("America/Chicago"), timezone("US/Central")):
+        assert xsDateTime_format_local(dt, local_tz) == \
+            xsDateTime_format(localize_datetime(dt, local_tz))
+
+
+def test_format_local_uses_default_tz():
+    zoneinfo = pytest.importorskip('zoneinfo')
+    old_local_tz = set_default_local_tz(zoneinfo.ZoneInfo("America/Chicago"))
+    try:
+        assert xsDateTime_format_local(datetime(2017, 7, 4, 12)) == \
+            "2017-07-04T12:00:00-05:00"
+    finally:
+        set_default_local_tz(old_local_tz)
+
+
+def test_current_offset_pytz():
+    central = timezone("US/Central")
+    assert current_offset(central) in (timedelta(hours=-5), timedelta(hours=-6))
+
+
+def test_set_default_local_tz_clears_offset_tables():
+    central = timezone("US/Central")
+    xsDateTime_format_local(datetime(2017, 7, 4), central)
+    assert _wall_offset_cache
+    old_local_tz = set_default_local_tz(central)
+    try:
+        assert not _wall_offset_cache
+    finally:
+        set_default_local_tz(old_local_tz)
+
+
+def test_format_local_within_a_second():
+    zoneinfo = pytest.importorskip('zoneinfo')
+    for local_tz in (zoneinfo.ZoneInfo("America/Chicago"), timezone("US/Central")):
+        for microsecond in (0, 1, 500000, 999999, 0):
+            dt = datetime(2017, 7, 4, 12, 0, 0, microsecond)
+            assert xsDateTime_format_local(dt, local_tz) == \
+                localize_datetime(dt, local_tz).isoformat()
+
+
+def test_format_local_keeps_timezones_apart():
+    dt = datetime(2017, 7, 4, 12, 0, 0, 250)
+    assert xsDateTime_format_local(dt, XSDateTimezone(5)) == \
+        "2017-07-04T12:00:00.000250+05:00"
+    assert xsDateTime_format_local(dt, XSDateTimezone(5, 30, -1)) == \
+        "2017-07-04T12:00:00.000250-05:30"
+
+
+def test_format_local_unhashable_tzinfo():
+    class Unhashable(XSDateTimezone):
+        __hash__ = None
+
+    assert xsDateTime_format_local(datetime(2017, 7, 4, 12), Unhashable(1)) == \
+        "2017-07-04T12:00:00+01:00"